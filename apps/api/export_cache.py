@@ -0,0 +1,221 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Iterable, Optional
+
+# Bump when the PDF layout changes so previously rendered files stop matching.
+RENDER_VERSION = "4"
+
+EXPORT_DIR = "exports"
+# Finished exports are also copied to the storage backend under this prefix when it is remote
+EXPORT_STORAGE_PREFIX = "exports/"
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+# Exports not downloaded or re-requested for this long are deleted (0 keeps them until evicted by size)
+EXPORT_CACHE_MAX_AGE = float(os.getenv("EXPORT_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+# How often the API process runs gc() in the background (0 disables it)
+EXPORT_GC_INTERVAL = float(os.getenv("EXPORT_GC_INTERVAL", "3600"))
+# Leftover render temp files older than this belong to a crashed or killed worker
+EXPORT_TMP_MAX_AGE = float(os.getenv("EXPORT_TMP_MAX_AGE", str(6 * 3600)))
+
+def _ts(value) -> str:
+    return value.isoformat() if value is not None else ""
+
+def run_fingerprint(
+    run,
+    template_id: str,
+    template_version: str,
+    answer_rows: Iterable,
+    photo_rows: Iterable,
+    declaration_labels: Iterable[str],
+) -> str:
+    """Hashes everything an export depends on.
+
+    `answer_rows` are (id, question_id, created_at, updated_at) tuples and
+    `photo_rows` are (id, answer_id, created_at, caption) tuples; photos carry no
+    updated_at, so the caption is hashed directly.
+    """
+    h = hashlib.sha256()
+
+    def feed(*parts):
+        for part in parts:
+            h.update(str(part if part is not None else "").encode("utf-8"))
+            h.update(b"\x1f")
+        h.update(b"\x1e")
+
+    feed("render", RENDER_VERSION)
+    feed("template", template_id, template_version)
+    feed(
+        "run",
+        run.id,
+        run.status,
+        run.site_name,
+        run.p_ref,
+        run.engineer_name,
+        run.ap_count,
+        _ts(run.created_at),
+        _ts(run.updated_at),
+    )
+    for a_id, question_id, created_at, updated_at in sorted(answer_rows, key=lambda r: str(r[0])):
+        feed("answer", a_id, question_id, _ts(created_at), _ts(updated_at))
+    for p_id, answer_id, created_at, caption in sorted(photo_rows, key=lambda r: str(r[0])):
+        feed("photo", p_id, answer_id, _ts(created_at), caption)
+    for label in declaration_labels:
+        feed("declaration", label)
+    return h.hexdigest()
+
+class ExportCache:
+    """Rendered PDFs on disk, named by run fingerprint.
+
+    Files are evicted least-recently-used once the directory exceeds `max_bytes`,
+    and gc() also drops files unused for `max_age` seconds and stale temp files.
+    """
+
+    def __init__(
+        self,
+        directory: str = EXPORT_DIR,
+        max_bytes: int = EXPORT_CACHE_MAX_BYTES,
+        max_age: float = EXPORT_CACHE_MAX_AGE,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+        self._gc_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def filename(self, run_id: str, fingerprint: str) -> str:
+        return f"run_{run_id}_{fingerprint}.pdf"
+
+    def storage_key(self, filename: str) -> str:
+        return f"{EXPORT_STORAGE_PREFIX}{filename}"
+
+    def path(self, run_id: str, fingerprint: str) -> str:
+        return os.path.join(self.directory, self.filename(run_id, fingerprint))
+
+    def lookup(self, run_id: str, fingerprint: str) -> Optional[str]:
+        path = self.path(run_id, fingerprint)
+        if not self.touch(path):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def touch(self, path: str) -> bool:
+        """Marks a cached file as used. False if it does not exist."""
+        try:
+            # mtime doubles as the LRU clock; atime is unreliable on noatime mounts
+            os.utime(path, None)
+        except OSError:
+            return False
+        return True
+
+    def _entries(self, suffix: str = ".pdf"):
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.is_file() or not entry.name.endswith(suffix):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if keep and os.path.normpath(path) == os.path.normpath(keep):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            with self._lock:
+                self.evictions += removed
+        return removed
+
+    def expire(self, keep: Optional[str] = None, now: Optional[float] = None) -> int:
+        """Deletes exports unused for max_age seconds and render temp files left by dead workers."""
+        now = time.time() if now is None else now
+        doomed = []
+        if self.max_age > 0:
+            doomed += [path for mtime, _, path in self._entries() if now - mtime > self.max_age]
+        doomed += [path for mtime, _, path in self._entries(".tmp") if now - mtime > EXPORT_TMP_MAX_AGE]
+        removed = 0
+        for path in doomed:
+            if keep and os.path.normpath(path) == os.path.normpath(keep):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            removed += 1
+        if removed:
+            with self._lock:
+                self.expirations += removed
+        return removed
+
+    def gc(self) -> dict:
+        """Applies the age limit, then the size limit."""
+        expired = self.expire()
+        evicted = self.evict()
+        return {"expired": expired, "evicted": evicted}
+
+    def start_gc(self, interval: float):
+        """Runs gc() in a daemon thread every `interval` seconds until stop_gc()."""
+        with self._lock:
+            if self._gc_thread is not None and self._gc_thread.is_alive():
+                return
+            self._stop.clear()
+            self._gc_thread = threading.Thread(target=self._gc_loop, args=(interval,), name="export-gc", daemon=True)
+            self._gc_thread.start()
+
+    def stop_gc(self):
+        self._stop.set()
+        thread = self._gc_thread
+        if thread is not None:
+            thread.join()
+        self._gc_thread = None
+
+    def _gc_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.gc()
+            except Exception as e:
+                print(f"Error collecting exports in {self.directory}: {e}")
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes,
+                "max_age": self.max_age,
+            }
+
+export_cache = ExportCache()
@@ -0,0 +1,188 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import uuid4
+
+from .export_cache import export_cache
+from .image_cache import image_cache, merge_stats
+from .metrics import observe_stage
+from .pdf_render import render_run_pdf
+from .storage import get_storage
+
+# Export jobs live in memory of the API process; a restart drops pending jobs and
+# clients simply re-submit. Rendering happens in a bounded process pool so a
+# large export never holds a request worker or the event loop.
+
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+MAX_FINISHED_JOBS = int(os.getenv("EXPORT_MAX_FINISHED_JOBS", "500"))
+# How long a streamed export waits for its render before answering with the job instead
+EXPORT_STREAM_TIMEOUT = float(os.getenv("EXPORT_STREAM_TIMEOUT", "120"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+class ExportJob:
+    def __init__(self, run_id: str, key: str, file_path: str, pdf_url: str):
+        self.id = str(uuid4())
+        self.run_id = run_id
+        self.key = key
+        self.file_path = file_path
+        self.pdf_url = pdf_url
+        self.status = JOB_QUEUED
+        self.progress = 0.0
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.finished_at: Optional[datetime] = None
+        self._done_event = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_DONE, JOB_FAILED)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the job is done or failed; False on timeout."""
+        return self._done_event.wait(timeout)
+
+_lock = threading.Lock()
+_jobs: "OrderedDict[str, ExportJob]" = OrderedDict()
+_active_by_key: dict[str, str] = {}
+_pool: Optional[ProcessPoolExecutor] = None
+_manager = None
+_progress = None
+_image_stats: dict[int, dict] = {}  # export worker pid -> image cache stats after its last job
+
+def _get_pool():
+    global _pool, _manager, _progress
+    if _manager is None:
+        _manager = multiprocessing.Manager()
+        _progress = _manager.dict()
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=max(1, EXPORT_WORKERS))
+    return _pool
+
+def _discard_pool(pool):
+    # A worker that dies (e.g. OOM-killed) breaks the whole executor for good;
+    # forget it so the next export starts a fresh one. Call with _lock held.
+    global _pool
+    if _pool is pool:
+        _pool = None
+
+def _render_job(job_id: str, snapshot: dict, file_path: str, progress_store) -> tuple[int, dict, dict]:
+    # Executes in a pool worker process
+    progress_store[job_id] = 0.0
+
+    def report(fraction: float):
+        progress_store[job_id] = fraction
+
+    # Timings travel back with the result; this process's metrics are never scraped
+    started = time.perf_counter()
+    timings = {}
+    render_run_pdf(snapshot, file_path, report, timings=timings)
+    storage = get_storage()
+    if not storage.is_local:
+        # The local file stays as this node's cache; other nodes fetch the stored copy
+        storage.put_file(export_cache.storage_key(os.path.basename(file_path)), file_path, "application/pdf")
+    timings["export_job"] = time.perf_counter() - started
+    return os.getpid(), image_cache.stats(), timings
+
+def _trim_finished():
+    finished = [jid for jid, j in _jobs.items() if j.finished]
+    for jid in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+        del _jobs[jid]
+
+def _on_done(job_id: str, pool, future):
+    with _lock:
+        exc = future.exception()
+        if isinstance(exc, BrokenProcessPool):
+            _discard_pool(pool)
+        job = _jobs.get(job_id)
+        if job is None:
+            return
+        if exc is not None:
+            job.status = JOB_FAILED
+            job.error = str(exc) or exc.__class__.__name__
+        else:
+            job.status = JOB_DONE
+            job.progress = 1.0
+            pid, stats, timings = future.result()
+            _image_stats[pid] = stats
+            for stage, seconds in timings.items():
+                observe_stage(stage, seconds)
+        job.finished_at = datetime.now(timezone.utc)
+        if _active_by_key.get(job.key) == job_id:
+            del _active_by_key[job.key]
+        if _progress is not None:
+            _progress.pop(job_id, None)
+        _trim_finished()
+        job._done_event.set()
+
+    if job.status == JOB_DONE:
+        export_cache.evict(keep=job.file_path)
+
+def find_active(key: str) -> Optional[ExportJob]:
+    with _lock:
+        active_id = _active_by_key.get(key)
+        return _jobs[active_id] if active_id is not None else None
+
+def completed_export(run_id: str, key: str, file_path: str, pdf_url: str) -> ExportJob:
+    """Records an already-rendered export so clients follow the same job flow."""
+    job = ExportJob(run_id, key, file_path, pdf_url)
+    job.status = JOB_DONE
+    job.progress = 1.0
+    job.finished_at = job.created_at
+    job._done_event.set()
+    with _lock:
+        _jobs[job.id] = job
+        _trim_finished()
+    return job
+
+def submit_export(run_id: str, key: str, snapshot: dict, file_path: str, pdf_url: str) -> ExportJob:
+    """Queues a render of `snapshot`, reusing the in-flight job for the same `key`."""
+    with _lock:
+        active_id = _active_by_key.get(key)
+        if active_id is not None:
+            return _jobs[active_id]
+
+        job = ExportJob(run_id, key, file_path, pdf_url)
+        pool = _get_pool()
+        try:
+            future = pool.submit(_render_job, job.id, snapshot, file_path, _progress)
+        except (BrokenProcessPool, RuntimeError):
+            # Broken by a dead worker, or shut down; retry once on a new pool
+            _discard_pool(pool)
+            pool = _get_pool()
+            future = pool.submit(_render_job, job.id, snapshot, file_path, _progress)
+        # Registered only once queued, so a failed submit leaves no job for later exports to wait on
+        _jobs[job.id] = job
+        _active_by_key[key] = job.id
+
+    future.add_done_callback(lambda f, job_id=job.id, pool=pool: _on_done(job_id, pool, f))
+    return job
+
+def render_image_stats() -> dict:
+    """Decoded-image cache stats summed over the export workers, as of their last finished job."""
+    with _lock:
+        return merge_stats(_image_stats.values())
+
+def get_job(job_id: str) -> Optional[ExportJob]:
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None or job.finished or _progress is None:
+            return job
+    try:
+        fraction = _progress.get(job_id)
+    except Exception:
+        fraction = None
+    with _lock:
+        if fraction is not None and not job.finished:
+            job.status = JOB_RUNNING
+            job.progress = float(fraction)
+    return job
@@ -0,0 +1,164 @@
+import gzip
+import hashlib
+import os
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+try:
+    import brotli
+except ImportError:  # brotli variants are skipped without it
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 512
+
+FILE_CHUNK_BYTES = 256 * 1024
+
+class EncodedBody:
+    """A response body serialized once, with precompressed variants and one strong ETag per encoding."""
+
+    def __init__(self, body: bytes, media_type: str = "application/json"):
+        self.media_type = media_type
+        self.digest = hashlib.sha256(body).hexdigest()[:32]
+        self.variants: Dict[str, bytes] = {"identity": body}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            self.variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(body, quality=11)
+
+    def etag(self, encoding: str) -> str:
+        # Strong validators must differ between encodings of the same entity
+        return f'"{self.digest}"' if encoding == "identity" else f'"{self.digest}-{encoding}"'
+
+    def negotiate(self, accept_encoding: Optional[str]) -> str:
+        accepted = set()
+        for part in (accept_encoding or "").split(","):
+            coding, _, params = part.partition(";")
+            q = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    q = float(params[2:])
+                except ValueError:
+                    q = 0.0
+            if q > 0:
+                accepted.add(coding.strip().lower())
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and (encoding in accepted or "*" in accepted):
+                return encoding
+        return "identity"
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        etags = {self.etag(encoding) for encoding in self.variants}
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag in etags:
+                return True
+        return False
+
+def cached_response(request: Request, body: EncodedBody, cache_control: str) -> Response:
+    """Serves `body` in the best encoding the client accepts, or a 304 if its ETag still matches."""
+    encoding = body.negotiate(request.headers.get("accept-encoding"))
+    headers = {
+        "ETag": body.etag(encoding),
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if body.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body.variants[encoding], media_type=body.media_type, headers=headers)
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """The inclusive (start, end) of a single `bytes=` range, None to send the whole file.
+
+    Raises ValueError when the range cannot be satisfied. Multi-range requests are
+    answered with the whole file, which RFC 9110 allows.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, sep, last = header[6:].strip().partition("-")
+    if not sep or not (first or last) or not (first + last).isdigit():
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise ValueError("unsatisfiable range")
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and start > int(last):
+        return None
+    if start >= size:
+        raise ValueError("unsatisfiable range")
+    return start, min(end, size - 1)
+
+def _iter_file(f, start: int, length: int):
+    try:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(FILE_CHUNK_BYTES, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+def file_response(
+    request: Request,
+    path: str,
+    media_type: str,
+    etag: str,
+    cache_control: str = "no-cache",
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """Streams an immutable file in chunks with Content-Length, ETag and single-range support.
+
+    The file is opened before returning, so it can be unlinked (e.g. by cache
+    eviction) while the body is still being sent.
+    """
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return Response(status_code=404)
+    size = os.fstat(f.fileno()).st_size
+    base = {"ETag": etag, "Cache-Control": cache_control, "Accept-Ranges": "bytes", **(headers or {})}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        f.close()
+        return Response(status_code=304, headers=base)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if request.method == "GET" and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except ValueError:
+            f.close()
+            return Response(status_code=416, headers={**base, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        return StreamingResponse(
+            _iter_file(f, 0, size),
+            media_type=media_type,
+            headers={**base, "Content-Length": str(size)},
+        )
+    start, end = byte_range
+    return StreamingResponse(
+        _iter_file(f, start, end - start + 1),
+        status_code=206,
+        media_type=media_type,
+        headers={**base, "Content-Length": str(end - start + 1), "Content-Range": f"bytes {start}-{end}/{size}"},
+    )
@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, NamedTuple, Tuple
+
+from PIL import Image
+from reportlab.lib.utils import ImageReader
+
+# Per rendering process; every export that process renders shares it
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+class CachedImage(NamedTuple):
+    reader: ImageReader
+    width: float  # drawn size in points inside the target box
+    height: float
+    nbytes: int
+    decode_seconds: float
+
+def _has_alpha(path: str) -> bool:
+    # Reads the header only
+    with Image.open(path) as img:
+        return "A" in img.getbands() or "transparency" in img.info
+
+class ImageCache:
+    """Decoded images for PDF rendering, keyed by (path, mtime, target box), evicted least-recently-used by bytes.
+
+    ReportLab decodes every image passed to drawImage to RGB, even a JPEG it
+    embeds as-is, to name the XObject. A cached reader keeps those pixels, so a
+    photo drawn again by a later export is neither re-read nor re-decoded.
+    """
+
+    def __init__(self, max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.decode_seconds = 0.0
+        self.saved_seconds = 0.0
+        self._entries: "OrderedDict[Tuple, CachedImage]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, path: str, max_w: float, max_h: float) -> CachedImage:
+        """The decoded image at `path`, scaled to fit `max_w` x `max_h` points. Raises if it cannot be read."""
+        st = os.stat(path)
+        key = (path, st.st_mtime_ns, round(max_w, 2), round(max_h, 2))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.saved_seconds += entry.decode_seconds
+                return entry
+
+        start = time.perf_counter()
+        reader = ImageReader(path)
+        iw, ih = reader.getSize()
+        if not iw or not ih:
+            raise ValueError("Invalid image dimensions")
+        # Decode now, so the pixels are cached with the reader and drawImage reuses them.
+        # The reader also holds the file's bytes, and an alpha mask for transparent images.
+        nbytes = len(reader.getRGBData()) + st.st_size
+        if _has_alpha(path):
+            nbytes += iw * ih
+        elapsed = time.perf_counter() - start
+
+        scale = min(max_w / float(iw), max_h / float(ih))
+        entry = CachedImage(reader, float(iw) * scale, float(ih) * scale, nbytes, elapsed)
+        with self._lock:
+            self.misses += 1
+            self.decode_seconds += elapsed
+            if nbytes <= self.max_bytes and key not in self._entries:
+                self._entries[key] = entry
+                self._bytes += nbytes
+                while self._bytes > self.max_bytes:
+                    _, old = self._entries.popitem(last=False)
+                    self._bytes -= old.nbytes
+                    self.evictions += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "decode_seconds": self.decode_seconds,
+                "saved_seconds": self.saved_seconds,
+            }
+
+def merge_stats(stats: Iterable[dict]) -> dict:
+    """Sums the stats() of caches in several rendering processes (or earlier merges)."""
+    total = {"hits": 0, "misses": 0, "evictions": 0, "entries": 0, "bytes": 0, "decode_seconds": 0.0, "saved_seconds": 0.0}
+    processes = 0
+    for s in stats:
+        processes += s.get("processes", 1)
+        for name in total:
+            total[name] += s[name]
+    lookups = total["hits"] + total["misses"]
+    total["hit_rate"] = (total["hits"] / lookups) if lookups else 0.0
+    total["processes"] = processes
+    return total
+
+image_cache = ImageCache()
@@ -0,0 +1,107 @@
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+from PIL import Image, ImageOps
+
+POINTS_PER_INCH = 72.0
+
+PDF_IMAGE_DPI = int(os.getenv("PDF_IMAGE_DPI", "150"))
+PDF_IMAGE_QUALITY = int(os.getenv("PDF_IMAGE_QUALITY", "75"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+# Largest photo accepted by direct (presigned) uploads
+PHOTO_MAX_BYTES = int(os.getenv("PHOTO_MAX_BYTES", str(30 * 1024 * 1024)))
+
+# Thumbnails and print derivatives are generated here, off the request path.
+# Pillow releases the GIL while decoding and resampling, so threads scale.
+_image_pool = ThreadPoolExecutor(max_workers=max(1, IMAGE_WORKERS), thread_name_prefix="images")
+
+def submit_image_task(fn, *args) -> Future:
+    return _image_pool.submit(fn, *args)
+
+# Leading bytes needed by sniff_image_type()
+SNIFF_BYTES = 32
+
+def sniff_image_type(prefix: bytes) -> Optional[str]:
+    """The image content type the leading bytes of a file identify, or None if they are not an image we accept."""
+    if prefix.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if prefix.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if prefix[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if prefix[:4] == b"RIFF" and prefix[8:12] == b"WEBP":
+        return "image/webp"
+    if prefix[4:8] == b"ftyp":
+        brand = prefix[8:12]
+        if brand in (b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx"):
+            return "image/heic"
+        if brand in (b"mif1", b"msf1"):
+            return "image/heif"
+    if prefix.startswith(b"BM"):
+        return "image/bmp"
+    if prefix[:4] in (b"II*\x00", b"MM\x00*"):
+        return "image/tiff"
+    return None
+
+def _lanczos():
+    if hasattr(Image, "Resampling"):
+        return Image.Resampling.LANCZOS
+    return Image.LANCZOS
+
+def print_derivative_path(src_path: str, dpi: int) -> str:
+    root, _ = os.path.splitext(src_path)
+    return f"{root}_print{dpi}.jpg"
+
+def make_print_derivative(
+    src_path: str,
+    box_w: float,
+    box_h: float,
+    dpi: int = PDF_IMAGE_DPI,
+    quality: int = PDF_IMAGE_QUALITY,
+) -> Optional[str]:
+    """Writes an EXIF-upright JPEG that fits a `box_w` x `box_h` point box at `dpi`.
+
+    Returns the derivative path, or None if the source cannot be decoded.
+    """
+    dst_path = print_derivative_path(src_path, dpi)
+    max_px = (
+        max(1, int(round(box_w / POINTS_PER_INCH * dpi))),
+        max(1, int(round(box_h / POINTS_PER_INCH * dpi))),
+    )
+    tmp_path = f"{dst_path}.{os.getpid()}.tmp"
+    try:
+        with Image.open(src_path) as img:
+            # Let the JPEG decoder skip work when the source is much larger than needed
+            img.draft("RGB", (max_px[0] * 2, max_px[1] * 2))
+            img = ImageOps.exif_transpose(img)
+            img = img.convert("RGB")
+            img.thumbnail(max_px, _lanczos())
+            img.save(tmp_path, format="JPEG", quality=quality, optimize=True)
+        os.replace(tmp_path, dst_path)
+        return dst_path
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+
+def ensure_print_derivative(
+    src_path: str,
+    box_w: float,
+    box_h: float,
+    dpi: int = PDF_IMAGE_DPI,
+    quality: int = PDF_IMAGE_QUALITY,
+) -> Optional[str]:
+    """Returns a cached print derivative for `src_path`, generating it if missing or stale."""
+    dst_path = print_derivative_path(src_path, dpi)
+    try:
+        if os.stat(dst_path).st_mtime >= os.stat(src_path).st_mtime:
+            return dst_path
+    except OSError:
+        pass
+    return make_print_derivative(src_path, box_w, box_h, dpi, quality)
+
+def remove_print_derivative(src_path: str, dpi: int = PDF_IMAGE_DPI):
+    dst_path = print_derivative_path(src_path, dpi)
+    if os.path.exists(dst_path):
+        os.remove(dst_path)
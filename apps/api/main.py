@@ -2,17 +2,36 @@ import os
 import sys
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
 # Add packages/checklist-engine to path if not installed
 # In Docker, we install it. Locally, we might need this.
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../packages/checklist-engine")))
 
-from .database import engine, Base
-from .routers import templates, runs, health
+from .database import async_engine, engine, Base, SessionLocal
+from .metrics import METRICS_ENABLED, PROFILE_SLOW_REQUEST_MS, InstrumentationMiddleware, instrument_engine
+from .run_stats import backfill_run_stats
+from .schema_upgrade import upgrade_schema
+from .export_cache import EXPORT_GC_INTERVAL, export_cache
+from .storage import check_signing_key
+from .routers import templates, runs, health, exports, uploads, sync
+
+# Workers must agree on the key that signs upload URLs and tokens
+check_signing_key()
 
 # Create DB tables (Simple migration for Stage 1)
 Base.metadata.create_all(bind=engine)
+# ...and indexes/constraints that create_all cannot add to tables that already exist
+with SessionLocal() as _db:
+    upgrade_schema(_db)
+
+# Refuse to start with a template that does not validate
+templates.loader.list_meta(strict=True)
+if templates.TEMPLATES_WATCH_INTERVAL > 0:
+    templates.loader.watch(templates.TEMPLATES_WATCH_INTERVAL)
+
+# Runs created before checklist_run_stats existed get their counters once
+with SessionLocal() as _db:
+    backfill_run_stats(_db)
 
 app = FastAPI(title="BCQA API", version="1.0.0")
 
@@ -29,6 +48,13 @@ origins = (
     ]
 )
 
+# Opt-in: per-route latency and SQL histograms at /metrics, and stacks of slow requests
+if METRICS_ENABLED or PROFILE_SLOW_REQUEST_MS > 0:
+    instrument_engine(engine)
+    if async_engine is not None:
+        instrument_engine(async_engine.sync_engine)
+    app.add_middleware(InstrumentationMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -37,23 +63,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Ensure uploads directory exists
-UPLOAD_DIR = "uploads"
-if not os.path.exists(UPLOAD_DIR):
-    os.makedirs(UPLOAD_DIR)
-
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+# Photos are served by the uploads router: from disk, or by redirect to the storage backend
+app.include_router(uploads.router)
 
-# Ensure exports directory exists
-EXPORT_DIR = "exports"
+# Ensure exports directory exists (rendered PDFs are cached there by run fingerprint)
+EXPORT_DIR = export_cache.directory
 if not os.path.exists(EXPORT_DIR):
     os.makedirs(EXPORT_DIR)
 
-app.mount("/exports", StaticFiles(directory=EXPORT_DIR), name="exports")
+# Cached PDFs are served by the exports router (ranges, ETags) and expire by age and size
+export_cache.gc()
+if EXPORT_GC_INTERVAL > 0:
+    export_cache.start_gc(EXPORT_GC_INTERVAL)
+
+app.include_router(exports.router)
 
 app.include_router(health.router)
 app.include_router(templates.router)
 app.include_router(runs.router)
+app.include_router(sync.router)
 
 @app.get("/")
 def root():
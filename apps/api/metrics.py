@@ -0,0 +1,267 @@
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+
+# Both are off by default; the middleware is only installed when one is on
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+# Requests slower than this dump the stacks sampled while they ran (0 disables the profiler)
+PROFILE_SLOW_REQUEST_MS = float(os.getenv("PROFILE_SLOW_REQUEST_MS", "0"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+class Histogram:
+    """A Prometheus histogram with one series per label set."""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for label_values, series in items:
+            labels = _labels(self.labels, label_values)
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{labels}{"," if labels else ""}le="{bound:g}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels}{"," if labels else ""}le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {series[-1]}")
+        return "\n".join(lines)
+
+class Counters:
+    """A Prometheus counter with one series per label set."""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: int = 1):
+        with self._lock:
+            self._values[label_values] += amount
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{{{_labels(self.labels, label_values)}}} {value}")
+        return "\n".join(lines)
+
+def _label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names, values) -> str:
+    return ",".join(f'{name}="{_label_value(value)}"' for name, value in zip(names, values))
+
+request_duration = Histogram(
+    "bcqa_http_request_duration_seconds", "Time from request start to the last response byte.",
+    ("method", "route"), LATENCY_BUCKETS,
+)
+requests_total = Counters("bcqa_http_requests_total", "Requests by response status.", ("method", "route", "status"))
+request_sql_statements = Histogram(
+    "bcqa_http_request_sql_statements", "SQL statements executed on behalf of one request.",
+    ("method", "route"), SQL_COUNT_BUCKETS,
+)
+request_sql_duration = Histogram(
+    "bcqa_http_request_sql_duration_seconds", "Time one request spent waiting on SQL statements.",
+    ("method", "route"), LATENCY_BUCKETS,
+)
+stage_duration = Histogram(
+    "bcqa_stage_duration_seconds", "Image processing and PDF rendering steps, including those run off the request path.",
+    ("stage",), STAGE_BUCKETS,
+)
+slow_request_profiles = Counters("bcqa_slow_request_profiles_total", "Slow request profiles written.", ("route",))
+
+def observe_stage(stage: str, seconds: float):
+    if METRICS_ENABLED:
+        stage_duration.observe(seconds, stage)
+
+@contextmanager
+def timed(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+class RequestStats:
+    __slots__ = ("sql_statements", "sql_seconds", "threads")
+
+    def __init__(self):
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.threads = {threading.get_ident()}
+
+# Set by the middleware. Threadpool calls and AsyncSession.run_sync see the same object.
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("bcqa_request_stats", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("bcqa_query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["bcqa_query_start"].pop()
+    stats = _current_request.get()
+    if stats is not None:
+        stats.sql_statements += 1
+        stats.sql_seconds += time.perf_counter() - start
+        stats.threads.add(threading.get_ident())
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not fire for a failed statement
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("bcqa_query_start"):
+        conn.info["bcqa_query_start"].pop()
+
+def instrument_engine(sync_engine):
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+class StackSampler:
+    """Samples every thread's stack on a timer, keeping the last few minutes in memory.
+
+    Samples are folded ("frame;frame;frame") so a slow request's window can be
+    written out for flamegraph.pl, speedscope or similar without post-processing.
+    """
+
+    # A thread whose innermost frame is in one of these is waiting, not working
+    IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+
+    def __init__(self, interval: float, max_samples: int = 200_000):
+        self.interval = interval
+        self.samples = deque(maxlen=max_samples)  # (timestamp, thread id, folded stack)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            now = time.perf_counter()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me or frame.f_code.co_filename.endswith(self.IDLE_FILES):
+                    continue
+                self.samples.append((now, thread_id, _fold(frame)))
+            time.sleep(self.interval)
+
+    def window(self, start: float, end: float, threads) -> Counter:
+        folded = Counter()
+        for t, thread_id, stack in list(self.samples):
+            if start <= t <= end and thread_id in threads:
+                folded[stack] += 1
+        return folded
+
+def _fold(frame) -> str:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+_sampler = StackSampler(PROFILE_SAMPLE_INTERVAL_MS / 1000.0) if PROFILE_SLOW_REQUEST_MS > 0 else None
+
+def _write_profile(method: str, route: str, elapsed: float, folded: Counter):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+    path = os.path.join(PROFILE_DIR, f"{int(time.time() * 1000)}-{method}-{name}-{int(elapsed * 1000)}ms.folded")
+    with open(path, "w") as f:
+        for stack, count in folded.most_common():
+            f.write(f"{stack} {count}\n")
+    slow_request_profiles.inc(route)
+
+class InstrumentationMiddleware:
+    """Records latency and SQL usage per route, and profiles slow requests.
+
+    Routes are labelled by their path template (/runs/{run_id}), so series
+    stay bounded. The profile of a slow request holds the samples of the
+    threads it ran on during its lifetime. The event loop thread is shared,
+    so concurrent async requests can show up in each other's profiles.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        if _sampler is not None:
+            _sampler.start()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_request.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            if METRICS_ENABLED:
+                request_duration.observe(elapsed, method, route)
+                requests_total.inc(method, route, status[0])
+                request_sql_statements.observe(stats.sql_statements, method, route)
+                request_sql_duration.observe(stats.sql_seconds, method, route)
+            if _sampler is not None and elapsed * 1000 >= PROFILE_SLOW_REQUEST_MS:
+                folded = _sampler.window(start, time.perf_counter(), stats.threads)
+                if folded:
+                    _write_profile(method, route, elapsed, folded)
+
+def render_metrics(extra=()) -> str:
+    parts = [
+        request_duration.render(),
+        requests_total.render(),
+        request_sql_statements.render(),
+        request_sql_duration.render(),
+        stage_duration.render(),
+        slow_request_profiles.render(),
+    ]
+    parts.extend(extra)
+    return "\n".join(parts) + "\n"
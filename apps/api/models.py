@@ -1,12 +1,22 @@
-from sqlalchemy import Column, String, Integer, Date, JSON, ForeignKey, DateTime, Text
+from sqlalchemy import Boolean, Column, String, Integer, Date, JSON, ForeignKey, DateTime, Text, UniqueConstraint, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import uuid
+from datetime import datetime, timezone
 from .database import Base
 
 class ChecklistRun(Base):
     __tablename__ = "checklist_runs"
+    __table_args__ = (
+        # list_runs pages newest-first by (created_at, id), optionally filtered by one of these columns
+        Index("ix_checklist_runs_created_id", "created_at", "id"),
+        Index("ix_checklist_runs_status_created_id", "status", "created_at", "id"),
+        Index("ix_checklist_runs_template_created_id", "template_id", "created_at", "id"),
+        Index("ix_checklist_runs_engineer_created_id", "engineer_name", "created_at", "id"),
+        Index("ix_checklist_runs_p_ref", "p_ref"),
+        Index("ix_checklist_runs_visit_date", "visit_date"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     template_id = Column(String, nullable=False)
@@ -21,7 +31,9 @@ class ChecklistRun(Base):
     tech_bands = Column(JSON, nullable=False) # List[int]
     ap_count = Column(Integer, nullable=False)
     
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set client-side too so the stored value round-trips exactly into list_runs cursors
+    # (SQLite's CURRENT_TIMESTAMP has no fractional seconds and would not compare equal)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), default=lambda: datetime.now(timezone.utc))
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     submitted_at = Column(DateTime(timezone=True), nullable=True)
 
@@ -29,6 +41,10 @@ class ChecklistRun(Base):
 
 class ChecklistAnswer(Base):
     __tablename__ = "checklist_answers"
+    __table_args__ = (
+        # One answer per question per run; also the conflict target for batch upserts
+        UniqueConstraint("run_id", "question_id", name="uq_checklist_answers_run_question"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     run_id = Column(UUID(as_uuid=True), ForeignKey("checklist_runs.id"), nullable=False)
@@ -55,3 +71,84 @@ class ChecklistPhoto(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     answer = relationship("ChecklistAnswer", back_populates="photos")
+
+class ChecklistRunStats(Base):
+    """Per-run answer/photo counters, refreshed in the same transaction as each answer or photo write."""
+    __tablename__ = "checklist_run_stats"
+
+    run_id = Column(UUID(as_uuid=True), ForeignKey("checklist_runs.id", ondelete="CASCADE"), primary_key=True)
+    answered = Column(Integer, nullable=False, default=0)
+    pass_count = Column(Integer, nullable=False, default=0)
+    fail_count = Column(Integer, nullable=False, default=0)
+    na_count = Column(Integer, nullable=False, default=0)
+    photo_count = Column(Integer, nullable=False, default=0)
+    last_activity_at = Column(DateTime(timezone=True), nullable=True)
+
+class PhotoBlob(Base):
+    """One stored photo file, shared by every ChecklistPhoto whose file_path is its key."""
+    __tablename__ = "photo_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    key = Column(String, nullable=False, unique=True)
+    size = Column(Integer, nullable=False)
+    content_type = Column(String, nullable=True)
+    ref_count = Column(Integer, nullable=False, default=0) # ChecklistPhoto rows pointing at key
+    thumbnail_url = Column(String, nullable=True) # Set once the shared thumbnail exists
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class RunVersion(Base):
+    """Per-run change counter; the cursor clients pass to GET /runs/{id}/changes."""
+    __tablename__ = "run_versions"
+
+    run_id = Column(UUID(as_uuid=True), ForeignKey("checklist_runs.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class RunChange(Base):
+    """The latest change to each run, answer or photo of a run; deletes are kept as tombstones."""
+    __tablename__ = "run_changes"
+    __table_args__ = (
+        # changes_since() reads one run's rows past a cursor
+        Index("ix_run_changes_run_version", "run_id", "version"),
+    )
+
+    run_id = Column(UUID(as_uuid=True), ForeignKey("checklist_runs.id", ondelete="CASCADE"), primary_key=True)
+    entity = Column(String, primary_key=True) # "run", "answer", "photo"
+    entity_id = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+
+class SyncMutation(Base):
+    """Client mutation ids already applied by POST /runs/{id}/changes:apply, kept for SYNC_SEEN_TTL."""
+    __tablename__ = "sync_mutations"
+    __table_args__ = (
+        Index("ix_sync_mutations_seen_at", "seen_at"),
+    )
+
+    # Ids are made by clients, so they are only unique within a run
+    run_id = Column(UUID(as_uuid=True), ForeignKey("checklist_runs.id", ondelete="CASCADE"), primary_key=True)
+    mutation_id = Column(String, primary_key=True)
+    status = Column(String, nullable=False) # Outcome the first time, repeated to retries
+    seen_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+
+class SyncConflict(Base):
+    """An offline mutation that lost to a newer write; kept for debugging and audit."""
+    __tablename__ = "sync_conflicts"
+    __table_args__ = (
+        Index("ix_sync_conflicts_run_created", "run_id", "created_at"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    run_id = Column(UUID(as_uuid=True), nullable=False) # No FK: the log outlives deleted runs
+    mutation_id = Column(String, nullable=False)
+    device_id = Column(String, nullable=True)
+    entity = Column(String, nullable=False) # "answer", "photo"
+    entity_id = Column(String, nullable=False)
+    client_value = Column(JSON, nullable=True)
+    server_value = Column(JSON, nullable=True)
+    client_updated_at = Column(DateTime(timezone=True), nullable=False)
+    server_updated_at = Column(DateTime(timezone=True), nullable=True)
+    resolution = Column(String, nullable=False) # "server_wins", "deleted"
+
+    created_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
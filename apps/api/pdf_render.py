@@ -0,0 +1,367 @@
+import io
+import os
+import textwrap
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from pypdf import PdfReader, PdfWriter
+from reportlab import rl_config
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+
+from .image_cache import image_cache
+from .images import PDF_IMAGE_DPI, ensure_print_derivative
+from .storage import get_storage
+
+# Rendering works on a plain-dict snapshot of the run (see runs._export_snapshot)
+# so it can execute in a worker process without a DB session. Each section starts
+# on a new page and renders to its own PDF, so sections can be drawn in parallel.
+
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "1"))
+
+# Embed JPEG bytes as binary streams. ASCII85 makes them 25% larger and, without
+# ReportLab's optional C accelerator, its pure-Python encoder dominates render time.
+rl_config.useA85 = 0
+
+PAGE_W, PAGE_H = A4
+MARGIN_X = 16 * mm
+MARGIN_Y = 16 * mm
+PHOTO_X = MARGIN_X + 10 * mm
+PHOTO_MAX_W = PAGE_W - MARGIN_X - PHOTO_X
+PHOTO_MAX_H = 80 * mm
+
+def print_image_path(image_path: str, dpi: int = PDF_IMAGE_DPI) -> str:
+    """Path of the image to embed: the downscaled print derivative, or the original if dpi is 0."""
+    if not dpi:
+        return image_path
+    return ensure_print_derivative(image_path, PHOTO_MAX_W, PHOTO_MAX_H, dpi) or image_path
+
+def _draw_wrapped(c: canvas.Canvas, text: str, x: float, y: float, max_width_chars: int, line_height: float):
+    for line in textwrap.wrap(text, width=max_width_chars) or [""]:
+        c.drawString(x, y, line)
+        y -= line_height
+    return y
+
+def _draw_embedded_image(
+    c: canvas.Canvas,
+    image_path: str,
+    x: float,
+    y_top: float,
+    max_w: float,
+    max_h: float,
+):
+    image = image_cache.get(image_path, max_w, max_h)
+    c.drawImage(
+        image.reader,
+        x,
+        y_top - image.height,
+        width=image.width,
+        height=image.height,
+        preserveAspectRatio=True,
+        mask="auto",
+    )
+    return y_top - image.height
+
+def _new_page(c: canvas.Canvas, font=("Helvetica", 9)) -> float:
+    c.showPage()
+    c.setFont(*font)
+    return PAGE_H - MARGIN_Y
+
+def export_sections(snapshot: dict) -> List[Tuple[str, int, str]]:
+    """(kind, bucket index, bookmark title) of every section, in document order."""
+    sections = [("cover", -1, "Cover")]
+    if snapshot.get("summary"):
+        sections.append(("summary", -1, "Summary"))
+    if snapshot.get("declaration_checks"):
+        sections.append(("declaration", -1, "Declaration"))
+    for idx, bucket in enumerate(snapshot["template"]["buckets"]):
+        sections.append(("bucket", idx, bucket["title"]))
+    return sections
+
+def _section_weight(snapshot: dict, section) -> int:
+    kind, idx, _ = section
+    if kind != "bucket":
+        return 1
+    return 1 + sum(len(g["questions"]) for g in snapshot["template"]["buckets"][idx]["groups"])
+
+def _draw_cover(c: canvas.Canvas, snapshot: dict):
+    run = snapshot["run"]
+    template = snapshot["template"]
+    margin_x = MARGIN_X
+    line_h = 5 * mm
+    y = PAGE_H - MARGIN_Y
+
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(margin_x, y, "BCQA — PDF Export")
+    y -= 10 * mm
+
+    c.setFont("Helvetica", 10)
+    y = _draw_wrapped(c, f"Site: {run['site_name']}", margin_x, y, 110, line_h)
+    y = _draw_wrapped(c, f"P-Ref: {run['p_ref']}", margin_x, y, 110, line_h)
+    y = _draw_wrapped(c, f"Engineer: {run['engineer_name']}", margin_x, y, 110, line_h)
+    y = _draw_wrapped(c, f"Template: {template['name']} (v{template['version']})", margin_x, y, 110, line_h)
+    y = _draw_wrapped(c, f"Status: {run['status']}", margin_x, y, 110, line_h)
+    y = _draw_wrapped(c, f"Generated: {datetime.utcnow().isoformat()}Z", margin_x, y, 110, line_h)
+
+def _draw_summary(c: canvas.Canvas, snapshot: dict):
+    summary = snapshot["summary"]
+    margin_x = MARGIN_X
+    margin_y = MARGIN_Y
+    line_h = 5 * mm
+    y = PAGE_H - margin_y
+
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(margin_x, y, "Summary")
+    y -= 7 * mm
+    c.setFont("Helvetica", 10)
+    y = _draw_wrapped(
+        c,
+        f"Answered: {summary['answered_questions']}/{summary['total_questions']} "
+        f"({summary['completion_percentage']}%)  Pass: {summary['pass']}  Fail: {summary['fail']}  N/A: {summary['na']}",
+        margin_x,
+        y,
+        110,
+        line_h,
+    )
+    for b in summary["buckets"]:
+        if y < margin_y + 20 * mm:
+            y = _new_page(c, ("Helvetica", 10))
+        y = _draw_wrapped(
+            c,
+            f"{b['title']}: {b['answered']}/{b['total']} answered, {b['passed']} pass, {b['failed']} fail, {b['na']} N/A",
+            margin_x + 6 * mm,
+            y,
+            110,
+            line_h,
+        )
+    if summary["failed_items"]:
+        y -= 2 * mm
+        c.setFont("Helvetica-Bold", 10)
+        y = _draw_wrapped(c, "Failed items", margin_x, y, 110, line_h)
+        c.setFont("Helvetica", 9)
+        for item in summary["failed_items"]:
+            if y < margin_y + 20 * mm:
+                y = _new_page(c)
+            flag = " [CRITICAL]" if item["critical"] else ""
+            y = _draw_wrapped(
+                c,
+                f"{item['question_id']}{flag} ({item['bucket']}) — {item['text']}",
+                margin_x + 6 * mm,
+                y,
+                115,
+                line_h,
+            )
+
+def _draw_declaration(c: canvas.Canvas, snapshot: dict):
+    margin_x = MARGIN_X
+    margin_y = MARGIN_Y
+    line_h = 5 * mm
+    y = PAGE_H - margin_y
+
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(margin_x, y, "Declaration")
+    y -= 7 * mm
+    c.setFont("Helvetica", 10)
+    for label in snapshot["declaration_checks"]:
+        if y < margin_y + 20 * mm:
+            y = _new_page(c, ("Helvetica", 10))
+        y = _draw_wrapped(c, f"[x] {label}", margin_x, y, 120, line_h)
+
+def _draw_bucket(c: canvas.Canvas, snapshot: dict, bucket: dict, image_dpi: int):
+    run = snapshot["run"]
+    answers_map = snapshot["answers"]
+    margin_x = MARGIN_X
+    margin_y = MARGIN_Y
+    line_h = 5 * mm
+    photo_x = PHOTO_X
+    photo_max_w = PHOTO_MAX_W
+    photo_max_h = PHOTO_MAX_H
+    y = PAGE_H - margin_y
+
+    def render_photos(photos, y):
+        if not photos:
+            return y
+        y = _draw_wrapped(
+            c,
+            f"Photos: {len(photos)}",
+            margin_x + 6 * mm,
+            y,
+            110,
+            line_h,
+        )
+        for p in photos:
+            caption = (p.get("caption") or "").strip()
+            y_needed = (6 * mm if caption else 0) + photo_max_h + 8 * mm
+            if y < margin_y + y_needed:
+                y = _new_page(c)
+            if caption:
+                y = _draw_wrapped(c, f"Caption: {caption}", photo_x, y, 115, line_h)
+                y -= 1 * mm
+            try:
+                # Photos in a remote backend are fetched into this process's local mirror
+                local_path = get_storage().local_path(p["file_path"]) if p.get("file_path") else None
+                if not local_path:
+                    raise FileNotFoundError(p.get("file_path") or "")
+                y = _draw_embedded_image(c, print_image_path(local_path, image_dpi), photo_x, y, photo_max_w, photo_max_h)
+                y -= 4 * mm
+            except Exception:
+                y = _draw_wrapped(c, f"Photo: {p.get('url', '')}", photo_x, y, 115, line_h)
+                y -= 2 * mm
+        return y
+
+    c.setFont("Helvetica-Bold", 11)
+    c.drawString(margin_x, y, bucket["title"])
+    y -= 6 * mm
+    c.setFont("Helvetica", 9)
+
+    if bucket["bucket_id"] == "access_points":
+        ap_count = int(run.get("ap_count") or 0)
+        if ap_count > 0:
+            c.setFont("Helvetica-Bold", 10)
+            y = _draw_wrapped(c, "AP Photos", margin_x, y, 120, line_h)
+            c.setFont("Helvetica", 9)
+            for idx in range(1, ap_count + 1):
+                ap_qid = f"AP-PHOTO-{idx}"
+                a_ap = answers_map.get(ap_qid)
+                photos_ap = a_ap["photos"] if a_ap else []
+                if y < margin_y + 20 * mm:
+                    y = _new_page(c)
+                y = _draw_wrapped(c, f"AP {idx}", margin_x + 6 * mm, y, 120, line_h)
+                y = render_photos(photos_ap, y)
+                y -= 3 * mm
+
+    for group in bucket["groups"]:
+        if y < margin_y + 20 * mm:
+            y = _new_page(c)
+
+        c.setFont("Helvetica-Bold", 10)
+        y = _draw_wrapped(c, group["title"], margin_x, y, 120, line_h)
+        c.setFont("Helvetica", 9)
+
+        for q in group["questions"]:
+            a = answers_map.get(q["question_id"])
+            value = a["value"] if a and a["value"] else "—"
+            comment = a["comment"] if a and a["comment"] else ""
+            photos = a["photos"] if a else []
+
+            if y < margin_y + 20 * mm:
+                y = _new_page(c)
+
+            y = _draw_wrapped(
+                c,
+                f"{q['question_id']} — {q['text']}",
+                margin_x,
+                y,
+                120,
+                line_h,
+            )
+            y = _draw_wrapped(c, f"Answer: {value}", margin_x + 6 * mm, y, 110, line_h)
+            if comment:
+                y = _draw_wrapped(c, f"Comment: {comment}", margin_x + 6 * mm, y, 110, line_h)
+            y = render_photos(photos, y)
+
+            y -= 2 * mm
+
+def _render_section(snapshot: dict, section, path: str, image_dpi: int) -> int:
+    """Renders one section to its own PDF and returns its page count. Runs in a pool worker."""
+    kind, idx, _ = section
+    c = canvas.Canvas(path, pagesize=A4)
+    if kind == "cover":
+        _draw_cover(c, snapshot)
+    elif kind == "summary":
+        _draw_summary(c, snapshot)
+    elif kind == "declaration":
+        _draw_declaration(c, snapshot)
+    else:
+        _draw_bucket(c, snapshot, snapshot["template"]["buckets"][idx], image_dpi)
+    pages = c.getPageNumber()
+    c.save()
+    return pages
+
+def _page_number_overlay(total: int) -> PdfReader:
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    for n in range(1, total + 1):
+        c.setFont("Helvetica", 8)
+        c.drawCentredString(PAGE_W / 2, MARGIN_Y / 2, f"Page {n} of {total}")
+        c.showPage()
+    c.save()
+    buf.seek(0)
+    return PdfReader(buf)
+
+def _merge_sections(parts: List[str], titles: List[str], out_path: str):
+    writer = PdfWriter()
+    starts = []
+    for part in parts:
+        starts.append(len(writer.pages))
+        writer.append(part, import_outline=False)
+    # Numbers are stamped after the merge because no section knows its offset while rendering
+    overlay = _page_number_overlay(len(writer.pages))
+    for page, number_page in zip(writer.pages, overlay.pages):
+        page.merge_page(number_page)
+    for title, start in zip(titles, starts):
+        writer.add_outline_item(title, start)
+    writer.page_mode = "/UseOutlines"
+    with open(out_path, "wb") as f:
+        writer.write(f)
+
+def render_run_pdf(
+    snapshot: dict,
+    file_path: str,
+    progress: Optional[Callable[[float], None]] = None,
+    image_dpi: int = PDF_IMAGE_DPI,
+    workers: int = PDF_RENDER_WORKERS,
+    timings: Optional[dict] = None,
+) -> str:
+    """Renders the cover, summary, declaration and each bucket as separate sections,
+    in parallel when `workers` > 1, then merges them with page numbers and bookmarks.
+
+    Seconds spent drawing the sections and merging them are stored in `timings`, if given.
+    """
+    sections = export_sections(snapshot)
+    weights = [_section_weight(snapshot, section) for section in sections]
+    total_weight = float(sum(weights))
+    # Render to temp files and swap the result in so readers never see a half-written PDF
+    tmp_prefix = f"{file_path}.{os.getpid()}"
+    parts = [f"{tmp_prefix}.s{i}.tmp" for i in range(len(sections))]
+    tmp_path = f"{tmp_prefix}.tmp"
+
+    try:
+        started = time.perf_counter()
+        done = 0.0
+        if workers > 1 and len(sections) > 1:
+            # Largest buckets first so one big section does not start last and finish alone
+            order = sorted(range(len(sections)), key=lambda i: -weights[i])
+            # Forked workers start with a copy of this process's image cache; what they
+            # decode themselves is dropped with them
+            with ProcessPoolExecutor(max_workers=min(workers, len(sections))) as pool:
+                futures = {
+                    pool.submit(_render_section, snapshot, sections[i], parts[i], image_dpi): weights[i]
+                    for i in order
+                }
+                for future in as_completed(futures):
+                    future.result()
+                    done += futures[future]
+                    if progress:
+                        progress(done / total_weight)
+        else:
+            for section, part, weight in zip(sections, parts, weights):
+                _render_section(snapshot, section, part, image_dpi)
+                done += weight
+                if progress:
+                    progress(done / total_weight)
+
+        drawn = time.perf_counter()
+        _merge_sections(parts, [title for _, _, title in sections], tmp_path)
+        os.replace(tmp_path, file_path)
+        if timings is not None:
+            timings["reportlab_sections"] = drawn - started
+            timings["pdf_merge"] = time.perf_counter() - drawn
+    finally:
+        for path in parts + [tmp_path]:
+            if os.path.exists(path):
+                os.remove(path)
+    return file_path
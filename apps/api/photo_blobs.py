@@ -0,0 +1,116 @@
+import hashlib
+import os
+from typing import BinaryIO, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.orm import Session
+
+from .database import dialect_insert
+from .models import PhotoBlob
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+class BlobRef(NamedTuple):
+    key: str
+    thumbnail_url: Optional[str]
+    created: bool # This reference created the blob, so its bytes still have to be stored
+
+def copy_and_hash(src: BinaryIO, dst: BinaryIO) -> Tuple[str, int]:
+    """Copies `src` to `dst` in chunks, returning the SHA-256 hex digest and size of what was copied."""
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = src.read(HASH_CHUNK_BYTES)
+        if not chunk:
+            break
+        digest.update(chunk)
+        size += len(chunk)
+        dst.write(chunk)
+    return digest.hexdigest(), size
+
+def hash_file(path: str) -> Tuple[str, int]:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest(), os.path.getsize(path)
+
+def blob_key(sha256: str, ext: str) -> str:
+    return f"uploads/{sha256}{ext}"
+
+def thumbnail_key(key: str) -> str:
+    """Where the thumbnail for the photo file at `key` lives; shared by every photo using that file."""
+    stem = os.path.splitext(os.path.basename(key))[0]
+    return f"uploads/{stem}_thumb.jpg"
+
+def find_blob(db: Session, sha256: str) -> Optional[PhotoBlob]:
+    return db.query(PhotoBlob).filter(PhotoBlob.sha256 == sha256).first()
+
+def add_reference(db: Session, sha256: str, key: str, size: int, content_type: Optional[str]) -> BlobRef:
+    """Counts one more photo using the content `sha256`, creating its blob at `key` if it is new.
+
+    An existing blob keeps its own key. The row stays locked until the caller
+    commits, so a concurrent drop_released() cannot delete the bytes in
+    between. Taking back a released blob counts as creating it: its files
+    may already be going, so the bytes are stored again.
+    """
+    insert = dialect_insert(db)
+    stmt = insert(PhotoBlob).values(sha256=sha256, key=key, size=size, content_type=content_type, ref_count=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PhotoBlob.sha256],
+        set_={"ref_count": PhotoBlob.ref_count + 1},
+    )
+    row = db.execute(stmt.returning(PhotoBlob.key, PhotoBlob.thumbnail_url, PhotoBlob.ref_count)).one()
+    return BlobRef(row.key, row.thumbnail_url, row.ref_count == 1)
+
+def release_reference(db: Session, key: str) -> Optional[int]:
+    """Drops one reference to the blob stored at `key` and returns how many are left.
+
+    At zero the row stays, so an upload of the same content meanwhile can
+    take it back; once committed, drop_released() deletes it if none did.
+    Returns None for photos stored before deduplication, whose files belong
+    to that photo alone.
+    """
+    stmt = (
+        update(PhotoBlob)
+        .where(PhotoBlob.key == key)
+        .values(ref_count=PhotoBlob.ref_count - 1)
+        .returning(PhotoBlob.ref_count)
+    )
+    remaining = db.execute(stmt, execution_options={"synchronize_session": False}).scalar()
+    if remaining is None:
+        return None
+    return max(remaining, 0)
+
+def drop_released(db: Session, key: str) -> bool:
+    """Deletes the blob at `key` if no photo has taken it back since it was released.
+
+    True means its files can go: remove them, then commit. The row stays
+    locked until then, so an upload of the same content waits and stores
+    the bytes again rather than sharing files that are being deleted.
+    """
+    stmt = delete(PhotoBlob).where(PhotoBlob.key == key, PhotoBlob.ref_count <= 0)
+    return db.execute(stmt, execution_options={"synchronize_session": False}).rowcount > 0
+
+def set_thumbnail(db: Session, key: str, thumbnail_url: str) -> bool:
+    """Records the shared thumbnail for the blob at `key`; False if the blob no longer exists."""
+    stmt = update(PhotoBlob).where(PhotoBlob.key == key).values(thumbnail_url=thumbnail_url)
+    return db.execute(stmt, execution_options={"synchronize_session": False}).rowcount > 0
+
+def dedup_stats(db: Session) -> dict:
+    """How many bytes sharing blobs saves, versus storing every photo reference separately."""
+    blobs, references, stored, referenced = db.query(
+        func.count(PhotoBlob.sha256),
+        func.coalesce(func.sum(PhotoBlob.ref_count), 0),
+        func.coalesce(func.sum(PhotoBlob.size), 0),
+        func.coalesce(func.sum(PhotoBlob.size * PhotoBlob.ref_count), 0),
+    ).filter(PhotoBlob.ref_count > 0).one()
+    return {
+        "blobs": blobs,
+        "references": references,
+        "duplicate_references": references - blobs,
+        "stored_bytes": stored,
+        "referenced_bytes": referenced,
+        "saved_bytes": referenced - stored,
+        "saved_ratio": ((referenced - stored) / referenced) if referenced else 0.0,
+    }
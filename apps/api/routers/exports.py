@@ -0,0 +1,74 @@
+import os
+import re
+
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import RedirectResponse
+
+from ..export_cache import export_cache
+from ..export_jobs import ExportJob, get_job, render_image_stats, JOB_DONE
+from ..http_cache import file_response
+from ..schemas import ExportJobResponse
+from ..storage import get_storage
+
+router = APIRouter(prefix="/exports", tags=["exports"])
+
+# Cached exports are named by fingerprint, so a given file never changes
+EXPORT_CACHE_CONTROL = "private, max-age=31536000, immutable"
+_EXPORT_NAME = re.compile(r"^run_[0-9a-f-]{36}_([0-9a-f]{64})\.pdf$")
+
+def job_response(job: ExportJob) -> ExportJobResponse:
+    response = ExportJobResponse.model_validate(job)
+    if job.status != JOB_DONE:
+        # Only hand out the URL once the file is complete
+        response.pdf_url = None
+    return response
+
+def pdf_response(request: Request, file_path: str):
+    """Streams a cached export; GET requests may ask for byte ranges.
+
+    An export this node does not have locally is redirected to the storage
+    backend's copy when the backend is remote.
+    """
+    filename = os.path.basename(file_path)
+    match = _EXPORT_NAME.match(filename)
+    if not match:
+        raise HTTPException(status_code=404, detail="Export not found")
+    if not export_cache.touch(file_path):
+        storage = get_storage()
+        key = export_cache.storage_key(filename)
+        if not storage.is_local and storage.exists(key):
+            return RedirectResponse(storage.download_url(key), status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+        raise HTTPException(status_code=404, detail="Export not found")
+    response = file_response(
+        request,
+        file_path,
+        "application/pdf",
+        f'"{match.group(1)}"',
+        EXPORT_CACHE_CONTROL,
+        {"Content-Disposition": f'inline; filename="{filename}"'},
+    )
+    if response.status_code == 404:
+        raise HTTPException(status_code=404, detail="Export not found")
+    return response
+
+@router.get("/jobs/{job_id}", response_model=ExportJobResponse)
+def get_export_job(job_id: str):
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job_response(job)
+
+@router.get("/cache/stats")
+def get_export_cache_stats():
+    return {**export_cache.stats(), "images": render_image_stats()}
+
+@router.post("/cache/gc")
+def collect_export_cache():
+    """Deletes exports past the age limit, then evicts by size."""
+    return export_cache.gc()
+
+@router.get("/{filename}")
+def download_export(filename: str, request: Request):
+    if not _EXPORT_NAME.match(filename):
+        raise HTTPException(status_code=404, detail="Export not found")
+    return pdf_response(request, os.path.join(export_cache.directory, filename))
@@ -1,4 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from ..database import pool_stats, reset_pool_peaks
+from ..metrics import METRICS_ENABLED, render_metrics
 
 router = APIRouter(tags=["health"])
 
@@ -9,3 +13,38 @@ def healthz():
 @router.get("/readyz")
 def readyz():
     return {"status": "ready"}
+
+@router.get("/db/pool/stats")
+def db_pool_stats():
+    """Connection pool utilisation for the sync engine and, with DB_ASYNC, the async one."""
+    return pool_stats()
+
+@router.post("/db/pool/stats:reset")
+def reset_db_pool_stats():
+    """Starts a new peak measurement window, e.g. at the start of a load test."""
+    reset_pool_peaks()
+    return pool_stats()
+
+POOL_GAUGES = {
+    "checked_out": "Connections currently checked out of the pool.",
+    "peak_checked_out": "Most connections checked out at once since the last reset.",
+    "capacity": "Pool size plus overflow.",
+}
+
+def _pool_metrics() -> str:
+    lines = []
+    pools = pool_stats()
+    for field, help in POOL_GAUGES.items():
+        name = f"bcqa_db_pool_{field}"
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+        for engine_name, stats in pools.items():
+            if stats is not None and stats[field] is not None:
+                lines.append(f'{name}{{engine="{engine_name}"}} {stats[field]}')
+    return "\n".join(lines)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of the METRICS_ENABLED instrumentation."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(render_metrics([_pool_metrics()]), media_type="text/plain; version=0.0.4")
@@ -1,60 +1,79 @@
-from fastapi import APIRouter, Depends, HTTPException, Response, status, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
 from uuid import UUID, uuid4
-from typing import List, Optional
+from typing import List, NamedTuple, Optional
+from datetime import date, datetime, timezone
+import base64
 import os
-import shutil
-from datetime import datetime
-import textwrap
+import time
 from mimetypes import guess_extension
+from operator import itemgetter
 from urllib.parse import urlparse
 
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
-from reportlab.lib.utils import ImageReader
 from PIL import Image, ImageOps
-
-from ..database import get_db
-from ..models import ChecklistRun, ChecklistAnswer, ChecklistPhoto
-from ..schemas import RunCreate, RunUpdate, RunResponse, AnswerCreate, AnswerResponse, PhotoResponse, ExportRequest, ExportResponse
+from checklist_engine import RunSummary
+
+from ..database import SessionRunner, get_db, get_db_runner, SessionLocal, dialect_insert
+from ..models import ChecklistRun, ChecklistAnswer, ChecklistPhoto, ChecklistRunStats
+from ..photo_blobs import add_reference, blob_key, copy_and_hash, drop_released, hash_file, release_reference, set_thumbnail, thumbnail_key
+from ..run_stats import refresh_run_stats
+from ..run_changes import ENTITY_ANSWER, ENTITY_PHOTO, ENTITY_RUN, delete_run_changes, record_changes
+from ..schemas import RunCreate, RunUpdate, RunResponse, RunStatsResponse, RunListItem, AnswerCreate, AnswerResponse, AnswerBatchRequest, AnswerBatchResult, AnswerBatchResponse, PhotoResponse, PhotoPresignRequest, PhotoPresignResponse, PhotoCompleteRequest, ExportRequest, ExportJobResponse
+from ..export_cache import export_cache, run_fingerprint
+from ..export_jobs import EXPORT_STREAM_TIMEOUT, JOB_FAILED, completed_export, find_active, submit_export
+from ..images import PHOTO_MAX_BYTES, SNIFF_BYTES, remove_print_derivative, sniff_image_type, submit_image_task
+from ..metrics import timed
+from ..pdf_render import print_image_path
+from ..storage import STORAGE_URL_EXPIRES, Storage, get_storage, read_token, sign_token
 from .templates import loader # Reuse the loader instance
+from .exports import job_response, pdf_response
 
 router = APIRouter(prefix="/runs", tags=["runs"])
 
+API_URL = os.getenv("API_URL", "http://localhost:8000")
+# How long after its upload URL expires a presigned upload can still be completed
+UPLOAD_COMPLETE_GRACE = int(os.getenv("UPLOAD_COMPLETE_GRACE", str(24 * 3600)))
+
+IMAGE_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/jpg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "image/heic": ".heic",
+    "image/heif": ".heif",
+    "image/bmp": ".bmp",
+    "image/tiff": ".tiff",
+}
+
+def _normalized_content_type(content_type: Optional[str]) -> str:
+    return (content_type or "").split(";")[0].strip().lower()
+
 def _normalized_image_extension(filename: Optional[str], content_type: Optional[str]) -> str:
     ext = os.path.splitext(filename or "")[1].lower()
     if ext in {".jpg", ".jpeg", ".png", ".webp", ".gif", ".heic", ".heif", ".bmp", ".tif", ".tiff"}:
         return ".jpg" if ext == ".jpeg" else ext
 
-    ct = (content_type or "").split(";")[0].strip().lower()
-    ct_map = {
-        "image/jpeg": ".jpg",
-        "image/jpg": ".jpg",
-        "image/png": ".png",
-        "image/webp": ".webp",
-        "image/gif": ".gif",
-        "image/heic": ".heic",
-        "image/heif": ".heif",
-        "image/bmp": ".bmp",
-        "image/tiff": ".tiff",
-    }
-    if ct in ct_map:
-        return ct_map[ct]
+    ct = _normalized_content_type(content_type)
+    if ct in IMAGE_EXTENSIONS:
+        return IMAGE_EXTENSIONS[ct]
 
     guessed = guess_extension(ct) or ""
     if guessed == ".jpe":
         return ".jpg"
     return guessed
 
-def _uploads_file_path_from_url(url: Optional[str]) -> Optional[str]:
+def _upload_key_from_url(url: Optional[str]) -> Optional[str]:
     if not url:
         return None
     try:
         parsed = urlparse(url)
         path = parsed.path if parsed.scheme else url
         if path.startswith("/uploads/"):
-            return os.path.join("uploads", path[len("/uploads/"):])
+            return "uploads/" + path[len("/uploads/"):]
         return None
     except Exception:
         return None
@@ -73,6 +92,29 @@ def _try_make_thumbnail(src_path: str, thumb_path: str, size: int = 512) -> bool
     except Exception:
         return False
 
+def _summary_view(summary: RunSummary) -> dict:
+    totals = summary.totals
+    return {
+        "total_questions": totals.total,
+        "answered_questions": totals.answered,
+        "completion_percentage": totals.completion_percentage,
+        "pass": totals.passed,
+        "fail": totals.failed,
+        "na": totals.na,
+        "failed": list(summary.failed),
+        "failed_critical": list(summary.failed_critical),
+        "required_missing": list(summary.required_missing),
+    }
+
+def _load_answers_with_photos(db: Session, run_id: UUID) -> List[ChecklistAnswer]:
+    # One query for answers plus one IN-query for all their photos, instead of a lazy load per answer
+    return (
+        db.query(ChecklistAnswer)
+        .options(selectinload(ChecklistAnswer.photos))
+        .filter(ChecklistAnswer.run_id == run_id)
+        .all()
+    )
+
 @router.post("/", response_model=RunResponse)
 def create_run(run_in: RunCreate, db: Session = Depends(get_db)):
     # Verify template exists
@@ -82,6 +124,8 @@ def create_run(run_in: RunCreate, db: Session = Depends(get_db)):
 
     db_run = ChecklistRun(**run_in.dict())
     db.add(db_run)
+    db.flush()
+    record_changes(db, db_run.id, ENTITY_RUN, [db_run.id])
     db.commit()
     db.refresh(db_run)
     return db_run
@@ -118,15 +162,110 @@ def update_run(run_id: UUID, run_in: RunUpdate, db: Session = Depends(get_db)):
         run.ap_count = run_in.ap_count
     if run_in.address is not None:
         run.address = run_in.address
-        
+
+    db.flush()
+    record_changes(db, run_id, ENTITY_RUN, [run_id])
     db.commit()
     db.refresh(run)
     return run
 
-@router.get("/", response_model=List[RunResponse])
-def list_runs(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    runs = db.query(ChecklistRun).offset(skip).limit(limit).all()
-    return runs
+def _run_stats_view(run: ChecklistRun, stats: Optional[ChecklistRunStats]) -> RunStatsResponse:
+    template = loader.get_template(run.template_id)
+    total = template.index.total if template else 0
+    answered = stats.answered if stats else 0
+    return RunStatsResponse(
+        total_questions=total,
+        answered_questions=answered,
+        completion_percentage=int((answered / total * 100) if total > 0 else 0),
+        pass_count=stats.pass_count if stats else 0,
+        fail_count=stats.fail_count if stats else 0,
+        na_count=stats.na_count if stats else 0,
+        photo_count=stats.photo_count if stats else 0,
+        last_activity_at=stats.last_activity_at if stats else None,
+    )
+
+def _encode_cursor(run: ChecklistRun) -> str:
+    raw = f"{run.created_at.isoformat()}|{run.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def _decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, run_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), UUID(run_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/", response_model=List[RunListItem])
+async def list_runs(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    status: Optional[str] = None,
+    template_id: Optional[str] = None,
+    p_ref: Optional[str] = None,
+    engineer_name: Optional[str] = None,
+    visit_date_from: Optional[date] = None,
+    visit_date_to: Optional[date] = None,
+    include: Optional[str] = None,
+    db: SessionRunner = Depends(get_db_runner),
+):
+    """Runs newest first. Pass the X-Next-Cursor header of one page as `cursor` to get the next."""
+    return await db.run(
+        _list_runs, response, limit, cursor, skip, status, template_id, p_ref,
+        engineer_name, visit_date_from, visit_date_to, include,
+    )
+
+def _list_runs(
+    db: Session, response: Response, limit, cursor, skip, status, template_id, p_ref,
+    engineer_name, visit_date_from, visit_date_to, include,
+) -> List[RunListItem]:
+    includes = {part.strip() for part in (include or "").split(",") if part.strip()}
+    with_stats = "stats" in includes
+
+    if with_stats:
+        # One round trip: runs joined to their precomputed stats rows (missing row = no activity yet)
+        q = db.query(ChecklistRun, ChecklistRunStats).outerjoin(
+            ChecklistRunStats, ChecklistRunStats.run_id == ChecklistRun.id
+        )
+    else:
+        q = db.query(ChecklistRun)
+
+    if status is not None:
+        q = q.filter(ChecklistRun.status == status)
+    if template_id is not None:
+        q = q.filter(ChecklistRun.template_id == template_id)
+    if p_ref is not None:
+        q = q.filter(ChecklistRun.p_ref == p_ref)
+    if engineer_name is not None:
+        q = q.filter(ChecklistRun.engineer_name == engineer_name)
+    if visit_date_from is not None:
+        q = q.filter(ChecklistRun.visit_date >= visit_date_from)
+    if visit_date_to is not None:
+        q = q.filter(ChecklistRun.visit_date <= visit_date_to)
+
+    if cursor:
+        created_at, run_id = _decode_cursor(cursor)
+        q = q.filter(tuple_(ChecklistRun.created_at, ChecklistRun.id) < tuple_(created_at, run_id))
+    q = q.order_by(ChecklistRun.created_at.desc(), ChecklistRun.id.desc())
+    if skip and not cursor:
+        # Legacy offset paging; cost grows with skip
+        q = q.offset(skip)
+
+    # Fetch one extra row to learn whether another page exists
+    rows = q.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0] if with_stats else rows[-1]
+        response.headers["X-Next-Cursor"] = _encode_cursor(last)
+
+    if not with_stats:
+        return [RunListItem.model_validate(run) for run in rows]
+    return [
+        RunListItem(**RunResponse.model_validate(run).model_dump(), stats=_run_stats_view(run, stats))
+        for run, stats in rows
+    ]
 
 
 @router.delete("/{run_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -138,12 +277,26 @@ def delete_run(run_id: UUID, db: Session = Depends(get_db)):
     if run.status != "draft":
         raise HTTPException(status_code=400, detail="Only draft runs can be deleted")
 
+    photos = (
+        db.query(ChecklistPhoto)
+        .join(ChecklistAnswer, ChecklistPhoto.answer_id == ChecklistAnswer.id)
+        .filter(ChecklistAnswer.run_id == run_id)
+        .all()
+    )
+    db.query(ChecklistRunStats).filter(ChecklistRunStats.run_id == run_id).delete()
+    delete_run_changes(db, run_id)
     db.delete(run)
+    db.flush()
+    released = [_release_photo_files(db, photo) for photo in photos]
     db.commit()
+    _delete_released_files(db, get_storage(), released)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 @router.get("/{run_id}")
-def get_run_details(run_id: UUID, db: Session = Depends(get_db)):
+async def get_run_details(run_id: UUID, db: SessionRunner = Depends(get_db_runner)):
+    return await db.run(_run_details, run_id)
+
+def _run_details(db: Session, run_id: UUID) -> dict:
     run = db.query(ChecklistRun).filter(ChecklistRun.id == run_id).first()
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
@@ -154,29 +307,20 @@ def get_run_details(run_id: UUID, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Template definition missing")
 
     # Fetch answers
-    answers = db.query(ChecklistAnswer).filter(ChecklistAnswer.run_id == run_id).all()
-    answers_map = {a.question_id: a for a in answers}
+    answers = _load_answers_with_photos(db, run_id)
+    summary = template.progress.summarize({a.question_id: a.value for a in answers})
     
     # Calculate progress per bucket
     buckets_view = []
     for bucket in template.buckets:
-        total = 0
-        answered = 0
-        for group in bucket.groups:
-            for q in group.questions:
-                total += 1
-                if q.question_id in answers_map and answers_map[q.question_id].value:
-                    answered += 1
-        
-        pct = int((answered / total * 100) if total > 0 else 0)
-        
+        tally = summary.buckets[bucket.bucket_id]
         buckets_view.append({
             "bucket_id": bucket.bucket_id,
             "title": bucket.title,
             "icon": bucket.icon or template.ui.default_bucket_icon,
-            "completion_percentage": pct,
-            "total_questions": total,
-            "answered_questions": answered
+            "completion_percentage": tally.completion_percentage,
+            "total_questions": tally.total,
+            "answered_questions": tally.answered
         })
     
     # Convert answers to simpler dict for frontend
@@ -204,11 +348,23 @@ def get_run_details(run_id: UUID, db: Session = Depends(get_db)):
             "version": template.meta.version
         },
         "buckets": buckets_view,
+        "summary": _summary_view(summary),
         "answers": answers_data
     }
 
 @router.post("/{run_id}/answers", response_model=AnswerResponse)
-def update_answer(run_id: UUID, answer_in: AnswerCreate, db: Session = Depends(get_db)):
+async def update_answer(run_id: UUID, answer_in: AnswerCreate, db: SessionRunner = Depends(get_db_runner)):
+    return await db.run(_update_answer, run_id, answer_in)
+
+def _update_answer(db: Session, run_id: UUID, answer_in: AnswerCreate) -> AnswerResponse:
+    try:
+        return _save_answer(db, run_id, answer_in)
+    except IntegrityError:
+        # A concurrent request created the answer first; this time we update it
+        db.rollback()
+        return _save_answer(db, run_id, answer_in)
+
+def _save_answer(db: Session, run_id: UUID, answer_in: AnswerCreate) -> AnswerResponse:
     run = db.query(ChecklistRun).filter(ChecklistRun.id == run_id).first()
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
@@ -232,23 +388,120 @@ def update_answer(run_id: UUID, answer_in: AnswerCreate, db: Session = Depends(g
         )
         db.add(db_answer)
         
+    db.flush()
+    record_changes(db, run_id, ENTITY_ANSWER, [db_answer.id])
+    refresh_run_stats(db, run_id)
     db.commit()
     db.refresh(db_answer)
-    return db_answer
+    return AnswerResponse.model_validate(db_answer)
 
-@router.post("/{run_id}/questions/{question_id}/photos", response_model=PhotoResponse)
-async def upload_photo(
-    run_id: UUID, 
-    question_id: str, 
-    file: UploadFile = File(...), 
-    db: Session = Depends(get_db)
-):
-    # Ensure answer exists
+ANSWER_VALUES = {"pass", "fail", "na"}
+UPSERT_CHUNK_SIZE = 1000
+
+def _upsert_insert(db: Session):
+    try:
+        return dialect_insert(db)
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+def question_validator(run: ChecklistRun, template):
+    """A predicate for question ids that can be answered in `run`: template questions plus its AP photo slots."""
+    ap_count = int(run.ap_count or 0)
+
+    def is_valid_question(question_id: str) -> bool:
+        if question_id in template.index:
+            return True
+        if question_id.startswith("AP-PHOTO-"):
+            suffix = question_id[len("AP-PHOTO-"):]
+            return suffix.isdigit() and 1 <= int(suffix) <= ap_count
+        return False
+
+    return is_valid_question
+
+@router.put("/{run_id}/answers:batch", response_model=AnswerBatchResponse)
+async def update_answers_batch(run_id: UUID, batch: AnswerBatchRequest, db: SessionRunner = Depends(get_db_runner)):
+    return await db.run(_update_answers_batch, run_id, batch)
+
+def _update_answers_batch(db: Session, run_id: UUID, batch: AnswerBatchRequest) -> AnswerBatchResponse:
+    run = db.query(ChecklistRun).filter(ChecklistRun.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+
+    template = loader.get_template(run.template_id)
+    if not template:
+        raise HTTPException(status_code=500, detail="Template definition missing")
+
+    is_valid_question = question_validator(run, template)
+
+    # Validate per item and fold repeats of a question in order, so each row is written once
+    results: List[Optional[AnswerBatchResult]] = []
+    merged = {}
+    for item in batch.answers:
+        if not is_valid_question(item.question_id):
+            results.append(AnswerBatchResult(question_id=item.question_id, status="invalid", detail="Unknown question_id"))
+            continue
+        if item.value is not None and item.value not in ANSWER_VALUES:
+            results.append(AnswerBatchResult(question_id=item.question_id, status="invalid", detail=f"Invalid value: {item.value}"))
+            continue
+        results.append(None)
+        row = merged.setdefault(item.question_id, {"question_id": item.question_id, "value": None, "comment": None})
+        if item.value is not None:
+            row["value"] = item.value
+        if item.comment is not None:
+            row["comment"] = item.comment
+
+    applied = {}
+    if merged:
+        insert = _upsert_insert(db)
+        # Rows lock in the order written; a fixed order keeps overlapping batches from deadlocking
+        rows = sorted(merged.values(), key=itemgetter("question_id"))
+        for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            stmt = insert(ChecklistAnswer).values([
+                {"id": uuid4(), "run_id": run_id, **row}
+                for row in rows[start:start + UPSERT_CHUNK_SIZE]
+            ])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ChecklistAnswer.run_id, ChecklistAnswer.question_id],
+                set_={
+                    # Same partial-update semantics as update_answer: omitted fields keep their value
+                    "value": func.coalesce(stmt.excluded.value, ChecklistAnswer.value),
+                    "comment": func.coalesce(stmt.excluded.comment, ChecklistAnswer.comment),
+                    "updated_at": func.now(),
+                },
+            ).returning(
+                ChecklistAnswer.id,
+                ChecklistAnswer.question_id,
+                ChecklistAnswer.value,
+                ChecklistAnswer.comment,
+                ChecklistAnswer.updated_at,
+            )
+            for r in db.execute(stmt):
+                applied[r.question_id] = r
+        record_changes(db, run_id, ENTITY_ANSWER, [r.id for r in applied.values()])
+        refresh_run_stats(db, run_id)
+        db.commit()
+
+    for idx, item in enumerate(batch.answers):
+        if results[idx] is None:
+            r = applied[item.question_id]
+            results[idx] = AnswerBatchResult(
+                question_id=r.question_id,
+                status="ok",
+                id=r.id,
+                value=r.value,
+                comment=r.comment,
+                updated_at=r.updated_at,
+            )
+
+    rejected = sum(1 for r in results if r.status != "ok")
+    return AnswerBatchResponse(applied=len(results) - rejected, rejected=rejected, results=results)
+
+def _get_or_create_answer(db: Session, run_id: UUID, question_id: str) -> ChecklistAnswer:
     db_answer = db.query(ChecklistAnswer).filter(
         ChecklistAnswer.run_id == run_id,
         ChecklistAnswer.question_id == question_id
     ).first()
-    
+
     if not db_answer:
         db_answer = ChecklistAnswer(
             run_id=run_id,
@@ -256,41 +509,257 @@ async def upload_photo(
             value=None
         )
         db.add(db_answer)
+        db.flush()
+        record_changes(db, run_id, ENTITY_ANSWER, [db_answer.id])
         db.commit()
         db.refresh(db_answer)
-        
-    # Save file
-    UPLOAD_DIR = "uploads"
-    if not os.path.exists(UPLOAD_DIR):
-        os.makedirs(UPLOAD_DIR)
-        
-    file_id = str(uuid4())
+    return db_answer
+
+def _add_photo(db: Session, db_photo: ChecklistPhoto, run_id: UUID) -> ChecklistPhoto:
+    db.add(db_photo)
+    db.flush()
+    record_changes(db, run_id, ENTITY_PHOTO, [db_photo.id])
+    refresh_run_stats(db, run_id)
+    db.commit()
+    db.refresh(db_photo)
+    return db_photo
+
+def _store_thumbnail(storage: Storage, src_path: str, thumb_key: str) -> bool:
+    tmp_path = f"{storage.cached_path(thumb_key)}.{uuid4().hex}.tmp"
+    os.makedirs(os.path.dirname(tmp_path) or ".", exist_ok=True)
+    try:
+        with timed("pil_thumbnail"):
+            made = _try_make_thumbnail(src_path, tmp_path)
+        if not made:
+            return False
+        storage.put_file(thumb_key, tmp_path, "image/jpeg")
+        return True
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _generate_photo_derivatives(photo_id: UUID, key: str):
+    # Runs on the image pool after the upload response has been sent
+    storage = get_storage()
+    thumb_key = thumbnail_key(key)
+    thumbnail_url = f"/uploads/{os.path.basename(thumb_key)}"
+    src_path = storage.local_path(key)
+    made_thumb = bool(src_path) and _store_thumbnail(storage, src_path, thumb_key)
+    if src_path:
+        # Pre-render the downscaled copy the PDF export embeds
+        with timed("pil_print_derivative"):
+            print_image_path(src_path)
+
+    db = SessionLocal()
+    try:
+        photo = db.query(ChecklistPhoto).filter(ChecklistPhoto.id == photo_id).first()
+        blob_exists = set_thumbnail(db, key, thumbnail_url) if made_thumb else True
+        if not photo and not blob_exists:
+            # Deleted while we were working; don't leave orphaned derivatives behind
+            storage.delete(thumb_key)
+            remove_print_derivative(storage.cached_path(key))
+            return
+        if made_thumb and photo:
+            photo.thumbnail_url = thumbnail_url
+            record_changes(db, photo.answer.run_id, ENTITY_PHOTO, [photo.id], derived=True)
+        db.commit()
+    finally:
+        db.close()
+
+def _delete_photo_files(storage: Storage, key: str, thumb_key: Optional[str]):
+    storage.delete(key)
+    remove_print_derivative(storage.cached_path(key))
+    if thumb_key and thumb_key != key:
+        storage.delete(thumb_key)
+
+class ReleasedFiles(NamedTuple):
+    key: str
+    thumb_key: Optional[str]
+    shared: bool # Stored as a blob, which an upload of the same content can take back
+
+def _release_photo_files(db: Session, photo: ChecklistPhoto) -> Optional[ReleasedFiles]:
+    """Drops the photo's reference to its file; returns the files to delete if it was the last one.
+
+    Pass what it returns to _delete_released_files() after committing the
+    photo's deletion, so a failed or retried transaction keeps the files.
+    """
+    remaining = release_reference(db, photo.file_path)
+    if remaining is None:
+        return ReleasedFiles(photo.file_path, _upload_key_from_url(photo.thumbnail_url), False)
+    if remaining == 0:
+        return ReleasedFiles(photo.file_path, thumbnail_key(photo.file_path), True)
+    return None
+
+def _delete_released_files(db: Session, storage: Storage, released: List[Optional[ReleasedFiles]]):
+    """Deletes the files _release_photo_files() released, once their photos' deletion is committed."""
+    for r in released:
+        if r is None:
+            continue
+        if r.shared and not drop_released(db, r.key):
+            # An upload of the same content took the blob back
+            continue
+        _delete_photo_files(storage, r.key, r.thumb_key)
+    db.commit()
+
+def _spool_upload(src, tmp_path: str):
+    os.makedirs(os.path.dirname(tmp_path) or ".", exist_ok=True)
+    with timed("upload_spool"), open(tmp_path, "wb") as dst:
+        return copy_and_hash(src, dst)
+
+def _add_deduplicated_photo(
+    db: Session, run_id: UUID, question_id: str, photo_id: UUID, sha256: str, size: int,
+    key: str, content_type: Optional[str], tmp_path: str,
+) -> ChecklistPhoto:
+    db_answer = _get_or_create_answer(db, run_id, question_id)
+    ref = add_reference(db, sha256, key, size, content_type)
+    if ref.created:
+        get_storage().put_file(ref.key, tmp_path, content_type)
+
+    url = f"/uploads/{os.path.basename(ref.key)}"
+    # thumbnail_url falls back to the original until the shared thumbnail is ready
+    db_photo = ChecklistPhoto(
+        id=photo_id,
+        answer_id=db_answer.id,
+        url=url,
+        file_path=ref.key,
+        thumbnail_url=ref.thumbnail_url or url,
+    )
+    db_photo = _add_photo(db, db_photo, run_id)
+    if not ref.thumbnail_url:
+        submit_image_task(_generate_photo_derivatives, db_photo.id, ref.key)
+    return db_photo
+
+@router.post("/{run_id}/questions/{question_id}/photos", response_model=PhotoResponse)
+async def upload_photo(
+    run_id: UUID, 
+    question_id: str, 
+    file: UploadFile = File(...), 
+    db: Session = Depends(get_db)
+):
+    storage = get_storage()
+    photo_id = uuid4()
     file_ext = _normalized_image_extension(file.filename, file.content_type)
-    filename = f"{file_id}{file_ext}"
-    file_path = os.path.join(UPLOAD_DIR, filename)
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    url = f"/uploads/{filename}"
 
-    thumb_filename = f"{file_id}_thumb.jpg"
-    thumb_path = os.path.join(UPLOAD_DIR, thumb_filename)
-    thumbnail_url = f"/uploads/{thumb_filename}" if _try_make_thumbnail(file_path, thumb_path) else url
-    
-    # Create Photo record
+    # Hash while copying out of the spooled upload; identical content is stored once,
+    # under its hash, and shared by every photo that uses it
+    tmp_path = f"{storage.cached_path(f'uploads/{photo_id}')}.tmp"
+    try:
+        sha256, size = await run_in_threadpool(_spool_upload, file.file, tmp_path)
+        # Blocking work (DB, storage) goes to the threadpool so the event loop keeps serving other requests
+        return await run_in_threadpool(
+            _add_deduplicated_photo, db, run_id, question_id, photo_id, sha256, size,
+            blob_key(sha256, file_ext), file.content_type, tmp_path,
+        )
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+@router.post("/{run_id}/questions/{question_id}/photos:presign", response_model=PhotoPresignResponse)
+def presign_photo_upload(run_id: UUID, question_id: str, upload: PhotoPresignRequest, db: Session = Depends(get_db)):
+    """Issues a short-lived URL the client PUTs the photo to directly, bypassing the API.
+
+    The photo only exists once the client calls photos:complete with the returned token.
+    """
+    if not db.query(ChecklistRun.id).filter(ChecklistRun.id == run_id).first():
+        raise HTTPException(status_code=404, detail="Run not found")
+    content_type = _normalized_content_type(upload.content_type)
+    if content_type == "image/jpg":
+        content_type = "image/jpeg"
+    if content_type not in IMAGE_EXTENSIONS:
+        raise HTTPException(status_code=415, detail=f"Unsupported content type: {upload.content_type}")
+    if upload.size_bytes is not None and not 0 < upload.size_bytes <= PHOTO_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Photos must be between 1 byte and {PHOTO_MAX_BYTES} bytes")
+
+    photo_id = uuid4()
+    key = f"uploads/{photo_id}{IMAGE_EXTENSIONS[content_type]}"
+    target = get_storage().presign_upload(key, content_type)
+    upload_url = target.url if urlparse(target.url).scheme else f"{API_URL}{target.url}"
+    token = sign_token(
+        {
+            "run_id": str(run_id),
+            "question_id": question_id,
+            "photo_id": str(photo_id),
+            "key": key,
+            "content_type": content_type,
+            "size_bytes": upload.size_bytes,
+        },
+        target.expires_at + UPLOAD_COMPLETE_GRACE,
+    )
+    return PhotoPresignResponse(
+        photo_id=photo_id,
+        object_key=key,
+        upload_url=upload_url,
+        method=target.method,
+        headers=target.headers,
+        expires_at=datetime.fromtimestamp(target.expires_at, timezone.utc),
+        upload_token=token,
+    )
+
+_HEIF_TYPES = {"image/heic", "image/heif"}
+
+def _reject_upload(storage: Storage, key: str, status_code: int, detail: str):
+    # The client has to presign again; don't keep bytes nothing will reference
+    storage.delete(key)
+    raise HTTPException(status_code=status_code, detail=detail)
+
+@router.post("/{run_id}/questions/{question_id}/photos:complete", response_model=PhotoResponse)
+def complete_photo_upload(run_id: UUID, question_id: str, done: PhotoCompleteRequest, db: Session = Depends(get_db)):
+    """Registers a photo uploaded via photos:presign once its bytes check out. Safe to retry."""
+    claims = read_token(done.upload_token)
+    if (
+        claims is None
+        or claims.get("run_id") != str(run_id)
+        or claims.get("question_id") != question_id
+        or claims.get("photo_id") != str(done.photo_id)
+    ):
+        raise HTTPException(status_code=403, detail="Invalid or expired upload token")
+
+    existing = db.query(ChecklistPhoto).filter(ChecklistPhoto.id == done.photo_id).first()
+    if existing:
+        return existing
+
+    storage = get_storage()
+    key = claims["key"]
+    stored = storage.head(key)
+    if stored is None:
+        raise HTTPException(status_code=409, detail="Upload not found; PUT the photo to upload_url first")
+    if stored.size > PHOTO_MAX_BYTES:
+        _reject_upload(storage, key, 413, f"Photos must be at most {PHOTO_MAX_BYTES} bytes")
+    expected_sizes = {s for s in (claims.get("size_bytes"), done.size_bytes) if s is not None}
+    if stored.size == 0 or any(s != stored.size for s in expected_sizes):
+        _reject_upload(storage, key, 400, f"Uploaded size {stored.size} does not match the declared size")
+    # Trust the bytes, not the Content-Type header the client chose
+    sniffed = sniff_image_type(storage.read_prefix(key, SNIFF_BYTES))
+    declared = claims["content_type"]
+    if sniffed is None or (sniffed != declared and not {sniffed, declared} <= _HEIF_TYPES):
+        _reject_upload(storage, key, 415, f"Uploaded bytes are not a valid {declared} image")
+
+    # The remote backend downloads it here; the derivatives need a local copy anyway
+    sha256, _ = hash_file(storage.local_path(key))
+
+    db_answer = _get_or_create_answer(db, run_id, question_id)
+    ref = add_reference(db, sha256, key, stored.size, declared)
+    url = f"/uploads/{os.path.basename(ref.key)}"
     db_photo = ChecklistPhoto(
-        id=UUID(file_id),
+        id=done.photo_id,
         answer_id=db_answer.id,
         url=url,
-        file_path=file_path,
-        thumbnail_url=thumbnail_url
+        file_path=ref.key,
+        thumbnail_url=ref.thumbnail_url or url,
+        caption=done.caption,
     )
-    
-    db.add(db_photo)
-    db.commit()
-    db.refresh(db_photo)
-    
+    try:
+        db_photo = _add_photo(db, db_photo, run_id)
+    except IntegrityError:
+        # A concurrent retry registered it first
+        db.rollback()
+        return db.query(ChecklistPhoto).filter(ChecklistPhoto.id == done.photo_id).one()
+
+    if ref.key != key:
+        # Same content as an existing blob; the photo points there, so drop the copy
+        storage.delete(key)
+    if not ref.thumbnail_url:
+        submit_image_task(_generate_photo_derivatives, db_photo.id, ref.key)
     return db_photo
 
 @router.delete("/{run_id}/photos/{photo_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -299,16 +768,15 @@ def delete_photo(run_id: UUID, photo_id: UUID, db: Session = Depends(get_db)):
     if not photo:
         raise HTTPException(status_code=404, detail="Photo not found")
         
-    # Delete file
-    if os.path.exists(photo.file_path):
-        os.remove(photo.file_path)
-
-    thumb_path = _uploads_file_path_from_url(getattr(photo, "thumbnail_url", None))
-    if thumb_path and os.path.exists(thumb_path) and os.path.normpath(thumb_path) != os.path.normpath(photo.file_path):
-        os.remove(thumb_path)
-        
+    owner_run_id = photo.answer.run_id
     db.delete(photo)
+    db.flush()
+    # Other photos may share the file; it goes with the last of them
+    released = _release_photo_files(db, photo)
+    record_changes(db, owner_run_id, ENTITY_PHOTO, [photo_id], deleted=True)
+    refresh_run_stats(db, owner_run_id)
     db.commit()
+    _delete_released_files(db, get_storage(), [released])
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 @router.post("/{run_id}/photos/thumbnails/regenerate")
@@ -324,21 +792,29 @@ def regenerate_thumbnails(run_id: UUID, db: Session = Depends(get_db)):
         .all()
     )
 
-    updated = 0
+    storage = get_storage()
+    updated = []
+    # Photos sharing a file share its thumbnail, so make each one once
+    thumbnails = {}
     for photo in photos:
-        if not photo.file_path or not os.path.exists(photo.file_path):
+        if not photo.file_path:
             continue
-        file_id = str(photo.id)
-        thumb_filename = f"{file_id}_thumb.jpg"
-        thumb_path = os.path.join("uploads", thumb_filename)
-        if _try_make_thumbnail(photo.file_path, thumb_path):
-            photo.thumbnail_url = f"/uploads/{thumb_filename}"
-            updated += 1
+        if photo.file_path not in thumbnails:
+            src_path = storage.local_path(photo.file_path)
+            thumb_key = thumbnail_key(photo.file_path)
+            made = bool(src_path) and _store_thumbnail(storage, src_path, thumb_key)
+            thumbnails[photo.file_path] = f"/uploads/{os.path.basename(thumb_key)}" if made else None
+            if made:
+                set_thumbnail(db, photo.file_path, thumbnails[photo.file_path])
+        if thumbnails[photo.file_path]:
+            photo.thumbnail_url = thumbnails[photo.file_path]
+            updated.append(photo.id)
 
     if updated:
+        record_changes(db, run_id, ENTITY_PHOTO, updated, derived=True)
         db.commit()
 
-    return {"updated": updated, "total": len(photos)}
+    return {"updated": len(updated), "total": len(photos)}
 
 @router.put("/{run_id}/photos/{photo_id}", response_model=PhotoResponse)
 def update_photo_caption(run_id: UUID, photo_id: UUID, caption: str = Form(...), db: Session = Depends(get_db)):
@@ -347,36 +823,99 @@ def update_photo_caption(run_id: UUID, photo_id: UUID, caption: str = Form(...),
         raise HTTPException(status_code=404, detail="Photo not found")
         
     photo.caption = caption
+    record_changes(db, photo.answer.run_id, ENTITY_PHOTO, [photo.id])
     db.commit()
     db.refresh(photo)
     return photo
 
-def _draw_wrapped(c: canvas.Canvas, text: str, x: float, y: float, max_width_chars: int, line_height: float):
-    for line in textwrap.wrap(text, width=max_width_chars) or [""]:
-        c.drawString(x, y, line)
-        y -= line_height
-    return y
-
-def _draw_embedded_image(
-    c: canvas.Canvas,
-    image_path: str,
-    x: float,
-    y_top: float,
-    max_w: float,
-    max_h: float,
+def _export_snapshot(run: ChecklistRun, template, answers: List[ChecklistAnswer], payload: ExportRequest) -> dict:
+    summary = template.progress.summarize({a.question_id: a.value for a in answers})
+    critical_ids = set(summary.failed_critical)
+    answers_data = {}
+    for a in answers:
+        answers_data[a.question_id] = {
+            "value": a.value,
+            "comment": a.comment,
+            "photos": [
+                {"url": p.url, "file_path": p.file_path, "caption": p.caption}
+                for p in a.photos
+            ],
+        }
+
+    return {
+        "run": {
+            "site_name": run.site_name,
+            "p_ref": run.p_ref,
+            "engineer_name": run.engineer_name,
+            "status": run.status,
+            "ap_count": run.ap_count,
+        },
+        "template": {
+            "id": template.meta.template_id,
+            "name": template.meta.name,
+            "version": template.meta.version,
+            "buckets": [
+                {
+                    "bucket_id": bucket.bucket_id,
+                    "title": bucket.title,
+                    "groups": [
+                        {
+                            "title": group.title,
+                            "questions": [
+                                {"question_id": q.question_id, "text": q.text}
+                                for q in group.questions
+                            ],
+                        }
+                        for group in bucket.groups
+                    ],
+                }
+                for bucket in template.buckets
+            ],
+        },
+        "answers": answers_data,
+        "summary": {
+            **_summary_view(summary),
+            "buckets": [
+                {"title": bucket.title, **summary.buckets[bucket.bucket_id]._asdict()}
+                for bucket in template.buckets
+            ],
+            "failed_items": [
+                {
+                    "question_id": qid,
+                    "text": template.index.by_id[qid].question.text,
+                    "bucket": template.index.by_id[qid].bucket.title,
+                    "critical": qid in critical_ids,
+                }
+                for qid in summary.failed
+            ],
+        },
+        "declaration_checks": [item.label for item in (payload.declaration_checks if payload else [])],
+    }
+
+def _stored_export_exists(filename: str) -> bool:
+    # Rendered by another API node and copied to the shared backend
+    storage = get_storage()
+    return not storage.is_local and storage.exists(export_cache.storage_key(filename))
+
+@router.post(
+    "/{run_id}/export",
+    response_model=ExportJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={200: {"content": {"application/pdf": {}}, "description": "The PDF itself, with `stream=true`"}},
+)
+def export_run(
+    run_id: UUID,
+    payload: ExportRequest,
+    request: Request,
+    stream: bool = False,
+    db: Session = Depends(get_db),
 ):
-    reader = ImageReader(image_path)
-    iw, ih = reader.getSize()
-    if not iw or not ih:
-        raise ValueError("Invalid image dimensions")
-    scale = min(max_w / float(iw), max_h / float(ih))
-    w = float(iw) * scale
-    h = float(ih) * scale
-    c.drawImage(reader, x, y_top - h, width=w, height=h, preserveAspectRatio=True, mask="auto")
-    return y_top - h
-
-@router.post("/{run_id}/export", response_model=ExportResponse)
-def export_run(run_id: UUID, payload: ExportRequest, db: Session = Depends(get_db)):
+    """Queues a PDF export and returns the job to poll.
+
+    With `stream=true` the response is the PDF itself, sent from the cache or
+    once the render finishes. A render that takes longer than
+    EXPORT_STREAM_TIMEOUT is answered with the job as usual.
+    """
     run = db.query(ChecklistRun).filter(ChecklistRun.id == run_id).first()
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
@@ -385,161 +924,51 @@ def export_run(run_id: UUID, payload: ExportRequest, db: Session = Depends(get_d
     if not template:
         raise HTTPException(status_code=500, detail="Template definition missing")
 
-    answers = db.query(ChecklistAnswer).filter(ChecklistAnswer.run_id == run_id).all()
-    answers_map = {a.question_id: a for a in answers}
-
-    EXPORT_DIR = "exports"
-    os.makedirs(EXPORT_DIR, exist_ok=True)
-
-    filename = f"run_{run_id}.pdf"
-    file_path = os.path.join(EXPORT_DIR, filename)
-
-    page_w, page_h = A4
-    margin_x = 16 * mm
-    margin_y = 16 * mm
-    line_h = 5 * mm
-    photo_x = margin_x + 10 * mm
-    photo_max_w = page_w - margin_x - photo_x
-    photo_max_h = 80 * mm
-
-    c = canvas.Canvas(file_path, pagesize=A4)
-    y = page_h - margin_y
-
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(margin_x, y, "BCQA — PDF Export")
-    y -= 10 * mm
-
-    c.setFont("Helvetica", 10)
-    y = _draw_wrapped(c, f"Site: {run.site_name}", margin_x, y, 110, line_h)
-    y = _draw_wrapped(c, f"P-Ref: {run.p_ref}", margin_x, y, 110, line_h)
-    y = _draw_wrapped(c, f"Engineer: {run.engineer_name}", margin_x, y, 110, line_h)
-    y = _draw_wrapped(c, f"Template: {template.meta.name} (v{template.meta.version})", margin_x, y, 110, line_h)
-    y = _draw_wrapped(c, f"Status: {run.status}", margin_x, y, 110, line_h)
-    y = _draw_wrapped(c, f"Generated: {datetime.utcnow().isoformat()}Z", margin_x, y, 110, line_h)
-    y -= 4 * mm
-
-    if payload and payload.declaration_checks:
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(margin_x, y, "Declaration")
-        y -= 7 * mm
-        c.setFont("Helvetica", 10)
-        for item in payload.declaration_checks:
-            if y < margin_y + 20 * mm:
-                c.showPage()
-                y = page_h - margin_y
-                c.setFont("Helvetica", 10)
-            y = _draw_wrapped(c, f"[x] {item.label}", margin_x, y, 120, line_h)
-        y -= 4 * mm
-
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(margin_x, y, "Checklist Answers")
-    y -= 7 * mm
-
-    c.setFont("Helvetica", 9)
-
-    def render_photos(photos, y):
-        if not photos:
-            return y
-        y = _draw_wrapped(
-            c,
-            f"Photos: {len(photos)}",
-            margin_x + 6 * mm,
-            y,
-            110,
-            line_h,
-        )
-        for p in photos:
-            caption = (getattr(p, "caption", None) or "").strip()
-            y_needed = (6 * mm if caption else 0) + photo_max_h + 8 * mm
-            if y < margin_y + y_needed:
-                c.showPage()
-                y = page_h - margin_y
-                c.setFont("Helvetica", 9)
-            if caption:
-                y = _draw_wrapped(c, f"Caption: {caption}", photo_x, y, 115, line_h)
-                y -= 1 * mm
-            try:
-                local_path = getattr(p, "file_path", None)
-                if not local_path or not os.path.exists(local_path):
-                    raise FileNotFoundError(local_path or "")
-                y = _draw_embedded_image(c, local_path, photo_x, y, photo_max_w, photo_max_h)
-                y -= 4 * mm
-            except Exception:
-                y = _draw_wrapped(c, f"Photo: {getattr(p, 'url', '')}", photo_x, y, 115, line_h)
-                y -= 2 * mm
-        return y
+    # Fingerprint from ids/timestamps only; full rows are loaded on a cache miss
+    answer_rows = (
+        db.query(ChecklistAnswer.id, ChecklistAnswer.question_id, ChecklistAnswer.created_at, ChecklistAnswer.updated_at)
+        .filter(ChecklistAnswer.run_id == run_id)
+        .all()
+    )
+    photo_rows = (
+        db.query(ChecklistPhoto.id, ChecklistPhoto.answer_id, ChecklistPhoto.created_at, ChecklistPhoto.caption)
+        .join(ChecklistAnswer, ChecklistPhoto.answer_id == ChecklistAnswer.id)
+        .filter(ChecklistAnswer.run_id == run_id)
+        .all()
+    )
+    declaration_labels = [item.label for item in (payload.declaration_checks if payload else [])]
+    fingerprint = run_fingerprint(
+        run,
+        template.meta.template_id,
+        template.meta.version,
+        answer_rows,
+        photo_rows,
+        declaration_labels,
+    )
 
-    for bucket in template.buckets:
-        if y < margin_y + 25 * mm:
-            c.showPage()
-            y = page_h - margin_y
-            c.setFont("Helvetica", 9)
-
-        c.setFont("Helvetica-Bold", 11)
-        c.drawString(margin_x, y, bucket.title)
-        y -= 6 * mm
-        c.setFont("Helvetica", 9)
-
-        if bucket.bucket_id == "access_points":
-            ap_count = int(run.ap_count or 0)
-            if ap_count > 0:
-                if y < margin_y + 22 * mm:
-                    c.showPage()
-                    y = page_h - margin_y
-                    c.setFont("Helvetica", 9)
-                c.setFont("Helvetica-Bold", 10)
-                y = _draw_wrapped(c, "AP Photos", margin_x, y, 120, line_h)
-                c.setFont("Helvetica", 9)
-                for idx in range(1, ap_count + 1):
-                    ap_qid = f"AP-PHOTO-{idx}"
-                    a_ap = answers_map.get(ap_qid)
-                    photos_ap = list(a_ap.photos) if a_ap else []
-                    if y < margin_y + 20 * mm:
-                        c.showPage()
-                        y = page_h - margin_y
-                        c.setFont("Helvetica", 9)
-                    y = _draw_wrapped(c, f"AP {idx}", margin_x + 6 * mm, y, 120, line_h)
-                    y = render_photos(photos_ap, y)
-                    y -= 3 * mm
-
-        for group in bucket.groups:
-            if y < margin_y + 20 * mm:
-                c.showPage()
-                y = page_h - margin_y
-                c.setFont("Helvetica", 9)
-
-            c.setFont("Helvetica-Bold", 10)
-            y = _draw_wrapped(c, group.title, margin_x, y, 120, line_h)
-            c.setFont("Helvetica", 9)
-
-            for q in group.questions:
-                a = answers_map.get(q.question_id)
-                value = a.value if a and a.value else "—"
-                comment = a.comment if a and a.comment else ""
-                photos = list(a.photos) if a else []
-
-                if y < margin_y + 20 * mm:
-                    c.showPage()
-                    y = page_h - margin_y
-                    c.setFont("Helvetica", 9)
-
-                y = _draw_wrapped(
-                    c,
-                    f"{q.question_id} — {q.text}",
-                    margin_x,
-                    y,
-                    120,
-                    line_h,
-                )
-                y = _draw_wrapped(c, f"Answer: {value}", margin_x + 6 * mm, y, 110, line_h)
-                if comment:
-                    y = _draw_wrapped(c, f"Comment: {comment}", margin_x + 6 * mm, y, 110, line_h)
-                y = render_photos(photos, y)
-
-                y -= 2 * mm
-
-    c.save()
-
-    base_url = os.getenv("API_URL", "http://localhost:8000")
-    pdf_url = f"{base_url}/exports/{filename}"
-    return {"pdf_url": pdf_url}
+    os.makedirs(export_cache.directory, exist_ok=True)
+    filename = export_cache.filename(str(run_id), fingerprint)
+    file_path = export_cache.path(str(run_id), fingerprint)
+
+    pdf_url = f"{API_URL}/exports/{filename}"
+
+    job = find_active(fingerprint)
+    if not job and (export_cache.lookup(str(run_id), fingerprint) or _stored_export_exists(filename)):
+        if stream:
+            return pdf_response(request, file_path)
+        return job_response(completed_export(str(run_id), fingerprint, file_path, pdf_url))
+
+    if not job:
+        answers = _load_answers_with_photos(db, run_id)
+        snapshot = _export_snapshot(run, template, answers, payload)
+        job = submit_export(str(run_id), fingerprint, snapshot, file_path, pdf_url)
+    if not stream:
+        return job_response(job)
+
+    # Release the connection before blocking on the render
+    db.close()
+    if not job.wait(EXPORT_STREAM_TIMEOUT):
+        return job_response(job)
+    if job.status == JOB_FAILED:
+        raise HTTPException(status_code=500, detail=f"Export failed: {job.error}")
+    return pdf_response(request, file_path)
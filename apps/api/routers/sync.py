@@ -0,0 +1,395 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from operator import itemgetter
+from typing import List, Optional
+from uuid import UUID, uuid4
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..models import ChecklistRun, ChecklistAnswer, ChecklistPhoto, SyncConflict, SyncMutation
+from ..run_changes import ENTITY_ANSWER, ENTITY_PHOTO, ENTITY_RUN, change_times, changes_since, current_version, record_changes
+from ..run_stats import refresh_run_stats
+from ..schemas import (
+    AnswerChange, ClientMutation, PhotoChange, RunChangesResponse, RunResponse,
+    SyncApplyRequest, SyncApplyResponse, SyncConflictResponse, SyncMutationResult,
+)
+from .runs import ANSWER_VALUES, UPSERT_CHUNK_SIZE, _delete_released_files, _release_photo_files, _upsert_insert, question_validator
+from .templates import loader
+from ..storage import get_storage
+
+router = APIRouter(prefix="/runs", tags=["sync"])
+
+# How long applied mutation ids are remembered. A retry older than this is
+# applied again, which last-write-wins makes harmless: its timestamp is old.
+SYNC_SEEN_TTL = int(os.getenv("SYNC_SEEN_TTL", str(7 * 24 * 3600)))
+SYNC_PURGE_INTERVAL = int(os.getenv("SYNC_PURGE_INTERVAL", "300"))
+
+MUTATION_ANSWER = "answer"
+MUTATION_PHOTO_CAPTION = "photo_caption"
+MUTATION_PHOTO_DELETE = "photo_delete"
+
+STATUS_APPLIED = "applied"
+STATUS_CONFLICT = "conflict"
+STATUS_DUPLICATE = "duplicate"
+STATUS_INVALID = "invalid"
+
+# Keeps each IN (...) list well under SQLite's bound-parameter limit
+ID_CHUNK_SIZE = 500
+
+def _chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+        yield ids[start:start + ID_CHUNK_SIZE]
+
+def _answer_changes(db: Session, run_id: UUID, ids=None):
+    query = db.query(ChecklistAnswer).filter(ChecklistAnswer.run_id == run_id)
+    if ids is None:
+        return [AnswerChange.model_validate(a, from_attributes=True) for a in query.all()]
+    return [
+        AnswerChange.model_validate(a, from_attributes=True)
+        for chunk in _chunks(ids)
+        for a in query.filter(ChecklistAnswer.id.in_(chunk)).all()
+    ]
+
+def _photo_changes(db: Session, run_id: UUID, ids=None):
+    query = (
+        db.query(ChecklistPhoto, ChecklistAnswer.question_id)
+        .join(ChecklistAnswer, ChecklistPhoto.answer_id == ChecklistAnswer.id)
+        .filter(ChecklistAnswer.run_id == run_id)
+    )
+    rows = query.all() if ids is None else [r for chunk in _chunks(ids) for r in query.filter(ChecklistPhoto.id.in_(chunk)).all()]
+    return [
+        PhotoChange(
+            id=p.id,
+            answer_id=p.answer_id,
+            question_id=question_id,
+            url=p.url,
+            thumbnail_url=p.thumbnail_url,
+            caption=p.caption,
+            created_at=p.created_at,
+        )
+        for p, question_id in rows
+    ]
+
+@router.get("/{run_id}/changes", response_model=RunChangesResponse)
+def get_run_changes(run_id: UUID, since: int = Query(0, ge=0), db: Session = Depends(get_db)):
+    """What changed in a run after the cursor `since`, for offline clients catching up.
+
+    Without `since` (or with a cursor this server never issued) the whole run
+    is returned with `full` set. Otherwise only rows written after the cursor
+    are returned, with the ids of deleted answers and photos.
+    """
+    # Read the cursor before any rows: anything written in between is sent again
+    # next time, which is harmless, rather than skipped
+    cursor = current_version(db, run_id)
+    run = db.query(ChecklistRun).filter(ChecklistRun.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+    if since == 0 or since > cursor:
+        return RunChangesResponse(
+            run_id=run_id,
+            cursor=cursor,
+            full=True,
+            run=RunResponse.model_validate(run),
+            answers=_answer_changes(db, run_id),
+            photos=_photo_changes(db, run_id),
+        )
+
+    changed = {ENTITY_RUN: False, ENTITY_ANSWER: [], ENTITY_PHOTO: []}
+    deleted = {ENTITY_ANSWER: [], ENTITY_PHOTO: []}
+    for change in changes_since(db, run_id, since):
+        if change.entity == ENTITY_RUN:
+            changed[ENTITY_RUN] = True
+        elif change.deleted:
+            deleted[change.entity].append(UUID(change.entity_id))
+        else:
+            changed[change.entity].append(UUID(change.entity_id))
+
+    return RunChangesResponse(
+        run_id=run_id,
+        cursor=cursor,
+        full=False,
+        run=RunResponse.model_validate(run) if changed[ENTITY_RUN] else None,
+        answers=_answer_changes(db, run_id, changed[ENTITY_ANSWER]) if changed[ENTITY_ANSWER] else [],
+        photos=_photo_changes(db, run_id, changed[ENTITY_PHOTO]) if changed[ENTITY_PHOTO] else [],
+        deleted_answers=deleted[ENTITY_ANSWER],
+        deleted_photos=deleted[ENTITY_PHOTO],
+    )
+
+_last_purge = 0.0
+
+def _purge_seen_mutations(db: Session, now: datetime):
+    global _last_purge
+    if time.monotonic() - _last_purge < SYNC_PURGE_INTERVAL:
+        return
+    _last_purge = time.monotonic()
+    cutoff = now - timedelta(seconds=SYNC_SEEN_TTL)
+    db.query(SyncMutation).filter(SyncMutation.seen_at < cutoff).delete(synchronize_session=False)
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive datetimes; everything is stored in UTC
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def _answer_value(answer) -> dict:
+    return {"value": answer.value, "comment": answer.comment}
+
+def _apply_answers(db: Session, run_id: UUID, mutations: List[ClientMutation], stamps: dict, results: dict, conflicts: list):
+    # Fold each question's edits in client time order, as the batch endpoint does; the newest stamp is the row's
+    merged = {}
+    for m in sorted(mutations, key=lambda m: stamps[m.mutation_id]):
+        row = merged.setdefault(m.question_id, {"question_id": m.question_id, "value": None, "comment": None, "mutations": []})
+        if m.value is not None:
+            row["value"] = m.value
+        if m.comment is not None:
+            row["comment"] = m.comment
+        row["updated_at"] = stamps[m.mutation_id]
+        row["mutations"].append(m)
+
+    insert = _upsert_insert(db)
+    # In question order, like the batch endpoint, so concurrent applies take row locks in the same order
+    rows = sorted(merged.values(), key=itemgetter("question_id"))
+    applied = {}
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = insert(ChecklistAnswer).values([
+            {"id": uuid4(), "run_id": run_id, "question_id": r["question_id"], "value": r["value"], "comment": r["comment"], "updated_at": r["updated_at"]}
+            for r in rows[start:start + UPSERT_CHUNK_SIZE]
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ChecklistAnswer.run_id, ChecklistAnswer.question_id],
+            set_={
+                "value": func.coalesce(stmt.excluded.value, ChecklistAnswer.value),
+                "comment": func.coalesce(stmt.excluded.comment, ChecklistAnswer.comment),
+                "updated_at": stmt.excluded.updated_at,
+            },
+            # Last write wins, decided by the database so a concurrent writer cannot slip in between.
+            # A row with neither value nor comment is the placeholder a photo upload creates,
+            # not an edit, so any client edit beats it.
+            where=or_(
+                and_(ChecklistAnswer.value.is_(None), ChecklistAnswer.comment.is_(None)),
+                func.coalesce(ChecklistAnswer.updated_at, ChecklistAnswer.created_at) <= stmt.excluded.updated_at,
+            ),
+        ).returning(
+            ChecklistAnswer.id,
+            ChecklistAnswer.question_id,
+            ChecklistAnswer.value,
+            ChecklistAnswer.comment,
+            ChecklistAnswer.updated_at,
+        )
+        for r in db.execute(stmt):
+            applied[r.question_id] = AnswerChange.model_validate(r, from_attributes=True)
+
+    lost = [qid for qid in merged if qid not in applied]
+    current = {}
+    if lost:
+        current = {
+            a.question_id: a
+            for a in db.query(ChecklistAnswer).filter(ChecklistAnswer.run_id == run_id, ChecklistAnswer.question_id.in_(lost)).all()
+        }
+    for qid, row in merged.items():
+        for m in row["mutations"]:
+            if qid in applied:
+                results[m.mutation_id] = SyncMutationResult(mutation_id=m.mutation_id, status=STATUS_APPLIED, answer=applied[qid])
+                continue
+            server = current[qid]
+            results[m.mutation_id] = SyncMutationResult(
+                mutation_id=m.mutation_id,
+                status=STATUS_CONFLICT,
+                detail="A newer write won",
+                answer=AnswerChange.model_validate(server, from_attributes=True),
+            )
+            conflicts.append(dict(
+                mutation=m, entity=ENTITY_ANSWER, entity_id=str(server.id),
+                client_value={"value": m.value, "comment": m.comment}, server_value=_answer_value(server),
+                server_updated_at=server.updated_at or server.created_at, resolution="server_wins",
+            ))
+    return [a.id for a in applied.values()]
+
+def _photo_change(photo: ChecklistPhoto, question_id: str) -> PhotoChange:
+    return PhotoChange(
+        id=photo.id,
+        answer_id=photo.answer_id,
+        question_id=question_id,
+        url=photo.url,
+        thumbnail_url=photo.thumbnail_url,
+        caption=photo.caption,
+        created_at=photo.created_at,
+    )
+
+def _apply_photos(db: Session, run_id: UUID, mutations: List[ClientMutation], stamps: dict, results: dict, conflicts: list):
+    ids = {m.photo_id for m in mutations}
+    photos = {
+        p.id: (p, question_id)
+        for p, question_id in (
+            db.query(ChecklistPhoto, ChecklistAnswer.question_id)
+            .join(ChecklistAnswer, ChecklistPhoto.answer_id == ChecklistAnswer.id)
+            .filter(ChecklistAnswer.run_id == run_id, ChecklistPhoto.id.in_(ids))
+            .all()
+        )
+    }
+    changed_at = {UUID(k): _as_utc(v) for k, v in change_times(db, run_id, ENTITY_PHOTO, photos).items()}
+
+    captioned, deleted = {}, []
+    for m in sorted(mutations, key=lambda m: stamps[m.mutation_id]):
+        found = photos.get(m.photo_id)
+        if m.type == MUTATION_PHOTO_DELETE:
+            # Deleting is idempotent, and a delete beats any edit
+            if found and m.photo_id not in deleted:
+                deleted.append(m.photo_id)
+            results[m.mutation_id] = SyncMutationResult(mutation_id=m.mutation_id, status=STATUS_APPLIED)
+            continue
+        if not found or m.photo_id in deleted:
+            results[m.mutation_id] = SyncMutationResult(mutation_id=m.mutation_id, status=STATUS_CONFLICT, detail="Photo was deleted")
+            conflicts.append(dict(
+                mutation=m, entity=ENTITY_PHOTO, entity_id=str(m.photo_id),
+                client_value={"caption": m.caption}, server_value=None, server_updated_at=None, resolution="deleted",
+            ))
+            continue
+        photo, question_id = found
+        server_at = changed_at.get(photo.id) or _as_utc(photo.created_at)
+        # An uncaptioned photo has no caption edit to lose, e.g. one taken and captioned offline, then uploaded
+        if photo.caption is not None and server_at and server_at > stamps[m.mutation_id]:
+            results[m.mutation_id] = SyncMutationResult(
+                mutation_id=m.mutation_id, status=STATUS_CONFLICT, detail="A newer write won", photo=_photo_change(photo, question_id),
+            )
+            conflicts.append(dict(
+                mutation=m, entity=ENTITY_PHOTO, entity_id=str(photo.id),
+                client_value={"caption": m.caption}, server_value={"caption": photo.caption},
+                server_updated_at=server_at, resolution="server_wins",
+            ))
+            continue
+        photo.caption = m.caption
+        changed_at[photo.id] = stamps[m.mutation_id]
+        captioned[photo.id] = stamps[m.mutation_id]
+        results[m.mutation_id] = SyncMutationResult(mutation_id=m.mutation_id, status=STATUS_APPLIED, photo=_photo_change(photo, question_id))
+
+    released = []
+    for photo_id in deleted:
+        photo, _ = photos[photo_id]
+        captioned.pop(photo_id, None)
+        db.delete(photo)
+        db.flush()
+        released.append(_release_photo_files(db, photo))
+    db.flush()
+    return captioned, deleted, released
+
+def _invalid(m: ClientMutation, detail: str) -> SyncMutationResult:
+    return SyncMutationResult(mutation_id=m.mutation_id, status=STATUS_INVALID, detail=detail)
+
+def _apply_batch(db: Session, run_id: UUID, batch: SyncApplyRequest, is_valid_question) -> SyncApplyResponse:
+    now = datetime.now(timezone.utc)
+    _purge_seen_mutations(db, now)
+
+    ids = list({m.mutation_id for m in batch.mutations})
+    seen = {}
+    for chunk in _chunks(ids):
+        seen.update(
+            db.query(SyncMutation.mutation_id, SyncMutation.status)
+            .filter(SyncMutation.run_id == run_id, SyncMutation.mutation_id.in_(chunk))
+            .all()
+        )
+
+    results = {}
+    duplicates = {}
+    stamps = {}
+    answers, photos = [], []
+    for idx, m in enumerate(batch.mutations):
+        if m.mutation_id in seen or m.mutation_id in stamps:
+            duplicates[idx] = SyncMutationResult(
+                mutation_id=m.mutation_id,
+                status=STATUS_DUPLICATE,
+                detail=f"Already {seen[m.mutation_id]}" if m.mutation_id in seen else "Repeated in this batch",
+            )
+            continue
+        # A device clock running ahead must not let its edits beat later ones forever
+        stamps[m.mutation_id] = min(_as_utc(m.client_updated_at), now)
+        if m.type == MUTATION_ANSWER:
+            if not m.question_id or not is_valid_question(m.question_id):
+                results[m.mutation_id] = _invalid(m, "Unknown question_id")
+            elif m.value is not None and m.value not in ANSWER_VALUES:
+                results[m.mutation_id] = _invalid(m, f"Invalid value: {m.value}")
+            else:
+                answers.append(m)
+        elif m.type in (MUTATION_PHOTO_CAPTION, MUTATION_PHOTO_DELETE):
+            if m.photo_id is None:
+                results[m.mutation_id] = _invalid(m, "photo_id is required")
+            else:
+                photos.append(m)
+        else:
+            results[m.mutation_id] = _invalid(m, f"Unknown mutation type: {m.type}")
+
+    conflicts = []
+    answer_ids = _apply_answers(db, run_id, answers, stamps, results, conflicts) if answers else []
+    captioned, deleted, released = _apply_photos(db, run_id, photos, stamps, results, conflicts) if photos else ({}, [], [])
+
+    if answer_ids:
+        record_changes(db, run_id, ENTITY_ANSWER, answer_ids)
+    for photo_id, stamp in captioned.items():
+        record_changes(db, run_id, ENTITY_PHOTO, [photo_id], updated_at=stamp)
+    if deleted:
+        record_changes(db, run_id, ENTITY_PHOTO, deleted, deleted=True)
+    if answer_ids or deleted:
+        refresh_run_stats(db, run_id)
+
+    for c in conflicts:
+        m = c.pop("mutation")
+        db.add(SyncConflict(run_id=run_id, mutation_id=m.mutation_id, device_id=batch.device_id, client_updated_at=stamps[m.mutation_id], **c))
+    # Remembered in the same transaction as the writes, so a mutation is either applied and seen, or neither
+    for mutation_id, result in results.items():
+        db.add(SyncMutation(mutation_id=mutation_id, run_id=run_id, status=result.status, seen_at=now))
+    db.commit()
+    if released:
+        _delete_released_files(db, get_storage(), released)
+
+    ordered = [duplicates.get(idx) or results[m.mutation_id] for idx, m in enumerate(batch.mutations)]
+    counts = {status: 0 for status in (STATUS_APPLIED, STATUS_CONFLICT, STATUS_DUPLICATE, STATUS_INVALID)}
+    for r in ordered:
+        counts[r.status] += 1
+    return SyncApplyResponse(
+        applied=counts[STATUS_APPLIED],
+        conflicts=counts[STATUS_CONFLICT],
+        duplicates=counts[STATUS_DUPLICATE],
+        invalid=counts[STATUS_INVALID],
+        results=ordered,
+    )
+
+@router.post("/{run_id}/changes:apply", response_model=SyncApplyResponse)
+def apply_changes(run_id: UUID, batch: SyncApplyRequest, db: Session = Depends(get_db)):
+    """Applies a device's queued offline edits in one transaction.
+
+    Each mutation carries a client-generated id, so a retried batch is not
+    applied twice, and the time it was made on the device: an edit older than
+    the server's copy loses (last write wins) and is logged as a conflict.
+    """
+    run = db.query(ChecklistRun).filter(ChecklistRun.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+
+    template = loader.get_template(run.template_id)
+    if not template:
+        raise HTTPException(status_code=500, detail="Template definition missing")
+
+    is_valid_question = question_validator(run, template)
+    try:
+        return _apply_batch(db, run_id, batch, is_valid_question)
+    except IntegrityError:
+        # A concurrent retry of this batch committed first; now its ids are seen
+        db.rollback()
+        return _apply_batch(db, run_id, batch, is_valid_question)
+
+@router.get("/{run_id}/conflicts", response_model=List[SyncConflictResponse])
+def list_conflicts(run_id: UUID, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    """The run's sync conflict log, newest first."""
+    return (
+        db.query(SyncConflict)
+        .filter(SyncConflict.run_id == run_id)
+        .order_by(SyncConflict.created_at.desc())
+        .limit(limit)
+        .all()
+    )
@@ -1,21 +1,73 @@
 import os
-from fastapi import APIRouter, HTTPException
-from checklist_engine import TemplateLoader
+from typing import Dict, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Request
+from checklist_engine import ChecklistTemplate, TemplateLoader
+from checklist_engine.models import TemplateMeta
+
+from ..http_cache import EncodedBody, cached_response
 
 router = APIRouter(prefix="/templates", tags=["templates"])
 
 TEMPLATES_DIR = os.getenv("TEMPLATES_DIR", "../../packages/templates")
-loader = TemplateLoader(TEMPLATES_DIR)
+# Seconds between directory re-stats on reads; unset means changes are picked up
+# only by POST /templates/reload, the watcher, or a lookup of an unknown id
+TEMPLATES_CHECK_INTERVAL = os.getenv("TEMPLATES_CHECK_INTERVAL")
+TEMPLATES_WATCH_INTERVAL = float(os.getenv("TEMPLATES_WATCH_INTERVAL", "0"))
+TEMPLATES_NEGATIVE_TTL = float(os.getenv("TEMPLATES_NEGATIVE_TTL", "30"))
+
+loader = TemplateLoader(
+    TEMPLATES_DIR,
+    check_interval=float(TEMPLATES_CHECK_INTERVAL) if TEMPLATES_CHECK_INTERVAL else None,
+    negative_ttl=TEMPLATES_NEGATIVE_TTL,
+)
+
+# A template version never changes, so a URL pinned to it can be cached for good.
+# Unpinned URLs must revalidate, which costs a 304 when nothing changed.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Serialized bodies, rebuilt only when the loader hands out a different template object
+_template_bodies: Dict[str, Tuple[ChecklistTemplate, EncodedBody]] = {}
+_list_body: Optional[Tuple[Tuple[TemplateMeta, ...], EncodedBody]] = None
+
+def _template_body(template: ChecklistTemplate) -> EncodedBody:
+    template_id = template.meta.template_id
+    cached = _template_bodies.get(template_id)
+    if cached is None or cached[0] is not template:
+        cached = (template, EncodedBody(template.model_dump_json(by_alias=True).encode("utf-8")))
+        _template_bodies[template_id] = cached
+    return cached[1]
+
+def _templates_list_body() -> EncodedBody:
+    global _list_body
+    metas = tuple(loader.list_meta())
+    cached = _list_body
+    if cached is None or len(cached[0]) != len(metas) or any(a is not b for a, b in zip(cached[0], metas)):
+        # Return simplified metadata
+        body = "[" + ",".join(meta.model_dump_json(by_alias=True) for meta in metas) + "]"
+        cached = (metas, EncodedBody(body.encode("utf-8")))
+        _list_body = cached
+    return cached[1]
 
 @router.get("/")
-def list_templates():
-    templates = loader.load_all()
-    # Return simplified metadata
-    return [t.meta for t in templates]
+def list_templates(request: Request):
+    return cached_response(request, _templates_list_body(), REVALIDATE_CACHE_CONTROL)
+
+@router.post("/reload")
+def reload_templates():
+    changed = loader.reload()
+    return {
+        "changed": changed,
+        "templates": [meta.template_id for meta in loader.list_meta()],
+        "errors": {str(path): error for path, error in loader.errors.items()},
+    }
 
 @router.get("/{template_id}")
-def get_template(template_id: str):
+def get_template(template_id: str, request: Request, version: Optional[str] = None):
+    """Pass the run's template `version` to get an immutable, long-lived cacheable response."""
     template = loader.get_template(template_id)
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
-    return template
+    # Only the current version is on disk; a stale pin still gets it, just not cached for good
+    cache_control = IMMUTABLE_CACHE_CONTROL if version == template.meta.version else REVALIDATE_CACHE_CONTROL
+    return cached_response(request, _template_body(template), cache_control)
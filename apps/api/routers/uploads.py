@@ -0,0 +1,77 @@
+import mimetypes
+import os
+import re
+from uuid import uuid4
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..http_cache import file_response
+from ..images import PHOTO_MAX_BYTES
+from ..photo_blobs import dedup_stats
+from ..storage import get_storage
+
+router = APIRouter(prefix="/uploads", tags=["uploads"])
+
+# Per-photo uploads are named by UUID, deduplicated ones by their SHA-256
+_UPLOAD_NAME = re.compile(r"^([0-9a-f-]{36}|[0-9a-f]{64})(_thumb)?(\.[a-z0-9]{2,5})?$")
+
+def _upload_key(filename: str) -> str:
+    if not _UPLOAD_NAME.match(filename):
+        raise HTTPException(status_code=404, detail="File not found")
+    return f"uploads/{filename}"
+
+@router.get("/stats")
+def upload_stats(db: Session = Depends(get_db)):
+    """Photo storage shared through content deduplication, and the bytes it saves."""
+    return dedup_stats(db)
+
+@router.get("/{filename}")
+def get_upload(filename: str, request: Request):
+    """Serves a photo or thumbnail from the filesystem backend, or redirects to a presigned URL."""
+    key = _upload_key(filename)
+    storage = get_storage()
+    if not storage.is_local:
+        if not storage.exists(key):
+            raise HTTPException(status_code=404, detail="File not found")
+        return RedirectResponse(storage.download_url(key), status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+
+    path = storage.local_path(key)
+    if path is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    # Thumbnails are regenerated in place, so validate on mtime and size rather than the name
+    st = os.stat(path)
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    return file_response(request, path, media_type, f'"{st.st_mtime_ns:x}-{st.st_size:x}"')
+
+@router.put("/{filename}", status_code=status.HTTP_204_NO_CONTENT)
+async def put_signed_upload(filename: str, request: Request, expires: int, signature: str):
+    """Receives a direct upload authorized by FileSystemStorage.presign_upload().
+
+    Remote backends hand out URLs on the object store itself, so this route only
+    exists for the filesystem backend.
+    """
+    key = _upload_key(filename)
+    storage = get_storage()
+    content_type = request.headers.get("content-type", "")
+    if not storage.is_local or not storage.verify(key, content_type, expires, signature):
+        raise HTTPException(status_code=403, detail="Invalid or expired upload signature")
+
+    tmp_path = f"{storage.cached_path(key)}.{uuid4().hex}.tmp"
+    os.makedirs(os.path.dirname(tmp_path) or ".", exist_ok=True)
+    try:
+        received = 0
+        with open(tmp_path, "wb") as f:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > PHOTO_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Photos must be at most {PHOTO_MAX_BYTES} bytes")
+                await run_in_threadpool(f.write, chunk)
+        await run_in_threadpool(storage.put_file, key, tmp_path, content_type)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
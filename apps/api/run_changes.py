@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from .database import dialect_insert
+from .models import RunChange, RunVersion
+
+ENTITY_RUN = "run"
+ENTITY_ANSWER = "answer"
+ENTITY_PHOTO = "photo"
+
+def record_changes(
+    db: Session, run_id, entity: str, entity_ids: Iterable, deleted: bool = False, updated_at: Optional[datetime] = None,
+    derived: bool = False,
+) -> int:
+    """Bumps the run's version and stamps it on the given rows; returns the new version.
+
+    Call it after the write, as late as possible before the commit. The bump
+    locks the run's version row until then, so versions become visible in
+    commit order and a client never skips past a change that commits later.
+    `updated_at` is when the change was made, if not now (an offline edit).
+    With `derived` (server-made data such as thumbnails) clients still pick
+    the rows up, but their updated_at, which sync's last-write-wins compares
+    edits against, keeps the time of the last real edit.
+    """
+    insert = dialect_insert(db)
+    stmt = insert(RunVersion).values(run_id=run_id, version=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[RunVersion.run_id],
+        set_={"version": RunVersion.version + 1},
+    )
+    version = db.execute(stmt.returning(RunVersion.version)).scalar_one()
+
+    updated_at = updated_at or datetime.now(timezone.utc)
+    rows = [
+        {"run_id": run_id, "entity": entity, "entity_id": str(entity_id), "version": version, "deleted": deleted, "updated_at": updated_at}
+        for entity_id in entity_ids
+    ]
+    if rows:
+        stmt = insert(RunChange).values(rows)
+        set_ = {"version": stmt.excluded.version, "deleted": stmt.excluded.deleted}
+        if not derived:
+            set_["updated_at"] = stmt.excluded.updated_at
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RunChange.run_id, RunChange.entity, RunChange.entity_id],
+            set_=set_,
+        )
+        db.execute(stmt)
+    return version
+
+def current_version(db: Session, run_id) -> int:
+    version = db.query(RunVersion.version).filter(RunVersion.run_id == run_id).scalar()
+    return version or 0
+
+def changes_since(db: Session, run_id, since: int) -> List[RunChange]:
+    return (
+        db.query(RunChange)
+        .filter(RunChange.run_id == run_id, RunChange.version > since)
+        .all()
+    )
+
+def delete_run_changes(db: Session, run_id):
+    db.query(RunChange).filter(RunChange.run_id == run_id).delete(synchronize_session=False)
+    db.query(RunVersion).filter(RunVersion.run_id == run_id).delete(synchronize_session=False)
+
+def change_times(db: Session, run_id, entity: str, entity_ids: Iterable) -> dict:
+    """When each of the given rows last changed, for those that have a change recorded."""
+    ids = [str(i) for i in entity_ids]
+    if not ids:
+        return {}
+    rows = (
+        db.query(RunChange.entity_id, RunChange.updated_at)
+        .filter(RunChange.run_id == run_id, RunChange.entity == entity, RunChange.entity_id.in_(ids))
+        .all()
+    )
+    return {entity_id: updated_at for entity_id, updated_at in rows}
@@ -0,0 +1,65 @@
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from .database import dialect_insert
+from .models import ChecklistRun, ChecklistAnswer, ChecklistPhoto, ChecklistRunStats
+
+def _count_answers(run_id, *conditions):
+    return (
+        select(func.count(ChecklistAnswer.id))
+        .where(ChecklistAnswer.run_id == run_id, *conditions)
+        .scalar_subquery()
+    )
+
+def refresh_run_stats(db: Session, run_id, activity_at=None):
+    """Recomputes a run's stats row with one INSERT ... ON CONFLICT statement.
+
+    Call it after an answer/photo write, before the commit, so the counters
+    change atomically with the data they summarize. Call it after
+    record_changes() too: that locks the run until the commit, so the counts
+    are read only once any concurrent write to the run has committed, and a
+    slower writer cannot overwrite them with counts that miss a newer write.
+    """
+    has_value = and_(ChecklistAnswer.value.isnot(None), ChecklistAnswer.value != "")
+    photo_count = (
+        select(func.count(ChecklistPhoto.id))
+        .join(ChecklistAnswer, ChecklistPhoto.answer_id == ChecklistAnswer.id)
+        .where(ChecklistAnswer.run_id == run_id)
+        .scalar_subquery()
+    )
+    insert = dialect_insert(db)
+    stmt = insert(ChecklistRunStats).values(
+        run_id=run_id,
+        answered=_count_answers(run_id, has_value),
+        pass_count=_count_answers(run_id, ChecklistAnswer.value == "pass"),
+        fail_count=_count_answers(run_id, ChecklistAnswer.value == "fail"),
+        na_count=_count_answers(run_id, ChecklistAnswer.value == "na"),
+        photo_count=photo_count,
+        last_activity_at=activity_at if activity_at is not None else func.now(),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ChecklistRunStats.run_id],
+        set_={
+            "answered": stmt.excluded.answered,
+            "pass_count": stmt.excluded.pass_count,
+            "fail_count": stmt.excluded.fail_count,
+            "na_count": stmt.excluded.na_count,
+            "photo_count": stmt.excluded.photo_count,
+            "last_activity_at": stmt.excluded.last_activity_at,
+        },
+    )
+    db.execute(stmt)
+
+def backfill_run_stats(db: Session) -> int:
+    """Creates stats rows for runs that predate the stats table."""
+    missing = (
+        db.query(ChecklistRun.id, func.coalesce(ChecklistRun.updated_at, ChecklistRun.created_at))
+        .outerjoin(ChecklistRunStats, ChecklistRunStats.run_id == ChecklistRun.id)
+        .filter(ChecklistRunStats.run_id.is_(None))
+        .all()
+    )
+    for run_id, activity_at in missing:
+        refresh_run_stats(db, run_id, activity_at)
+    if missing:
+        db.commit()
+    return len(missing)
@@ -0,0 +1,81 @@
+from collections import defaultdict
+
+from sqlalchemy import func, inspect, tuple_
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex, Index
+
+from .models import ChecklistAnswer, ChecklistPhoto, ChecklistRun, ChecklistRunStats
+from .run_changes import ENTITY_ANSWER, ENTITY_PHOTO, record_changes
+
+# create_all() creates missing tables but never touches one that exists, so
+# indexes and constraints added to the original tables are applied here, at
+# startup, after it. Every step checks first, so it is cheap once applied.
+
+ANSWER_UNIQUE_INDEX = "uq_checklist_answers_run_question"
+
+def _has_unique(db: Session, table: str, columns) -> bool:
+    insp = inspect(db.connection())
+    columns = set(columns)
+    if any(set(c["column_names"]) == columns for c in insp.get_unique_constraints(table)):
+        return True
+    return any(i["unique"] and set(i["column_names"]) == columns for i in insp.get_indexes(table))
+
+def dedupe_answers(db: Session) -> int:
+    """Keeps one answer per (run, question) and returns how many were removed.
+
+    The kept row is the newest with a value or comment (a photo upload's
+    placeholder loses to a real answer); the others' photos move onto it and
+    offline clients are sent their ids as deleted.
+    """
+    dupes = (
+        db.query(ChecklistAnswer.run_id, ChecklistAnswer.question_id)
+        .group_by(ChecklistAnswer.run_id, ChecklistAnswer.question_id)
+        .having(func.count() > 1)
+        .all()
+    )
+    if not dupes:
+        return 0
+    groups = defaultdict(list)
+    keys = [tuple(d) for d in dupes]
+    for start in range(0, len(keys), 500):
+        chunk = keys[start:start + 500]
+        for a in db.query(ChecklistAnswer).filter(tuple_(ChecklistAnswer.run_id, ChecklistAnswer.question_id).in_(chunk)):
+            groups[(a.run_id, a.question_id)].append(a)
+
+    removed = 0
+    for (run_id, _), answers in groups.items():
+        answers.sort(key=lambda a: (
+            a.value is not None or a.comment is not None,
+            a.updated_at or a.created_at,
+            str(a.id),
+        ))
+        keep, drop = answers[-1], answers[:-1]
+        drop_ids = [a.id for a in drop]
+        moved = [p for (p,) in db.query(ChecklistPhoto.id).filter(ChecklistPhoto.answer_id.in_(drop_ids))]
+        db.query(ChecklistPhoto).filter(ChecklistPhoto.answer_id.in_(drop_ids)).update(
+            {ChecklistPhoto.answer_id: keep.id}, synchronize_session=False,
+        )
+        db.query(ChecklistAnswer).filter(ChecklistAnswer.id.in_(drop_ids)).delete(synchronize_session=False)
+        record_changes(db, run_id, ENTITY_ANSWER, drop_ids, deleted=True)
+        record_changes(db, run_id, ENTITY_ANSWER, [keep.id])
+        if moved:
+            record_changes(db, run_id, ENTITY_PHOTO, moved)
+        removed += len(drop)
+
+    # backfill_run_stats() recounts these runs
+    run_ids = {run_id for run_id, _ in groups}
+    db.query(ChecklistRunStats).filter(ChecklistRunStats.run_id.in_(run_ids)).delete(synchronize_session=False)
+    return removed
+
+def upgrade_schema(db: Session):
+    """Adds what the current models need to tables created by an earlier release."""
+    columns = ("run_id", "question_id")
+    if not _has_unique(db, ChecklistAnswer.__tablename__, columns):
+        # The batch and sync upserts name this as their conflict target; duplicates would block it
+        dedupe_answers(db)
+        unique = Index(ANSWER_UNIQUE_INDEX, ChecklistAnswer.run_id, ChecklistAnswer.question_id, unique=True)
+        db.execute(CreateIndex(unique, if_not_exists=True))
+    # list_runs' keyset and filter indexes
+    for index in ChecklistRun.__table__.indexes:
+        db.execute(CreateIndex(index, if_not_exists=True))
+    db.commit()
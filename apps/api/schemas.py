@@ -1,4 +1,4 @@
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 from pydantic import BaseModel, ConfigDict
 from datetime import date, datetime
 from uuid import UUID
@@ -36,6 +36,19 @@ class RunResponse(RunCreate):
     updated_at: Optional[datetime] = None
     submitted_at: Optional[datetime] = None
 
+class RunStatsResponse(BaseModel):
+    total_questions: int
+    answered_questions: int
+    completion_percentage: int
+    pass_count: int
+    fail_count: int
+    na_count: int
+    photo_count: int
+    last_activity_at: Optional[datetime] = None
+
+class RunListItem(RunResponse):
+    stats: Optional[RunStatsResponse] = None # only with ?include=stats
+
 class PhotoResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -45,6 +58,25 @@ class PhotoResponse(BaseModel):
     caption: Optional[str] = None
     created_at: datetime
 
+class PhotoPresignRequest(BaseModel):
+    content_type: str
+    size_bytes: Optional[int] = None
+
+class PhotoPresignResponse(BaseModel):
+    photo_id: UUID
+    object_key: str
+    upload_url: str
+    method: str
+    headers: Dict[str, str]
+    expires_at: datetime
+    upload_token: str # pass back to :complete
+
+class PhotoCompleteRequest(BaseModel):
+    photo_id: UUID
+    upload_token: str
+    size_bytes: Optional[int] = None
+    caption: Optional[str] = None
+
 class AnswerCreate(BaseModel):
     question_id: str
     value: Optional[str] = None # pass, fail, na
@@ -60,6 +92,87 @@ class AnswerResponse(BaseModel):
     photos: List[PhotoResponse] = []
     updated_at: Optional[datetime] = None
 
+class AnswerBatchRequest(BaseModel):
+    answers: List[AnswerCreate]
+
+class AnswerBatchResult(BaseModel):
+    question_id: str
+    status: str # ok, invalid
+    detail: Optional[str] = None
+    id: Optional[UUID] = None
+    value: Optional[str] = None
+    comment: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
+class AnswerBatchResponse(BaseModel):
+    applied: int
+    rejected: int
+    results: List[AnswerBatchResult]
+
+class AnswerChange(BaseModel):
+    id: UUID
+    question_id: str
+    value: Optional[str] = None
+    comment: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
+class PhotoChange(PhotoResponse):
+    answer_id: UUID
+    question_id: str
+
+class RunChangesResponse(BaseModel):
+    run_id: UUID
+    cursor: int # pass as ?since= on the next call
+    full: bool # everything was sent, not just changes; replace the local copy
+    run: Optional[RunResponse] = None
+    answers: List[AnswerChange] = []
+    photos: List[PhotoChange] = []
+    deleted_answers: List[UUID] = []
+    deleted_photos: List[UUID] = []
+
+class ClientMutation(BaseModel):
+    mutation_id: str # Client-generated and unique; a retry sends the same id
+    type: str # answer, photo_caption, photo_delete
+    client_updated_at: datetime # When the edit was made on the device
+    question_id: Optional[str] = None
+    value: Optional[str] = None
+    comment: Optional[str] = None
+    photo_id: Optional[UUID] = None
+    caption: Optional[str] = None
+
+class SyncApplyRequest(BaseModel):
+    device_id: Optional[str] = None
+    mutations: List[ClientMutation]
+
+class SyncMutationResult(BaseModel):
+    mutation_id: str
+    status: str # applied, conflict, duplicate, invalid
+    detail: Optional[str] = None
+    answer: Optional[AnswerChange] = None # The server's row after the batch, applied or not
+    photo: Optional[PhotoChange] = None
+
+class SyncApplyResponse(BaseModel):
+    applied: int
+    conflicts: int
+    duplicates: int
+    invalid: int
+    results: List[SyncMutationResult]
+
+class SyncConflictResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    mutation_id: str
+    device_id: Optional[str] = None
+    entity: str
+    entity_id: str
+    client_value: Optional[dict] = None
+    server_value: Optional[dict] = None
+    client_updated_at: datetime
+    server_updated_at: Optional[datetime] = None
+    resolution: str
+    created_at: datetime
+
 class ExportDeclarationItem(BaseModel):
     id: str
     label: str
@@ -67,5 +180,14 @@ class ExportDeclarationItem(BaseModel):
 class ExportRequest(BaseModel):
     declaration_checks: List[ExportDeclarationItem] = []
 
-class ExportResponse(BaseModel):
-    pdf_url: str
+class ExportJobResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    run_id: str
+    status: str # queued, running, done, failed
+    progress: float
+    pdf_url: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
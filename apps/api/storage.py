@@ -0,0 +1,353 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import shutil
+import time
+from typing import BinaryIO, Dict, NamedTuple, Optional
+from urllib.parse import urlencode
+
+# Photos and exports are stored under keys such as "uploads/<id>.jpg" and
+# "exports/<name>.pdf". The filesystem backend maps keys to paths relative to
+# STORAGE_ROOT, so keys are the same strings ChecklistPhoto.file_path always held.
+# Rendering and thumbnailing need real files; local_path() gives one, downloading
+# remote objects into a local mirror first.
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "fs")
+STORAGE_ROOT = os.getenv("STORAGE_ROOT", ".")
+STORAGE_CACHE_DIR = os.getenv("STORAGE_CACHE_DIR", "storage_cache")
+STORAGE_URL_EXPIRES = int(os.getenv("STORAGE_URL_EXPIRES", "900"))
+# Signs upload URLs and tokens. Every API process must share it; unset, each process
+# makes up its own and rejects what the others signed (see check_signing_key)
+STORAGE_SIGNING_KEY_SET = bool(os.getenv("STORAGE_SIGNING_KEY"))
+STORAGE_SIGNING_KEY = os.getenv("STORAGE_SIGNING_KEY") or base64.b64encode(os.urandom(32)).decode("ascii")
+# Worker processes uvicorn and gunicorn start when not told otherwise on the command line
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+S3_BUCKET = os.getenv("S3_BUCKET", "bcqa")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")  # e.g. http://minio:9000
+S3_PUBLIC_ENDPOINT_URL = os.getenv("S3_PUBLIC_ENDPOINT_URL")  # host browsers use, if different
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+S3_PREFIX = os.getenv("S3_PREFIX", "")
+S3_MULTIPART_CHUNK_BYTES = int(os.getenv("S3_MULTIPART_CHUNK_BYTES", str(8 * 1024 * 1024)))
+
+COPY_CHUNK_BYTES = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+def check_signing_key():
+    """Refuses to start several workers without a shared STORAGE_SIGNING_KEY; warns otherwise."""
+    if STORAGE_SIGNING_KEY_SET:
+        return
+    if WEB_CONCURRENCY > 1:
+        raise RuntimeError(
+            f"STORAGE_SIGNING_KEY must be set when running {WEB_CONCURRENCY} workers (WEB_CONCURRENCY): "
+            "each would sign upload URLs and tokens with its own random key and reject the others'"
+        )
+    logger.warning(
+        "STORAGE_SIGNING_KEY is not set; using a random key for this process. Upload URLs and tokens "
+        "stop working on restart, and on any other API process, such as a second uvicorn --workers worker"
+    )
+
+def _signature(message: str, key: str = STORAGE_SIGNING_KEY) -> str:
+    digest = hmac.new(key.encode("utf-8"), message.encode("utf-8"), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode("ascii").rstrip("=")
+
+def sign_token(payload: dict, expires_at: int) -> str:
+    """An opaque token carrying `payload`, valid until `expires_at` (epoch seconds)."""
+    body = base64.urlsafe_b64encode(json.dumps({**payload, "exp": expires_at}, sort_keys=True).encode("utf-8"))
+    body = body.decode("ascii").rstrip("=")
+    return f"{body}.{_signature(body)}"
+
+def read_token(token: str) -> Optional[dict]:
+    """The payload of a token from sign_token(), or None if it is forged or expired."""
+    body, _, signature = token.partition(".")
+    if not signature or not hmac.compare_digest(_signature(body), signature):
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)))
+    except ValueError:
+        return None
+    if payload.pop("exp", 0) < time.time():
+        return None
+    return payload
+
+class StoredObject(NamedTuple):
+    size: int
+    content_type: Optional[str]
+
+class PresignedUpload(NamedTuple):
+    url: str
+    method: str
+    headers: Dict[str, str]
+    expires_at: int
+
+class Storage:
+    """Where photo and export bytes live. Subclasses implement the primitives below."""
+
+    is_local = False
+
+    def save(self, key: str, src: BinaryIO, content_type: Optional[str] = None) -> int:
+        """Streams `src` to `key` without reading it into memory; returns the bytes written."""
+        raise NotImplementedError
+
+    def put_file(self, key: str, local_path: str, content_type: Optional[str] = None):
+        """Stores an existing local file under `key`. The filesystem backend moves it
+        into place; remote backends upload a copy and leave it to the caller."""
+        raise NotImplementedError
+
+    def head(self, key: str) -> Optional[StoredObject]:
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        return self.head(key) is not None
+
+    def read_prefix(self, key: str, length: int) -> bytes:
+        """The first `length` bytes of `key` (fewer if it is shorter), e.g. to sniff its type."""
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        """Removes `key`; a missing object is not an error."""
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> Optional[str]:
+        """A local file holding `key`'s bytes, or None if there is no such object."""
+        raise NotImplementedError
+
+    def cached_path(self, key: str) -> str:
+        """Where local_path() puts `key`, without fetching it. For cleaning up local derivatives."""
+        raise NotImplementedError
+
+    def download_url(self, key: str, expires: int = STORAGE_URL_EXPIRES) -> Optional[str]:
+        """A URL clients can fetch `key` from directly, or None if the API has to serve it."""
+        return None
+
+    def presign_upload(self, key: str, content_type: str, expires: int = STORAGE_URL_EXPIRES) -> PresignedUpload:
+        """A URL the client can PUT `key`'s bytes to without going through this API."""
+        raise NotImplementedError
+
+class FileSystemStorage(Storage):
+    is_local = True
+
+    def __init__(self, root: str = STORAGE_ROOT, signing_key: str = STORAGE_SIGNING_KEY):
+        self.root = root
+        self._root_abs = os.path.abspath(root)
+        self._signing_key = signing_key
+
+    def _path(self, key: str) -> str:
+        # Keys are relative to the store; an absolute key or one with ".." that would
+        # leave it is refused (symlinks inside the store are the operator's business)
+        path = os.path.abspath(os.path.join(self._root_abs, key))
+        if os.path.commonpath([self._root_abs, path]) != self._root_abs or path == self._root_abs:
+            raise ValueError(f"Invalid storage key {key!r}")
+        return path
+
+    def save(self, key: str, src: BinaryIO, content_type: Optional[str] = None) -> int:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        written = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                while True:
+                    chunk = src.read(COPY_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    written += len(chunk)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return written
+
+    def put_file(self, key: str, local_path: str, content_type: Optional[str] = None):
+        path = self._path(key)
+        if os.path.abspath(path) == os.path.abspath(local_path):
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        shutil.move(local_path, path)
+
+    def head(self, key: str) -> Optional[StoredObject]:
+        try:
+            return StoredObject(os.stat(self._path(key)).st_size, None)
+        except (OSError, ValueError):
+            return None
+
+    def read_prefix(self, key: str, length: int) -> bytes:
+        with open(self._path(key), "rb") as f:
+            return f.read(length)
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        return path if os.path.exists(path) else None
+
+    def cached_path(self, key: str) -> str:
+        return self._path(key)
+
+    def sign(self, key: str, content_type: str, expires_at: int) -> str:
+        return _signature(f"PUT\n{key}\n{content_type}\n{expires_at}", self._signing_key)
+
+    def verify(self, key: str, content_type: str, expires_at: int, signature: str) -> bool:
+        if expires_at < time.time():
+            return False
+        return hmac.compare_digest(self.sign(key, content_type, expires_at), signature)
+
+    def presign_upload(self, key: str, content_type: str, expires: int = STORAGE_URL_EXPIRES) -> PresignedUpload:
+        # There is no separate object store to upload to, so the "presigned" URL is
+        # the API's own PUT /uploads/{name} route, authorized by an HMAC instead of a session
+        expires_at = int(time.time()) + expires
+        query = urlencode({"expires": expires_at, "signature": self.sign(key, content_type, expires_at)})
+        return PresignedUpload(f"/{key}?{query}", "PUT", {"Content-Type": content_type}, expires_at)
+
+class S3Storage(Storage):
+    """S3-compatible object storage (AWS, MinIO, or moto in tests) via boto3."""
+
+    def __init__(
+        self,
+        bucket: str = S3_BUCKET,
+        endpoint_url: Optional[str] = S3_ENDPOINT_URL,
+        region: str = S3_REGION,
+        prefix: str = S3_PREFIX,
+        cache_dir: str = STORAGE_CACHE_DIR,
+        public_endpoint_url: Optional[str] = S3_PUBLIC_ENDPOINT_URL,
+        client=None,
+    ):
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.config import Config
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.cache_dir = cache_dir
+        config = Config(signature_version="s3v4", s3={"addressing_style": "path"})
+        self.client = client or boto3.client("s3", endpoint_url=endpoint_url, region_name=region, config=config)
+        # Presigned URLs embed the host, so sign them for the endpoint browsers can reach
+        self.presign_client = (
+            boto3.client("s3", endpoint_url=public_endpoint_url, region_name=region, config=config)
+            if public_endpoint_url and client is None
+            else self.client
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=S3_MULTIPART_CHUNK_BYTES,
+            multipart_chunksize=S3_MULTIPART_CHUNK_BYTES,
+        )
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _extra(self, content_type: Optional[str]) -> Optional[dict]:
+        return {"ContentType": content_type} if content_type else None
+
+    def save(self, key: str, src: BinaryIO, content_type: Optional[str] = None) -> int:
+        counter = _CountingReader(src)
+        # upload_fileobj switches to a multipart upload past the threshold and only
+        # holds one part per thread in memory
+        self.client.upload_fileobj(
+            counter, self.bucket, self._key(key), ExtraArgs=self._extra(content_type), Config=self.transfer_config
+        )
+        return counter.count
+
+    def put_file(self, key: str, local_path: str, content_type: Optional[str] = None):
+        self.client.upload_file(
+            local_path, self.bucket, self._key(key), ExtraArgs=self._extra(content_type), Config=self.transfer_config
+        )
+
+    def head(self, key: str) -> Optional[StoredObject]:
+        from botocore.exceptions import ClientError
+
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return StoredObject(response["ContentLength"], response.get("ContentType"))
+
+    def read_prefix(self, key: str, length: int) -> bytes:
+        response = self.client.get_object(Bucket=self.bucket, Key=self._key(key), Range=f"bytes=0-{length - 1}")
+        return response["Body"].read()
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+        try:
+            os.remove(self.cached_path(key))
+        except FileNotFoundError:
+            pass
+
+    def cached_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, *key.split("/"))
+
+    def local_path(self, key: str) -> Optional[str]:
+        from botocore.exceptions import ClientError
+
+        path = self.cached_path(key)
+        if os.path.exists(path):
+            # Keys are never rewritten in place, so a mirrored copy stays valid
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            self.client.download_file(self.bucket, self._key(key), tmp_path, Config=self.transfer_config)
+            os.replace(tmp_path, path)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return path
+
+    def download_url(self, key: str, expires: int = STORAGE_URL_EXPIRES) -> Optional[str]:
+        return self.presign_client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": self._key(key)}, ExpiresIn=expires
+        )
+
+    def presign_upload(self, key: str, content_type: str, expires: int = STORAGE_URL_EXPIRES) -> PresignedUpload:
+        url = self.presign_client.generate_presigned_url(
+            "put_object",
+            Params={"Bucket": self.bucket, "Key": self._key(key), "ContentType": content_type},
+            ExpiresIn=expires,
+        )
+        return PresignedUpload(url, "PUT", {"Content-Type": content_type}, int(time.time()) + expires)
+
+class _CountingReader:
+    def __init__(self, src: BinaryIO):
+        self.src = src
+        self.count = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.src.read(size)
+        self.count += len(chunk)
+        return chunk
+
+_storage: Optional[Storage] = None
+_storage_pid: Optional[int] = None
+
+def get_storage() -> Storage:
+    """The configured backend. Built per process: boto3 clients must not cross a fork."""
+    global _storage, _storage_pid
+    if _storage is None or _storage_pid != os.getpid():
+        if STORAGE_BACKEND == "fs":
+            _storage = FileSystemStorage()
+        elif STORAGE_BACKEND == "s3":
+            _storage = S3Storage()
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}")
+        _storage_pid = os.getpid()
+    return _storage
+
+def set_storage(storage: Storage):
+    """Replaces the backend for this process, e.g. with an S3Storage against a moto server."""
+    global _storage, _storage_pid
+    _storage = storage
+    _storage_pid = os.getpid()
@@ -37,6 +37,12 @@ interface Run {
   ap_count: number
   status: string
   created_at: string
+  stats?: {
+    completion_percentage: number
+    answered_questions: number
+    total_questions: number
+    photo_count: number
+  } | null
 }
 
 const EDIT_TECH_BANDS: TechBand[] = [
@@ -86,7 +92,7 @@ export default function Home() {
 
   const fetchRuns = useCallback(async () => {
     try {
-      const res = await fetch(`/api/runs`)
+      const res = await fetch(`/api/runs?include=stats`)
       if (res.ok) {
         const data = await res.json()
         setRuns(data)
@@ -211,7 +217,10 @@ export default function Home() {
                     <Card className="hover:bg-accent/50 transition-colors cursor-pointer h-full">
                       <CardHeader className="relative">
                         <CardTitle>{run.site_name}</CardTitle>
-                        <CardDescription>{run.p_ref} • {run.status}</CardDescription>
+                        <CardDescription>
+                          {run.p_ref} • {run.status}
+                          {run.stats && ` • ${run.stats.completion_percentage}% complete`}
+                        </CardDescription>
                       </CardHeader>
                       <CardContent>
                         <div className="text-sm text-muted-foreground">
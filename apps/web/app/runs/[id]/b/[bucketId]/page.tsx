@@ -60,7 +60,7 @@ export default function BucketDetailPage() {
         setRun(runData.run || null)
         setAnswers(runData.answers || {})
 
-        const tmplRes = await fetch(`/api/templates/${runData.template_summary.id}`)
+        const tmplRes = await fetch(`/api/templates/${runData.template_summary.id}?version=${encodeURIComponent(runData.template_summary.version)}`)
         const tmplData = await tmplRes.json()
         
         const b = tmplData.buckets.find((b: any) => b.bucket_id === params.bucketId)
@@ -84,8 +84,21 @@ export default function RunExportPage() {
         throw new Error(detail || "Export failed")
       }
 
-      const payload = await res.json()
-      const pdfUrl: string = payload.pdf_url
+      let job = await res.json()
+      while (job.status === "queued" || job.status === "running") {
+        await new Promise((resolve) => setTimeout(resolve, 1000))
+        const jobRes = await fetch(`/api/exports/jobs/${job.id}`, { cache: "no-store" })
+        if (!jobRes.ok) {
+          const detail = await jobRes.text()
+          throw new Error(detail || "Export failed")
+        }
+        job = await jobRes.json()
+      }
+      if (job.status !== "done") {
+        throw new Error(job.error || "Export failed")
+      }
+
+      const pdfUrl: string = job.pdf_url
       const finalUrl = (() => {
         if (!pdfUrl) return pdfUrl
         try {
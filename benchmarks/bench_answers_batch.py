@@ -0,0 +1,65 @@
+"""Times writing N answers one request at a time vs. one PUT /runs/{id}/answers:batch.
+
+    python benchmarks/bench_answers_batch.py --answers 500
+
+Set BENCH_DATABASE_URL to a Postgres URL to measure real round trips; the
+default SQLite file understates per-statement latency.
+"""
+import argparse
+import random
+import time
+
+from synthetic import sandbox, write_template, create_run, question_id
+
+sandbox("bcqa_answers_")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from apps.api.database import engine
+from apps.api.main import app
+
+statements = []
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    statements.append(statement)
+
+def payload(template_id: str, n: int):
+    return [
+        {"question_id": question_id(template_id, i), "value": random.choice(["pass", "fail", "na"]), "comment": None}
+        for i in range(n)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--answers", type=int, default=500)
+    args = parser.parse_args()
+
+    template_id = write_template(args.answers)
+    client = TestClient(app)
+
+    for label in ("insert", "update"):
+        run_single = create_run(client, template_id) if label == "insert" else run_single
+        run_batch = create_run(client, template_id) if label == "insert" else run_batch
+        answers = payload(template_id, args.answers)
+
+        statements.clear()
+        start = time.perf_counter()
+        for a in answers:
+            client.post(f"/runs/{run_single}/answers", json=a).raise_for_status()
+        t_single = time.perf_counter() - start
+        n_single = len(statements)
+
+        statements.clear()
+        start = time.perf_counter()
+        client.put(f"/runs/{run_batch}/answers:batch", json={"answers": answers}).raise_for_status()
+        t_batch = time.perf_counter() - start
+        n_batch = len(statements)
+
+        print(f"{label}: {args.answers} answers")
+        print(f"  POST /answers x{args.answers}: {t_single * 1000:9.1f} ms  {n_single:6d} statements")
+        print(f"  PUT  /answers:batch:    {t_batch * 1000:9.1f} ms  {n_batch:6d} statements  ({t_single / t_batch:.1f}x)")
+
+if __name__ == "__main__":
+    main()
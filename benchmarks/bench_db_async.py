@@ -0,0 +1,136 @@
+"""Load test of the hot run routes with the sync (threadpool) and async (DB_ASYNC=1) database sessions.
+
+    python benchmarks/bench_db_async.py --clients 500 --duration 20
+    BENCH_DATABASE_URL=postgresql+psycopg2://... python benchmarks/bench_db_async.py
+
+Starts the API under uvicorn once per mode, seeds a run, then has --clients
+concurrent clients loop for --duration seconds: most requests read the run
+(GET /runs/{id}), the rest save an answer (POST /runs/{id}/answers). Reports
+throughput, latency percentiles, errors and the peak pool utilisation from
+/db/pool/stats. Pool settings come from the DB_POOL_* environment variables,
+as they do for the API. The load generator shares the machine with the
+server, so compare the two modes rather than reading the absolute numbers.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from synthetic import ROOT, question_id, sandbox, write_template
+from load_uploads import free_port
+
+import httpx
+
+def percentile(ms, p: float) -> float:
+    return ms[min(len(ms) - 1, int(len(ms) * p))] if ms else 0.0
+
+async def client_loop(client, run_id, template_id, n_questions, write_ratio, deadline, rng, latencies, errors):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                res = await client.post(f"/runs/{run_id}/answers", json={
+                    "question_id": question_id(template_id, rng.randrange(n_questions)),
+                    "value": rng.choice(["pass", "fail", "na"]),
+                })
+            else:
+                res = await client.get(f"/runs/{run_id}")
+            if res.status_code != 200:
+                errors[str(res.status_code)] = errors.get(str(res.status_code), 0) + 1
+                continue
+        except httpx.HTTPError as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            continue
+        latencies.append(time.perf_counter() - start)
+
+async def drive(base_url, template_id, n_questions, clients, duration, write_ratio) -> dict:
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        res = await client.post("/runs/", json={
+            "template_id": template_id, "p_ref": "0", "site_name": "Bench", "engineer_name": "Bench",
+            "visit_date": "2026-01-01", "tech_bands": [1800], "ap_count": 0,
+        })
+        res.raise_for_status()
+        run_id = res.json()["id"]
+        for i in range(0, n_questions, 2):
+            (await client.post(f"/runs/{run_id}/answers", json={
+                "question_id": question_id(template_id, i), "value": "pass",
+            })).raise_for_status()
+
+        (await client.post("/db/pool/stats:reset")).raise_for_status()
+        latencies, errors = [], {}
+        deadline = time.perf_counter() + duration
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            client_loop(client, run_id, template_id, n_questions, write_ratio, deadline, random.Random(i), latencies, errors)
+            for i in range(clients)
+        ))
+        elapsed = time.perf_counter() - start
+        pool = (await client.get("/db/pool/stats")).json()
+
+    ms = sorted(s * 1000 for s in latencies)
+    return {
+        "requests": len(ms),
+        "rps": round(len(ms) / elapsed, 1),
+        "p50_ms": round(percentile(ms, 0.50), 1),
+        "p95_ms": round(percentile(ms, 0.95), 1),
+        "p99_ms": round(percentile(ms, 0.99), 1),
+        "errors": errors,
+        "pool": pool["async"] or pool["sync"],
+    }
+
+def run_mode(async_mode: bool, template_id, n_questions, args) -> dict:
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=ROOT, DB_ASYNC="1" if async_mode else "0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "apps.api.main:app", "--port", str(port), "--log-level", "warning",
+         "--backlog", str(max(2048, args.clients * 2))],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                if httpx.get(f"{base_url}/healthz").status_code == 200:
+                    break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        return asyncio.run(drive(base_url, template_id, n_questions, args.clients, args.duration, args.write_ratio))
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--modes", default="sync,async")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    sandbox("bcqa_db_async_")
+    template_id = write_template(args.questions)
+    results = {}
+    for mode in args.modes.split(","):
+        results[mode] = run_mode(mode == "async", template_id, args.questions, args)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{args.clients} clients, {args.duration:.0f} s, {args.write_ratio:.0%} writes, {args.questions} questions")
+    for mode, r in results.items():
+        pool = r["pool"]
+        peak = f"{pool['peak_checked_out']}/{pool['capacity']}" if pool["capacity"] else str(pool["peak_checked_out"])
+        print(
+            f"{mode:<6} {r['rps']:8.1f} req/s  p50={r['p50_ms']:7.1f} ms  p95={r['p95_ms']:7.1f} ms  "
+            f"p99={r['p99_ms']:7.1f} ms  errors={sum(r['errors'].values())}  peak pool={peak}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Times repeated exports of the same photos with the decoded-image cache on and off.
+
+    python benchmarks/bench_image_cache.py --photos 200 --exports 5
+
+Print derivatives are built once up front, so every pass measures what a
+re-export of an unchanged site costs: the first export with the cache on pays
+the decodes, later ones should be hits.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench_pdf_sections import make_photo, make_snapshot
+
+from apps.api.image_cache import ImageCache
+from apps.api import pdf_render
+
+def run_exports(snapshot, out: str, exports: int, max_bytes: int):
+    cache = ImageCache(max_bytes=max_bytes)
+    pdf_render.image_cache = cache
+    timings = []
+    for _ in range(exports):
+        start = time.perf_counter()
+        pdf_render.render_run_pdf(snapshot, out, workers=1)
+        timings.append(time.perf_counter() - start)
+    return timings, cache.stats()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--photos", type=int, default=200)
+    parser.add_argument("--buckets", type=int, default=10)
+    parser.add_argument("--exports", type=int, default=5)
+    parser.add_argument("--size", default="2016x1512", help="source photo size in pixels")
+    args = parser.parse_args()
+    size = tuple(int(v) for v in args.size.split("x"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        photo_paths = []
+        for i in range(args.photos):
+            path = os.path.join(tmp, f"photo_{i}.jpg")
+            make_photo(path, size)
+            photo_paths.append(path)
+            pdf_render.print_image_path(path)
+        snapshot = make_snapshot(photo_paths, args.buckets)
+        out = os.path.join(tmp, "out.pdf")
+
+        print(f"photos: {args.photos}  exports: {args.exports}")
+        print(f"{'cache':>5} {'first s':>8} {'rest avg s':>11} {'hit rate':>9} {'decode s':>9} {'saved s':>8} {'MiB':>6}")
+        for label, max_bytes in (("off", 0), ("on", 1 << 40)):
+            timings, stats = run_exports(snapshot, out, args.exports, max_bytes)
+            rest = timings[1:] or timings
+            print(
+                f"{label:>5} {timings[0]:8.2f} {sum(rest) / len(rest):11.2f} {stats['hit_rate']:9.2f} "
+                f"{stats['decode_seconds']:9.2f} {stats['saved_seconds']:8.2f} {stats['bytes'] / (1 << 20):6.0f}"
+            )
+
+if __name__ == "__main__":
+    main()
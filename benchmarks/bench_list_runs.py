@@ -0,0 +1,102 @@
+"""Times GET /runs pages at increasing depth: offset (skip) paging vs. keyset cursors.
+
+    python benchmarks/bench_list_runs.py --runs 1000000
+
+Inserts synthetic runs straight into the table, then walks the listing with
+both strategies and reports per-page latency at a few depths. Keyset pages
+should stay flat; offset pages grow with the number of rows skipped. Set
+BENCH_DATABASE_URL to a Postgres URL to measure against the real planner.
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from synthetic import sandbox
+
+sandbox("bcqa_list_runs_")
+
+from fastapi.testclient import TestClient
+
+from apps.api.database import engine, SessionLocal
+from apps.api.main import app
+from apps.api.models import ChecklistRun
+from apps.api.routers.runs import _encode_cursor
+
+INSERT_CHUNK = 50_000
+STATUSES = ["draft", "in_progress", "submitted"]
+ENGINEERS = [f"Engineer {i}" for i in range(200)]
+TEMPLATES = [f"tpl_{i}" for i in range(20)]
+
+def seed(n_runs: int):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rng = random.Random(42)
+    table = ChecklistRun.__table__
+    with engine.begin() as conn:
+        for offset in range(0, n_runs, INSERT_CHUNK):
+            rows = []
+            for i in range(offset, min(offset + INSERT_CHUNK, n_runs)):
+                created = start + timedelta(seconds=i * 30)
+                rows.append({
+                    "id": uuid.uuid4(),
+                    "template_id": rng.choice(TEMPLATES),
+                    "status": rng.choice(STATUSES),
+                    "p_ref": f"P-{i:07d}",
+                    "site_name": f"Site {i}",
+                    "engineer_name": rng.choice(ENGINEERS),
+                    "visit_date": created.date(),
+                    "tech_bands": [],
+                    "ap_count": 0,
+                    "created_at": created,
+                })
+            conn.execute(table.insert(), rows)
+
+def timed_get(client: TestClient, params: dict):
+    start = time.perf_counter()
+    resp = client.get("/runs/", params=params)
+    resp.raise_for_status()
+    return time.perf_counter() - start, resp
+
+def cursor_at(depth_pages: int, limit: int, extra: dict):
+    """The cursor a client would hold after paging `depth_pages` pages; found with one untimed query."""
+    if depth_pages == 0:
+        return None
+    with SessionLocal() as db:
+        q = db.query(ChecklistRun)
+        if "status" in extra:
+            q = q.filter(ChecklistRun.status == extra["status"])
+        run = (
+            q.order_by(ChecklistRun.created_at.desc(), ChecklistRun.id.desc())
+            .offset(depth_pages * limit - 1)
+            .first()
+        )
+        return _encode_cursor(run) if run else None
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--depths", default="0,10,100,1000,3000,9000")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    seed(args.runs)
+    print(f"seeded {args.runs} runs in {time.perf_counter() - t0:.1f}s")
+
+    client = TestClient(app)
+    depths = [int(d) for d in args.depths.split(",") if int(d) * args.limit < args.runs]
+
+    for label, extra in (("all", {}), ("status=submitted", {"status": "submitted"})):
+        print(f"\n{label}, limit={args.limit}")
+        print(f"{'page':>8} {'offset ms':>10} {'cursor ms':>10}")
+        for depth in depths:
+            cursor = cursor_at(depth, args.limit, extra)
+            if depth and cursor is None:
+                continue  # the filter leaves fewer pages than this
+            offset_s, _ = timed_get(client, dict(extra, limit=args.limit, skip=depth * args.limit))
+            cursor_s, _ = timed_get(client, dict(extra, limit=args.limit, **({"cursor": cursor} if cursor else {})))
+            print(f"{depth:>8} {offset_s * 1000:10.1f} {cursor_s * 1000:10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Compares PDF export size and render time with and without print derivatives.
+
+Run from the repository root:
+
+    python benchmarks/bench_pdf_images.py --photos 40
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from PIL import Image
+
+from apps.api.images import print_derivative_path, PDF_IMAGE_DPI
+from apps.api.pdf_render import render_run_pdf
+
+def make_photo(path: str, size=(4032, 3024)):
+    # Noise keeps JPEG sizes close to real phone photos (several MB each)
+    w, h = size
+    img = Image.effect_noise((w // 4, h // 4), 64).convert("RGB").resize((w, h))
+    img.save(path, format="JPEG", quality=92)
+
+def make_snapshot(photo_paths):
+    questions = [{"question_id": f"Q-BENCH-{i:03d}", "text": f"Synthetic question {i}"} for i in range(len(photo_paths))]
+    answers = {
+        q["question_id"]: {
+            "value": random.choice(["pass", "fail", "na"]),
+            "comment": "",
+            "photos": [{"url": "", "file_path": path, "caption": None}],
+        }
+        for q, path in zip(questions, photo_paths)
+    }
+    return {
+        "run": {"site_name": "Bench", "p_ref": "0", "engineer_name": "Bench", "status": "draft", "ap_count": 0},
+        "template": {
+            "id": "bench",
+            "name": "Bench",
+            "version": "1",
+            "buckets": [{"bucket_id": "site", "title": "Site", "groups": [{"title": "Group", "questions": questions}]}],
+        },
+        "answers": answers,
+        "declaration_checks": [],
+    }
+
+def timed_render(snapshot, out_path, dpi):
+    start = time.perf_counter()
+    render_run_pdf(snapshot, out_path, image_dpi=dpi)
+    return time.perf_counter() - start, os.path.getsize(out_path)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--photos", type=int, default=20)
+    parser.add_argument("--dpi", type=int, default=PDF_IMAGE_DPI)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        photo_paths = []
+        for i in range(args.photos):
+            path = os.path.join(tmp, f"photo_{i}.jpg")
+            make_photo(path)
+            photo_paths.append(path)
+        source_bytes = sum(os.path.getsize(p) for p in photo_paths)
+        snapshot = make_snapshot(photo_paths)
+
+        t_orig, size_orig = timed_render(snapshot, os.path.join(tmp, "original.pdf"), 0)
+        # First derivative render pays the downscale cost; the second reuses the cached files
+        t_cold, size_deriv = timed_render(snapshot, os.path.join(tmp, "derived_cold.pdf"), args.dpi)
+        t_warm, _ = timed_render(snapshot, os.path.join(tmp, "derived_warm.pdf"), args.dpi)
+        deriv_bytes = sum(os.path.getsize(print_derivative_path(p, args.dpi)) for p in photo_paths)
+
+    mb = 1024 * 1024
+    print(f"photos: {args.photos}  source: {source_bytes / mb:.1f} MB  derivatives @ {args.dpi} dpi: {deriv_bytes / mb:.1f} MB")
+    print(f"original embed:   {size_orig / mb:8.1f} MB  {t_orig:6.2f} s")
+    print(f"derivative cold:  {size_deriv / mb:8.1f} MB  {t_cold:6.2f} s")
+    print(f"derivative warm:  {size_deriv / mb:8.1f} MB  {t_warm:6.2f} s")
+
+if __name__ == "__main__":
+    main()
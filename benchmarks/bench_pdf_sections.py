@@ -0,0 +1,82 @@
+"""Times PDF export of a photo-heavy run with sections rendered serially vs. in a process pool.
+
+    python benchmarks/bench_pdf_sections.py --photos 500 --buckets 10 --workers 1,2,4
+
+Each worker count is measured cold (print derivatives deleted, so every photo is
+decoded and downscaled) and warm (derivatives cached from the cold pass).
+"""
+import argparse
+import glob
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from PIL import Image
+from pypdf import PdfReader
+
+from apps.api.pdf_render import render_run_pdf
+
+def make_photo(path: str, size):
+    w, h = size
+    img = Image.effect_noise((w // 4, h // 4), 64).convert("RGB").resize((w, h))
+    img.save(path, format="JPEG", quality=90)
+
+def make_snapshot(photo_paths, n_buckets: int):
+    buckets = []
+    answers = {}
+    per_bucket = max(1, len(photo_paths) // n_buckets)
+    for b in range(n_buckets):
+        questions = []
+        for i, path in enumerate(photo_paths[b * per_bucket:(b + 1) * per_bucket]):
+            qid = f"Q-BENCH-{b:02d}-{i:03d}"
+            questions.append({"question_id": qid, "text": f"Synthetic question {i}"})
+            answers[qid] = {
+                "value": random.choice(["pass", "fail", "na"]),
+                "comment": "",
+                "photos": [{"url": "", "file_path": path, "caption": f"Photo {i}"}],
+            }
+        buckets.append({"bucket_id": f"b{b}", "title": f"Bucket {b}", "groups": [{"title": "Group", "questions": questions}]})
+    return {
+        "run": {"site_name": "Bench", "p_ref": "0", "engineer_name": "Bench", "status": "draft", "ap_count": 0},
+        "template": {"id": "bench", "name": "Bench", "version": "1", "buckets": buckets},
+        "answers": answers,
+        "declaration_checks": ["Bench declaration"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--photos", type=int, default=500)
+    parser.add_argument("--buckets", type=int, default=10)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--size", default="2016x1512", help="source photo size in pixels")
+    args = parser.parse_args()
+    size = tuple(int(v) for v in args.size.split("x"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        photo_paths = []
+        for i in range(args.photos):
+            path = os.path.join(tmp, f"photo_{i}.jpg")
+            make_photo(path, size)
+            photo_paths.append(path)
+        snapshot = make_snapshot(photo_paths, args.buckets)
+
+        print(f"photos: {args.photos}  buckets: {args.buckets}  cpus: {os.cpu_count()}")
+        print(f"{'workers':>7} {'cold s':>8} {'warm s':>8} {'pages':>6}")
+        for workers in [int(w) for w in args.workers.split(",")]:
+            for derivative in glob.glob(os.path.join(tmp, "*_print*.jpg")):
+                os.remove(derivative)
+            out = os.path.join(tmp, f"out_{workers}.pdf")
+            timings = []
+            for _ in ("cold", "warm"):
+                start = time.perf_counter()
+                render_run_pdf(snapshot, out, workers=workers)
+                timings.append(time.perf_counter() - start)
+            pages = len(PdfReader(out).pages)
+            print(f"{workers:>7} {timings[0]:8.2f} {timings[1]:8.2f} {pages:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Times progress/summary computation for many runs: per-question dict loops vs. ProgressEngine.
+
+    python benchmarks/bench_progress.py --runs 10000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+from synthetic import ROOT, template_dict
+
+sys.path.insert(0, os.path.join(ROOT, "packages", "checklist-engine"))
+
+from checklist_engine import ChecklistTemplate
+
+def random_answers(question_ids, fill: float):
+    return {
+        qid: random.choice(["pass", "pass", "pass", "fail", "na"])
+        for qid in question_ids
+        if random.random() < fill
+    }
+
+def naive_summary(template, answers):
+    # What get_run_details did before: walk the tree and look each question up
+    buckets = {}
+    passed = failed = na = 0
+    failed_critical = []
+    required_missing = []
+    for bucket in template.buckets:
+        total = answered = 0
+        for group in bucket.groups:
+            for q in group.questions:
+                total += 1
+                value = answers.get(q.question_id)
+                if value:
+                    answered += 1
+                    if value == "pass":
+                        passed += 1
+                    elif value == "fail":
+                        failed += 1
+                        if q.severity == "critical":
+                            failed_critical.append(q.question_id)
+                    elif value == "na":
+                        na += 1
+                elif q.required:
+                    required_missing.append(q.question_id)
+        buckets[bucket.bucket_id] = (total, answered)
+    return buckets, passed, failed, na, failed_critical, required_missing
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10000)
+    parser.add_argument("--questions", type=int, nargs="+", default=[65, 300, 1000])
+    args = parser.parse_args()
+
+    for n in args.questions:
+        template = ChecklistTemplate(**template_dict(n))
+        runs = [random_answers(template.index.question_ids, random.random()) for _ in range(args.runs)]
+
+        start = time.perf_counter()
+        for answers in runs:
+            naive_summary(template, answers)
+        t_naive = time.perf_counter() - start
+
+        engine = template.progress
+        start = time.perf_counter()
+        for answers in runs:
+            engine.summarize(answers)
+        t_single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = engine.summarize_batch(runs)
+        t_batch = time.perf_counter() - start
+
+        start = time.perf_counter()
+        summaries = [batch.summary(row) for row in range(len(batch))]
+        t_many = t_batch + time.perf_counter() - start
+
+        # Sanity check against the naive walk
+        for answers, summary in zip(runs[:50], summaries[:50]):
+            _, passed, failed, na, _, missing = naive_summary(template, answers)
+            assert (passed, failed, na) == (summary.totals.passed, summary.totals.failed, summary.totals.na)
+            assert tuple(missing) == summary.required_missing
+
+        print(f"{n} questions x {args.runs} runs")
+        print(f"  naive tree walk:            {t_naive:6.2f} s")
+        print(f"  engine.summarize per run:   {t_single:6.2f} s  ({t_naive / t_single:.1f}x)")
+        print(f"  engine.summarize_batch:     {t_batch:6.2f} s  ({t_naive / t_batch:.1f}x, bucket+group tallies as arrays)")
+        print(f"  engine.summarize_many:      {t_many:6.2f} s  ({t_naive / t_many:.1f}x, full RunSummary per run)")
+
+if __name__ == "__main__":
+    main()
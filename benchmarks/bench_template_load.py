@@ -0,0 +1,76 @@
+"""Times a cold TemplateLoader over plain JSON vs. JSON with compiled .tplc headers.
+
+    python benchmarks/bench_template_load.py --templates 20 --questions 100,1000,5000
+
+"startup" is list_meta(strict=True), what the API runs at boot and for GET
+/templates; "load_all" parses every template. Memory is what tracemalloc sees
+retained and at peak after startup.
+"""
+import argparse
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from synthetic import ROOT, template_dict
+
+sys.path.insert(0, os.path.join(ROOT, "packages", "checklist-engine"))
+
+from checklist_engine import TemplateLoader
+from checklist_engine.compiled import write_compiled
+
+def best_of(repeat: int, directory: str, use_compiled: bool, op) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        loader = TemplateLoader(directory, use_compiled=use_compiled)
+        start = time.perf_counter()
+        op(loader)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def measure(directory: str, use_compiled: bool, repeat: int):
+    startup = best_of(repeat, directory, use_compiled, lambda loader: loader.list_meta(strict=True))
+    full = best_of(repeat, directory, use_compiled, lambda loader: loader.load_all(strict=True))
+
+    gc.collect()
+    tracemalloc.start()
+    loader = TemplateLoader(directory, use_compiled=use_compiled)
+    loader.list_meta(strict=True)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del loader
+    return startup, full, retained, peak
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--templates", type=int, default=20)
+    parser.add_argument("--questions", default="100,1000,5000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'questions':>9} {'form':>9} {'startup ms':>11} {'load_all ms':>12} {'retained KiB':>13} {'peak KiB':>9}")
+    for n in [int(x) for x in args.questions.split(",")]:
+        directory = tempfile.mkdtemp(prefix="bcqa_tplload_")
+        try:
+            for i in range(args.templates):
+                path = os.path.join(directory, f"bench_{n}_{i}.json")
+                with open(path, "w") as f:
+                    json.dump(template_dict(n, template_id=f"bench_{n}_{i}"), f, indent=2)
+                write_compiled(path)
+
+            for label, use_compiled in (("json", False), ("compiled", True)):
+                startup, full, retained, peak = measure(directory, use_compiled, args.repeat)
+                print(
+                    f"{n:>9} {label:>9} {startup * 1000:11.1f} {full * 1000:12.1f} "
+                    f"{retained / 1024:13.0f} {peak / 1024:9.0f}"
+                )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
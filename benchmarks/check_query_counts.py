@@ -0,0 +1,103 @@
+"""Counts SQL statements issued per request and fails if any endpoint scales with question count.
+
+Uses a throwaway SQLite database and synthetic templates, so it needs no
+running Postgres. Run from the repository root:
+
+    python benchmarks/check_query_counts.py
+"""
+import sys
+import uuid
+
+from synthetic import sandbox, write_template, create_run, question_id
+
+QUESTION_COUNTS = [10, 100, 300]
+PHOTOS_PER_ANSWER = 2
+
+sandbox("bcqa_querycount_")
+template_ids = {n: write_template(n) for n in QUESTION_COUNTS}
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from apps.api.database import engine, SessionLocal
+from apps.api.main import app
+from apps.api.models import ChecklistAnswer, ChecklistPhoto
+
+statements = []
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    statements.append(statement)
+
+def seed_run(client: TestClient, n_questions: int) -> str:
+    template_id = template_ids[n_questions]
+    run_id = create_run(client, template_id)
+    db = SessionLocal()
+    try:
+        for i in range(n_questions):
+            answer = ChecklistAnswer(run_id=uuid.UUID(run_id), question_id=question_id(template_id, i), value="pass")
+            db.add(answer)
+            db.flush()
+            for _ in range(PHOTOS_PER_ANSWER):
+                photo_id = uuid.uuid4()
+                db.add(ChecklistPhoto(
+                    id=photo_id,
+                    answer_id=answer.id,
+                    url=f"/uploads/{photo_id}.jpg",
+                    file_path=f"uploads/{photo_id}.jpg",
+                ))
+        db.commit()
+    finally:
+        db.close()
+    return run_id
+
+def count(client: TestClient, method: str, url: str, **kwargs) -> int:
+    statements.clear()
+    res = client.request(method, url, **kwargs)
+    if res.status_code >= 400:
+        raise SystemExit(f"{method} {url} -> {res.status_code}: {res.text}")
+    return len(statements)
+
+def count_changes_after_batch(client: TestClient, run_id: str, n_questions: int) -> int:
+    cursor = client.get(f"/runs/{run_id}/changes").json()["cursor"]
+    template_id = template_ids[n_questions]
+    answers = [{"question_id": question_id(template_id, i), "value": "fail"} for i in range(n_questions)]
+    client.put(f"/runs/{run_id}/answers:batch", json={"answers": answers})
+    return count(client, "GET", f"/runs/{run_id}/changes?since={cursor}")
+
+def count_apply(client: TestClient, run_id: str, n_questions: int) -> int:
+    template_id = template_ids[n_questions]
+    mutations = [
+        {"mutation_id": str(uuid.uuid4()), "type": "answer", "question_id": question_id(template_id, i), "value": "na", "client_updated_at": "2030-01-01T00:00:00Z"}
+        for i in range(n_questions)
+    ]
+    # The first apply in a process also purges expired mutation ids
+    client.post(f"/runs/{run_id}/changes:apply", json={"mutations": []})
+    return count(client, "POST", f"/runs/{run_id}/changes:apply", json={"mutations": mutations})
+
+def main():
+    client = TestClient(app)
+    endpoints = {
+        "GET /runs/{id}": lambda rid, n: count(client, "GET", f"/runs/{rid}"),
+        "POST /runs/{id}/export": lambda rid, n: count(client, "POST", f"/runs/{rid}/export", json={"declaration_checks": []}),
+        "POST /runs/{id}/photos/thumbnails/regenerate": lambda rid, n: count(client, "POST", f"/runs/{rid}/photos/thumbnails/regenerate"),
+        "GET /runs/{id}/changes": lambda rid, n: count(client, "GET", f"/runs/{rid}/changes"),
+        "GET /runs/{id}/changes?since= (every answer)": lambda rid, n: count_changes_after_batch(client, rid, n),
+        "POST /runs/{id}/changes:apply (every answer)": lambda rid, n: count_apply(client, rid, n),
+    }
+    results = {name: {} for name in endpoints}
+    for n in QUESTION_COUNTS:
+        run_id = seed_run(client, n)
+        for name, fn in endpoints.items():
+            results[name][n] = fn(run_id, n)
+
+    failed = False
+    for name, counts in results.items():
+        line = "  ".join(f"{n:>4}q: {c:>3}" for n, c in counts.items())
+        scales = len(set(counts.values())) > 1
+        failed = failed or scales
+        print(f"{'FAIL' if scales else 'ok  '} {name:<48} {line}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Runs the same save/head/local_path/delete/presigned-upload round trip against each storage backend.
+
+    python benchmarks/check_storage.py                      # filesystem, plus S3 on moto if installed
+    python benchmarks/check_storage.py --endpoint http://localhost:9000 --bucket bcqa   # a MinIO server
+
+The S3 run needs boto3, plus moto unless --endpoint points at a real server
+(credentials come from the usual AWS_* variables).
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import urllib.request
+
+from synthetic import sandbox
+
+# The uploads router pulls in the database engine
+SANDBOX = sandbox("bcqa_storage_")
+
+from apps.api.storage import FileSystemStorage, S3Storage
+
+PAYLOAD_BYTES = 20 * 1024 * 1024  # above the multipart threshold
+
+def check(name: str, storage, put_url) -> bool:
+    ok = True
+
+    def expect(label: str, condition: bool):
+        nonlocal ok
+        ok = ok and condition
+        print(f"{'ok  ' if condition else 'FAIL'} {name:<5} {label}")
+
+    payload = os.urandom(PAYLOAD_BYTES)
+    key = "uploads/00000000-0000-0000-0000-00000000c0de.jpg"
+    expect("save streams every byte", storage.save(key, io.BytesIO(payload), "image/jpeg") == len(payload))
+    expect("head reports the size", (storage.head(key) or (None,))[0] == len(payload))
+    path = storage.local_path(key)
+    expect("local_path has the same bytes", path is not None and open(path, "rb").read() == payload)
+
+    thumb_key = "uploads/00000000-0000-0000-0000-00000000c0de_thumb.jpg"
+    tmp = os.path.join(tempfile.mkdtemp(), "thumb.tmp")
+    with open(tmp, "wb") as f:
+        f.write(b"thumb")
+    storage.put_file(thumb_key, tmp, "image/jpeg")
+    expect("put_file stores a local file", storage.exists(thumb_key))
+
+    direct_key = "uploads/00000000-0000-0000-0000-00000000beef.jpg"
+    upload = storage.presign_upload(direct_key, "image/jpeg")
+    status = put_url(upload, b"direct upload")
+    expect(f"presigned PUT accepted ({status})", status in (200, 204))
+    expect("presigned PUT stored the bytes", (storage.head(direct_key) or (None,))[0] == len(b"direct upload"))
+
+    for k in (key, thumb_key, direct_key):
+        storage.delete(k)
+    expect("delete removes objects", not any(storage.exists(k) for k in (key, thumb_key, direct_key)))
+    expect("delete drops the local copy", not os.path.exists(storage.cached_path(key)) or storage.is_local)
+    try:
+        storage.delete(key)
+        missing_ok = True
+    except Exception:
+        missing_ok = False
+    expect("deleting a missing key is a no-op", missing_ok)
+
+    if storage.is_local:
+        refused = 0
+        for bad_key in ("/etc/passwd", "../outside.jpg", "uploads/../../outside.jpg"):
+            try:
+                storage.local_path(bad_key)
+            except ValueError:
+                refused += 1
+        expect("keys outside the store are refused", refused == 3)
+    return ok
+
+def put_via_http(upload, body: bytes) -> int:
+    request = urllib.request.Request(upload.url, data=body, method=upload.method, headers=upload.headers)
+    with urllib.request.urlopen(request) as response:
+        return response.status
+
+def put_via_api():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from apps.api import storage as storage_module
+    from apps.api.routers import uploads
+
+    app = FastAPI()
+    app.include_router(uploads.router)
+    client = TestClient(app)
+
+    def put(upload, body: bytes) -> int:
+        return client.put(upload.url, content=body, headers=upload.headers).status_code
+
+    return storage_module, put
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoint", help="S3-compatible endpoint to use instead of an in-process moto server")
+    parser.add_argument("--bucket", default="bcqa-check")
+    args = parser.parse_args()
+
+    results = []
+    storage_module, put = put_via_api()
+    fs = FileSystemStorage(os.path.join(SANDBOX, "store"))
+    storage_module.set_storage(fs)
+    results.append(check("fs", fs, put))
+
+    server = None
+    endpoint = args.endpoint
+    if endpoint is None:
+        try:
+            from moto.server import ThreadedMotoServer
+        except ImportError:
+            print("skip  s3    moto is not installed and no --endpoint was given")
+            sys.exit(0 if all(results) else 1)
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "check")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "check")
+        server = ThreadedMotoServer(ip_address="127.0.0.1", port=0)
+        server.start()
+        host, port = server.get_host_and_port()
+        endpoint = f"http://{host}:{port}"
+    try:
+        s3 = S3Storage(bucket=args.bucket, endpoint_url=endpoint, cache_dir=tempfile.mkdtemp(prefix="bcqa_mirror_"))
+        try:
+            s3.client.create_bucket(Bucket=args.bucket)
+        except s3.client.exceptions.BucketAlreadyOwnedByYou:
+            pass
+        results.append(check("s3", s3, put_via_http))
+    finally:
+        if server is not None:
+            server.stop()
+    sys.exit(0 if all(results) else 1)
+
+if __name__ == "__main__":
+    main()
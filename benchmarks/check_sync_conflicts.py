@@ -0,0 +1,126 @@
+"""Checks which offline edits POST /runs/{id}/changes:apply applies and which it reports as conflicts or duplicates.
+
+Server-side writes that are not edits (the placeholder answer a photo upload
+creates, thumbnails made after it) must not beat an older offline edit;
+real server edits must. Uses a throwaway SQLite database unless
+BENCH_DATABASE_URL is set. Run from the
+repository root:
+
+    python benchmarks/check_sync_conflicts.py
+"""
+import io
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from synthetic import sandbox, write_template, create_run, question_id
+
+sandbox("bcqa_syncconflicts_")
+template_id = write_template(10)
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from apps.api.main import app
+
+# SQLite's CURRENT_TIMESTAMP, the server default for created_at, has one-second resolution
+CLOCK_STEP = 1.1
+
+def now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def upload_photo(client: TestClient, run_id: str, qid: str) -> dict:
+    buf = io.BytesIO()
+    Image.effect_noise((64, 64), 32).convert("RGB").save(buf, format="JPEG")
+    res = client.post(f"/runs/{run_id}/questions/{qid}/photos", files={"file": ("p.jpg", buf.getvalue(), "image/jpeg")})
+    res.raise_for_status()
+    return res.json()
+
+def wait_for_thumbnail(client: TestClient, run_id: str, photo_id: str):
+    for _ in range(100):
+        photos = client.get(f"/runs/{run_id}/changes").json()["photos"]
+        if any(p["id"] == photo_id and p["thumbnail_url"] != p["url"] for p in photos):
+            return
+        time.sleep(0.05)
+    raise SystemExit("thumbnail was never generated")
+
+def apply(client: TestClient, run_id: str, **mutation) -> str:
+    mutation.setdefault("mutation_id", str(uuid4()))
+    mutation["client_updated_at"] = mutation["client_updated_at"].isoformat()
+    res = client.post(f"/runs/{run_id}/changes:apply", json={"device_id": "check", "mutations": [mutation]})
+    res.raise_for_status()
+    return res.json()["results"][0]["status"]
+
+def answer_after_photo(client: TestClient) -> str:
+    # The device answered offline, then the photo it took earlier reached the server first
+    run_id = create_run(client, template_id)
+    edited = now()
+    time.sleep(CLOCK_STEP)
+    upload_photo(client, run_id, question_id(template_id, 0))
+    return apply(client, run_id, type="answer", question_id=question_id(template_id, 0), value="fail",
+                 comment="offline", client_updated_at=edited)
+
+def answer_after_server_edit(client: TestClient) -> str:
+    run_id = create_run(client, template_id)
+    edited = now()
+    time.sleep(CLOCK_STEP)
+    client.post(f"/runs/{run_id}/answers", json={"question_id": question_id(template_id, 1), "value": "pass"}).raise_for_status()
+    return apply(client, run_id, type="answer", question_id=question_id(template_id, 1), value="fail", client_updated_at=edited)
+
+def caption_after_thumbnail(client: TestClient) -> str:
+    # The server captioned, then the device recaptioned, then the thumbnail was rebuilt before it synced
+    run_id = create_run(client, template_id)
+    photo = upload_photo(client, run_id, question_id(template_id, 2))
+    wait_for_thumbnail(client, run_id, photo["id"])
+    client.put(f"/runs/{run_id}/photos/{photo['id']}", data={"caption": "server"}).raise_for_status()
+    time.sleep(CLOCK_STEP)
+    edited = now()
+    time.sleep(CLOCK_STEP)
+    client.post(f"/runs/{run_id}/photos/thumbnails/regenerate").raise_for_status()
+    return apply(client, run_id, type="photo_caption", photo_id=photo["id"], caption="device", client_updated_at=edited)
+
+def caption_of_new_photo(client: TestClient) -> str:
+    # Captioned on the device before the photo itself was uploaded
+    run_id = create_run(client, template_id)
+    edited = now() - timedelta(minutes=5)
+    photo = upload_photo(client, run_id, question_id(template_id, 3))
+    return apply(client, run_id, type="photo_caption", photo_id=photo["id"], caption="device", client_updated_at=edited)
+
+def caption_after_server_caption(client: TestClient) -> str:
+    run_id = create_run(client, template_id)
+    photo = upload_photo(client, run_id, question_id(template_id, 4))
+    edited = now()
+    time.sleep(CLOCK_STEP)
+    client.put(f"/runs/{run_id}/photos/{photo['id']}", data={"caption": "server"}).raise_for_status()
+    return apply(client, run_id, type="photo_caption", photo_id=photo["id"], caption="device", client_updated_at=edited)
+
+def mutation_id_from_another_run(client: TestClient) -> str:
+    # Devices number their own mutations, so ids repeat across runs
+    mutation_id = f"device-1-{uuid4().hex[:8]}"
+    for run_id in (create_run(client, template_id), create_run(client, template_id)):
+        status = apply(client, run_id, mutation_id=mutation_id, type="answer", question_id=question_id(template_id, 5),
+                       value="pass", client_updated_at=now())
+    return status
+
+CASES = [
+    ("answer edited offline, photo uploaded later", answer_after_photo, "applied"),
+    ("answer edited offline, server answered later", answer_after_server_edit, "conflict"),
+    ("caption edited offline, thumbnail rebuilt later", caption_after_thumbnail, "applied"),
+    ("caption edited offline before the photo uploaded", caption_of_new_photo, "applied"),
+    ("caption edited offline, server captioned later", caption_after_server_caption, "conflict"),
+    ("mutation id already used in another run", mutation_id_from_another_run, "applied"),
+]
+
+def main():
+    failed = False
+    with TestClient(app) as client:
+        for name, case, expected in CASES:
+            status = case(client)
+            ok = status == expected
+            failed |= not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {name:<50} expected {expected}, got {status}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
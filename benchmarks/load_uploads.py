@@ -0,0 +1,118 @@
+"""Measures latency of an unrelated endpoint (GET /healthz) while photos are being uploaded.
+
+Starts the API under uvicorn against a throwaway database, then fires
+--uploads concurrent ~10 MB JPEG uploads (in --rounds waves) while probing
+/healthz every 20 ms.
+
+    python benchmarks/load_uploads.py --uploads 8 --rounds 3
+"""
+import argparse
+import asyncio
+import io
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from synthetic import ROOT, sandbox, write_template
+
+import httpx
+from PIL import Image
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def make_jpeg(target_mb: float) -> bytes:
+    # Noise JPEG size grows with pixel count, so one probe is enough to hit the target
+    side = 1024
+    for _ in range(2):
+        img = Image.effect_noise((side, side), 96).convert("RGB")
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=95)
+        side = int(side * (target_mb * 1024 * 1024 / buf.tell()) ** 0.5)
+    return buf.getvalue()
+
+def summarize(label: str, samples):
+    if not samples:
+        print(f"{label}: no samples")
+        return
+    ms = sorted(s * 1000 for s in samples)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    print(f"{label:<22} n={len(ms):4d}  p50={statistics.median(ms):7.1f} ms  p95={p95:7.1f} ms  max={ms[-1]:7.1f} ms")
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        (await client.get("/healthz")).raise_for_status()
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(0.02)
+
+async def run(base_url: str, template_id: str, photo: bytes, uploads: int, rounds: int):
+    async with httpx.AsyncClient(base_url=base_url, timeout=300) as client:
+        res = await client.post("/runs/", json={
+            "template_id": template_id, "p_ref": "0", "site_name": "Bench", "engineer_name": "Bench",
+            "visit_date": "2026-01-01", "tech_bands": [1800], "ap_count": 0,
+        })
+        res.raise_for_status()
+        run_id = res.json()["id"]
+
+        idle, busy = [], []
+        stop = asyncio.Event()
+        task = asyncio.create_task(probe(client, stop, idle))
+        await asyncio.sleep(1.0)
+        stop.set()
+        await task
+
+        async def upload(i: int):
+            files = {"file": (f"photo_{i}.jpg", photo, "image/jpeg")}
+            (await client.post(f"/runs/{run_id}/questions/Q-bench_10-{i % 10:05d}/photos", files=files)).raise_for_status()
+
+        stop = asyncio.Event()
+        task = asyncio.create_task(probe(client, stop, busy))
+        start = time.perf_counter()
+        for r in range(rounds):
+            await asyncio.gather(*(upload(r * uploads + i) for i in range(uploads)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await task
+
+    summarize("/healthz idle", idle)
+    summarize("/healthz during uploads", busy)
+    print(f"{uploads * rounds} uploads of {len(photo) / 1024 / 1024:.1f} MB in {elapsed:.1f} s")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--size-mb", type=float, default=10.0)
+    args = parser.parse_args()
+
+    sandbox("bcqa_uploads_")
+    template_id = write_template(10)
+    photo = make_jpeg(args.size_mb)
+
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "apps.api.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                if httpx.get(f"{base_url}/healthz").status_code == 200:
+                    break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        asyncio.run(run(base_url, template_id, photo, args.uploads, args.rounds))
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""Times the API hot paths on synthetic runs and writes the results as JSON, for comparing releases.
+
+    python benchmarks/suite.py --questions 100,1000,5000 --output results.json
+    python benchmarks/suite.py --baseline results.json      # exit 1 on a regression
+
+For each question count it writes a template shaped like the converted
+DAS/DOT question sets, fills a run with a realistic mix of answers and
+photos (see synthetic.answer_plan), and times:
+
+    get_run_details   GET /runs/{id}
+    update_answer     POST /runs/{id}/answers
+    upload_photo      POST /runs/{id}/questions/{qid}/photos (the seeding uploads)
+    list_runs         GET /runs/?include=stats, one page among --runs runs
+    load_all          a cold TemplateLoader.load_all(strict=True)
+    export_run        POST /runs/{id}/export?stream=true, uncached and cached
+
+Requests go through the in-process test client against a throwaway SQLite
+file, or BENCH_DATABASE_URL (e.g. a local Postgres). With --baseline, a
+result whose median is more than --threshold times the baseline's fails
+the run.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from synthetic import ROOT, answer_plan, sandbox, template_question_ids, write_converted_template
+
+# sandbox() moves into a temp dir that is removed at exit; --output/--baseline are relative to here
+INVOCATION_DIR = os.getcwd()
+sandbox("bcqa_suite_")
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from apps.api.database import engine
+from apps.api.main import app
+from apps.api.models import ChecklistRun
+from checklist_engine import TemplateLoader
+
+BATCH_SIZE = 500
+PHOTO_SIZE = (640, 480)
+
+def summarize(name: str, questions: int, samples) -> dict:
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        "name": name,
+        "questions": questions,
+        "n": len(ms),
+        "min_ms": round(ms[0], 3),
+        "p50_ms": round(statistics.median(ms), 3),
+        "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+        "mean_ms": round(statistics.fmean(ms), 3),
+    }
+
+def timed(fn, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def check(res, status: int = 200):
+    if res.status_code != status:
+        raise RuntimeError(f"{res.request.method} {res.request.url}: {res.status_code} {res.text[:200]}")
+    return res
+
+def photo_bytes(rng: random.Random) -> bytes:
+    # Distinct content per photo, or upload deduplication would store one file
+    img = Image.effect_noise(PHOTO_SIZE, rng.randint(16, 64)).convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=70)
+    return buf.getvalue()
+
+def seed_runs(n_runs: int, template_id: str):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "template_id": template_id,
+            "status": "draft",
+            "p_ref": f"P-{i:07d}",
+            "site_name": f"Site {i}",
+            "engineer_name": f"Engineer {i % 50}",
+            "visit_date": (start + timedelta(hours=i)).date(),
+            "tech_bands": [],
+            "ap_count": 0,
+            "created_at": start + timedelta(hours=i),
+        }
+        for i in range(n_runs)
+    ]
+    with engine.begin() as conn:
+        conn.execute(ChecklistRun.__table__.insert(), rows)
+
+def fill_run(client, run_id: str, plan, max_photos: int, rng: random.Random) -> list:
+    """Saves the plan's answers in batches, uploads its photos, and returns the upload timings."""
+    answers = [{"question_id": qid, "value": value, "comment": comment} for qid, value, comment, _ in plan]
+    for i in range(0, len(answers), BATCH_SIZE):
+        check(client.put(f"/runs/{run_id}/answers:batch", json={"answers": answers[i:i + BATCH_SIZE]}))
+
+    uploads = [qid for qid, _, _, photos in plan for _ in range(photos)][:max_photos]
+    samples = []
+    for i, qid in enumerate(uploads):
+        files = {"file": (f"photo_{i}.jpg", photo_bytes(rng), "image/jpeg")}
+        start = time.perf_counter()
+        check(client.post(f"/runs/{run_id}/questions/{qid}/photos", files=files))
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def wait_for_thumbnails(client, run_id: str, timeout: float = 300):
+    # Derivatives are made after the upload responds; exports should not race them
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        answers = check(client.get(f"/runs/{run_id}")).json()["answers"]
+        if all(p["thumbnail_url"] != p["url"] for a in answers.values() for p in a["photos"]):
+            return
+        time.sleep(0.2)
+
+def bench_questions(client, n: int, args, rng: random.Random) -> list:
+    template = write_converted_template(n, seed=n)
+    template_id = template["meta"]["template_id"]
+    question_ids = template_question_ids(template)
+    run_id = check(client.post("/runs/", json={
+        "template_id": template_id, "p_ref": "0", "site_name": "Bench", "engineer_name": "Bench",
+        "visit_date": "2026-01-01", "tech_bands": [1800], "ap_count": 0,
+    })).json()["id"]
+
+    results = []
+    upload_samples = fill_run(client, run_id, answer_plan(question_ids, args.fill, seed=n), args.max_photos, rng)
+    if upload_samples:
+        results.append(summarize("upload_photo", n, upload_samples))
+    wait_for_thumbnails(client, run_id)
+
+    check(client.get(f"/runs/{run_id}"))
+    results.append(summarize("get_run_details", n, timed(lambda: check(client.get(f"/runs/{run_id}")), args.repeat)))
+
+    def update():
+        value = rng.choice(["pass", "fail", "na"])
+        check(client.post(f"/runs/{run_id}/answers", json={"question_id": rng.choice(question_ids), "value": value}))
+    results.append(summarize("update_answer", n, timed(update, args.repeat)))
+
+    seed_runs(args.runs, template_id)
+    params = {"limit": 100, "include": "stats", "template_id": template_id}
+    check(client.get("/runs/", params=params))
+    results.append(summarize("list_runs", n, timed(lambda: check(client.get("/runs/", params=params)), args.repeat)))
+
+    # Only this size's template, so the timing does not grow with the sizes run before it
+    load_dir = os.path.join(os.path.dirname(os.environ["TEMPLATES_DIR"]), f"load_all_{n}")
+    os.makedirs(load_dir, exist_ok=True)
+    shutil.copy(os.path.join(os.environ["TEMPLATES_DIR"], f"{template_id}.json"), load_dir)
+    TemplateLoader(load_dir).load_all(strict=True)
+    results.append(summarize("load_all", n, timed(lambda: TemplateLoader(load_dir).load_all(strict=True), args.repeat)))
+
+    if args.export_repeat:
+        renders = []
+        for i in range(args.export_repeat):
+            # A new declaration label changes the fingerprint, so every render misses the cache
+            payload = {"declaration_checks": [{"id": "bench", "label": f"Bench render {n}-{i}-{uuid.uuid4()}"}]}
+            start = time.perf_counter()
+            check(client.post(f"/runs/{run_id}/export", params={"stream": "true"}, json=payload))
+            renders.append(time.perf_counter() - start)
+        results.append(summarize("export_run", n, renders))
+        results.append(summarize(
+            "export_run_cached", n,
+            timed(lambda: check(client.post(f"/runs/{run_id}/export", params={"stream": "true"}, json=payload)), args.repeat),
+        ))
+    return results
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "-C", ROOT, "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "database": engine.dialect.name,
+    }
+
+def compare(results, baseline_path: str, threshold: float) -> list:
+    with open(baseline_path) as f:
+        baseline = {(r["name"], r["questions"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        before = baseline.get((r["name"], r["questions"]))
+        if before and before["p50_ms"] > 0 and r["p50_ms"] > before["p50_ms"] * threshold:
+            regressions.append({
+                "name": r["name"],
+                "questions": r["questions"],
+                "baseline_p50_ms": before["p50_ms"],
+                "p50_ms": r["p50_ms"],
+                "ratio": round(r["p50_ms"] / before["p50_ms"], 2),
+            })
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", default="100,1000,5000")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--fill", type=float, default=0.8, help="share of questions answered")
+    parser.add_argument("--max-photos", type=int, default=300, help="photos uploaded per run, at most")
+    parser.add_argument("--runs", type=int, default=1000, help="extra runs inserted for list_runs")
+    parser.add_argument("--export-repeat", type=int, default=3, help="uncached exports per size (0 skips export)")
+    parser.add_argument("--output", help="write the JSON here instead of stdout")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    results = []
+    with TestClient(app) as client:
+        for n in [int(x) for x in args.questions.split(",")]:
+            batch = bench_questions(client, n, args, rng)
+            for r in batch:
+                print(f"{r['name']:<18} {n:>5}q  p50={r['p50_ms']:9.2f} ms  p95={r['p95_ms']:9.2f} ms", file=sys.stderr)
+            results.extend(batch)
+
+    report = {"environment": environment(), "results": results}
+    if args.baseline:
+        report["regressions"] = compare(results, os.path.join(INVOCATION_DIR, args.baseline), args.threshold)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(os.path.join(INVOCATION_DIR, args.output), "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if report.get("regressions"):
+        for r in report["regressions"]:
+            print(f"REGRESSION {r['name']} {r['questions']}q: {r['baseline_p50_ms']} -> {r['p50_ms']} ms ({r['ratio']}x)", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
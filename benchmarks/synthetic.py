@@ -0,0 +1,169 @@
+"""Shared fixtures for the benchmark scripts: a throwaway API sandbox and synthetic templates.
+
+`sandbox()` must run before anything under `apps.api` is imported, because the
+API reads DATABASE_URL and TEMPLATES_DIR at import time.
+"""
+import atexit
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+def sandbox(prefix: str = "bcqa_bench_") -> str:
+    """Points the API at a temp SQLite DB (unless BENCH_DATABASE_URL is set) and temp templates dir."""
+    tmp = tempfile.mkdtemp(prefix=prefix)
+    atexit.register(shutil.rmtree, tmp, True)
+    os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL") or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["TEMPLATES_DIR"] = os.path.join(tmp, "templates")
+    os.makedirs(os.environ["TEMPLATES_DIR"])
+    # uploads/ and exports/ are relative to the working directory
+    os.chdir(tmp)
+    return tmp
+
+def question_id(template_id: str, idx: int) -> str:
+    return f"Q-{template_id}-{idx:05d}"
+
+def template_dict(n_questions: int, template_id: str = None, groups: int = 10) -> dict:
+    template_id = template_id or f"bench_{n_questions}"
+    questions = [
+        {
+            "question_id": question_id(template_id, i),
+            "text": f"Question {i}",
+            "answer_type": "tri_state",
+            "required": True,
+            "severity": ("critical", "major", "minor")[i % 3],
+        }
+        for i in range(n_questions)
+    ]
+    return {
+        "schema_version": "bcqa.template.v1",
+        "meta": {
+            "template_id": template_id,
+            "name": f"Bench {n_questions}",
+            "version": "1.0.0",
+            "category": "bench",
+            "solution": "bench",
+            "created_at": "2026-01-01",
+        },
+        "ui": {"default_bucket_icon": "clipboard-check", "bucket_ordering": "as_defined"},
+        "buckets": [
+            {
+                "bucket_id": "site",
+                "title": "Site",
+                "order": 1,
+                "groups": [
+                    {"group_id": f"g{g}", "title": f"Group {g}", "order": g, "questions": questions[g::groups]}
+                    for g in range(groups)
+                ],
+            }
+        ],
+        "declaration": {"required": False, "statement": "", "signature_required": False},
+        "validation": {"before_declare": [], "before_export": []},
+    }
+
+def write_template(n_questions: int, template_id: str = None, directory: str = None) -> str:
+    template = template_dict(n_questions, template_id)
+    template_id = template["meta"]["template_id"]
+    directory = directory or os.environ["TEMPLATES_DIR"]
+    with open(os.path.join(directory, f"{template_id}.json"), "w") as f:
+        json.dump(template, f)
+    return template_id
+
+def create_run(client, template_id: str, ap_count: int = 0) -> str:
+    res = client.post("/runs/", json={
+        "template_id": template_id,
+        "p_ref": "0",
+        "site_name": "Bench",
+        "engineer_name": "Bench",
+        "visit_date": "2026-01-01",
+        "tech_bands": [1800],
+        "ap_count": ap_count,
+    })
+    res.raise_for_status()
+    return res.json()["id"]
+
+# Shares of questions per source Area, as in DAS_QuestionSet.json
+AREA_WEIGHTS = {"MER Door": 3, "Cabinet": 36, "Roof": 9, "Site": 14, "AP": 3}
+QUESTIONS_PER_EQUIPMENT = 8
+# Shares of answered questions; fails usually carry a comment and photos
+ANSWER_WEIGHTS = {"pass": 80, "fail": 12, "na": 8}
+
+def question_set(n_questions: int, seed: int = 0) -> list:
+    """QuestionSet-style source records ({Question_ID, Question, Area, Equipment, Cat}), like DAS_QuestionSet.json."""
+    rng = random.Random(seed)
+    areas = rng.choices(list(AREA_WEIGHTS), weights=list(AREA_WEIGHTS.values()), k=n_questions)
+    seen = {}
+    records = []
+    for i, area in enumerate(areas, 1):
+        n = seen[area] = seen.get(area, 0) + 1
+        records.append({
+            "Question_ID": i,
+            "Question": f"{area} check {n}",
+            "Area": area,
+            "Equipment": f"{area} {(n - 1) // QUESTIONS_PER_EQUIPMENT + 1}",
+            "Cat": rng.choice([1, 3, 3, 5, 5, 5]),
+        })
+    return records
+
+def converted_template(n_questions: int, template_id: str = None, seed: int = 0) -> dict:
+    """A template built from question_set() the way scripts/convert_questions.py builds cel_das_v1."""
+    sys.path.insert(0, os.path.join(ROOT, "scripts"))
+    from convert_questions import area_bucket, convert_question, slugify
+
+    template_id = template_id or f"conv_{n_questions}"
+    prefix = template_id.upper()
+    template = template_dict(0, template_id)
+    template["meta"]["name"] = f"Converted {n_questions}"
+    template["declaration"] = {"required": True, "signature_required": True, "statement": "I confirm this checklist is accurate."}
+    buckets = {}
+    for record in question_set(n_questions, seed):
+        bucket_id, icon = area_bucket(record["Area"])
+        bucket = buckets.setdefault(bucket_id, {
+            "bucket_id": bucket_id,
+            "title": record["Area"],
+            "icon": icon,
+            "order": (len(buckets) + 1) * 10,
+            "groups": {},
+        })
+        group_id = slugify(record["Equipment"])
+        group = bucket["groups"].setdefault(group_id, {
+            "group_id": group_id,
+            "title": record["Equipment"],
+            "order": (len(bucket["groups"]) + 1) * 10,
+            "questions": [],
+        })
+        group["questions"].append(convert_question(record, prefix))
+    for bucket in buckets.values():
+        bucket["groups"] = list(bucket["groups"].values())
+    template["buckets"] = list(buckets.values())
+    return template
+
+def write_converted_template(n_questions: int, template_id: str = None, directory: str = None, seed: int = 0) -> dict:
+    template = converted_template(n_questions, template_id, seed)
+    directory = directory or os.environ["TEMPLATES_DIR"]
+    with open(os.path.join(directory, f"{template['meta']['template_id']}.json"), "w") as f:
+        json.dump(template, f)
+    return template
+
+def template_question_ids(template: dict) -> list:
+    return [q["question_id"] for b in template["buckets"] for g in b["groups"] for q in g["questions"]]
+
+def answer_plan(question_ids, fill: float = 0.8, seed: int = 0) -> list:
+    """(question_id, value, comment, photo count) for a run a field engineer has mostly filled in."""
+    rng = random.Random(seed)
+    plan = []
+    for qid in question_ids:
+        if rng.random() >= fill:
+            continue
+        value = rng.choices(list(ANSWER_WEIGHTS), weights=list(ANSWER_WEIGHTS.values()))[0]
+        if value == "fail":
+            plan.append((qid, value, f"Defect found at {qid}", rng.randint(1, 3)))
+        else:
+            plan.append((qid, value, None, 1 if rng.random() < 0.1 else 0))
+    return plan
@@ -1,4 +1,15 @@
 from .models import ChecklistTemplate
-from .loader import TemplateLoader
+from .loader import TemplateLoader, TemplateLoadError
+from .index import TemplateIndex, QuestionRef
+from .progress import ProgressEngine, RunSummary, Tally
 
-__all__ = ["ChecklistTemplate", "TemplateLoader"]
+__all__ = [
+    "ChecklistTemplate",
+    "TemplateLoader",
+    "TemplateLoadError",
+    "TemplateIndex",
+    "QuestionRef",
+    "ProgressEngine",
+    "RunSummary",
+    "Tally",
+]
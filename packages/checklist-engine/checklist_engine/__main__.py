@@ -0,0 +1,19 @@
+import argparse
+from pathlib import Path
+
+from .compiled import write_compiled
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m checklist_engine")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compile_cmd = commands.add_parser("compile", help="Validate template JSON and write .tplc artifacts next to it")
+    compile_cmd.add_argument("paths", nargs="+", help="Template JSON files or directories of them")
+    args = parser.parse_args()
+
+    for arg in args.paths:
+        path = Path(arg)
+        for json_path in sorted(path.glob("*.json")) if path.is_dir() else [path]:
+            print(f"Compiled {json_path} -> {write_compiled(json_path)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Compiled template headers: a small msgpack artifact written next to each template JSON.
+
+The converter (or `python -m checklist_engine compile <dir>`) validates a
+template and records its metadata in `<name>.tplc`, pinned to the sha256 of the
+JSON, the artifact format and a fingerprint of the model schema. TemplateLoader
+trusts a matching artifact: it lists the template from the header alone and only
+parses the full JSON, via pydantic-core, the first time the template is requested.
+A stale or unreadable artifact is ignored and the JSON is validated as usual.
+
+Decoding the whole template from a positional msgpack layout without validation
+was measured slower than `model_validate_json` (about 19 vs 8 ms for 5000
+questions); pydantic-core builds the models faster than Python code can, so the
+artifact only carries what is needed before a template is used.
+"""
+import hashlib
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple, Optional, Union
+
+import msgpack
+
+from .models import ChecklistTemplate, TemplateMeta
+
+COMPILED_FORMAT_VERSION = 1
+COMPILED_SUFFIX = ".tplc"
+_MAGIC = "bcqa.tplc"
+
+class CompiledTemplate(NamedTuple):
+    meta: TemplateMeta
+    question_count: int
+    source_sha256: str
+
+def compiled_path(json_path: Union[str, Path]) -> Path:
+    return Path(json_path).with_suffix(COMPILED_SUFFIX)
+
+@lru_cache(maxsize=None)
+def schema_fingerprint() -> str:
+    schema = json.dumps(ChecklistTemplate.model_json_schema(), sort_keys=True)
+    return hashlib.sha256(f"{COMPILED_FORMAT_VERSION}:{schema}".encode("utf-8")).hexdigest()
+
+def compile_template(template: ChecklistTemplate, source: bytes) -> bytes:
+    """Packs the header of a validated template; `source` is the JSON it was loaded from."""
+    return msgpack.packb(
+        [
+            _MAGIC,
+            COMPILED_FORMAT_VERSION,
+            schema_fingerprint(),
+            hashlib.sha256(source).hexdigest(),
+            template.meta.model_dump(mode="json"),
+            template.index.total,
+        ],
+        use_bin_type=True,
+    )
+
+def load_compiled(data: bytes, source: bytes) -> Optional[CompiledTemplate]:
+    """The artifact's header, or None if it is stale or was not built from `source`."""
+    magic, version, fingerprint, source_sha, meta, question_count = msgpack.unpackb(data, raw=False)
+    if magic != _MAGIC or version != COMPILED_FORMAT_VERSION or fingerprint != schema_fingerprint():
+        return None
+    if source_sha != hashlib.sha256(source).hexdigest():
+        return None
+    return CompiledTemplate(TemplateMeta.model_validate(meta), question_count, source_sha)
+
+def read_compiled(json_path: Union[str, Path], source: bytes) -> Optional[CompiledTemplate]:
+    """The header compiled for `json_path` if a current artifact exists next to it."""
+    try:
+        with open(compiled_path(json_path), "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    try:
+        return load_compiled(data, source)
+    except Exception:
+        # A truncated or foreign file is just a cache miss
+        return None
+
+def write_compiled(json_path: Union[str, Path]) -> Path:
+    """Validates `json_path` and writes its artifact alongside it. Raises if the template is invalid."""
+    with open(json_path, "rb") as f:
+        source = f.read()
+    template = ChecklistTemplate.model_validate_json(source)
+    target = compiled_path(json_path)
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(compile_template(template, source))
+    os.replace(tmp_path, target)
+    return target
@@ -0,0 +1,89 @@
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, Mapping, NamedTuple, Tuple
+
+if TYPE_CHECKING:
+    from .models import Bucket, ChecklistTemplate, Group, Question
+
+class QuestionRef(NamedTuple):
+    bucket: "Bucket"
+    group: "Group"
+    question: "Question"
+    position: int  # index into TemplateIndex.questions
+
+class TemplateIndex:
+    """Read-only lookups over a template, built once so callers never re-walk the bucket tree."""
+
+    __slots__ = (
+        "questions",
+        "question_ids",
+        "by_id",
+        "bucket_ids",
+        "bucket_question_ids",
+        "bucket_totals",
+        "bucket_ranges",
+        "group_question_ids",
+        "group_ranges",
+        "required_ids",
+        "ids_by_severity",
+        "ids_by_tag",
+        "total",
+    )
+
+    def __init__(self, template: "ChecklistTemplate"):
+        questions: List["Question"] = []
+        by_id: Dict[str, QuestionRef] = {}
+        bucket_question_ids: Dict[str, Tuple[str, ...]] = {}
+        group_question_ids: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+        bucket_ranges: Dict[str, Tuple[int, int]] = {}
+        group_ranges: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        severity: Dict[str, set] = {}
+        tags: Dict[str, set] = {}
+        required = set()
+
+        for bucket in template.buckets:
+            bucket_ids: List[str] = []
+            bucket_start = len(questions)
+            for group in bucket.groups:
+                group_ids: List[str] = []
+                group_start = len(questions)
+                for q in group.questions:
+                    by_id[q.question_id] = QuestionRef(bucket, group, q, len(questions))
+                    questions.append(q)
+                    bucket_ids.append(q.question_id)
+                    group_ids.append(q.question_id)
+                    if q.required:
+                        required.add(q.question_id)
+                    if q.severity:
+                        severity.setdefault(q.severity, set()).add(q.question_id)
+                    for tag in q.tags or []:
+                        tags.setdefault(tag, set()).add(q.question_id)
+                group_question_ids[(bucket.bucket_id, group.group_id)] = tuple(group_ids)
+                group_ranges[(bucket.bucket_id, group.group_id)] = (group_start, len(questions))
+            bucket_question_ids[bucket.bucket_id] = tuple(bucket_ids)
+            bucket_ranges[bucket.bucket_id] = (bucket_start, len(questions))
+
+        self.questions: Tuple["Question", ...] = tuple(questions)
+        self.question_ids: Tuple[str, ...] = tuple(q.question_id for q in questions)
+        self.by_id: Mapping[str, QuestionRef] = MappingProxyType(by_id)
+        self.bucket_ids: Tuple[str, ...] = tuple(b.bucket_id for b in template.buckets)
+        self.bucket_question_ids: Mapping[str, Tuple[str, ...]] = MappingProxyType(bucket_question_ids)
+        self.bucket_totals: Mapping[str, int] = MappingProxyType({k: len(v) for k, v in bucket_question_ids.items()})
+        # Questions are stored bucket by bucket, group by group, so each is a contiguous [start, end) slice
+        self.bucket_ranges: Mapping[str, Tuple[int, int]] = MappingProxyType(bucket_ranges)
+        self.group_question_ids: Mapping[Tuple[str, str], Tuple[str, ...]] = MappingProxyType(group_question_ids)
+        self.group_ranges: Mapping[Tuple[str, str], Tuple[int, int]] = MappingProxyType(group_ranges)
+        self.required_ids: FrozenSet[str] = frozenset(required)
+        self.ids_by_severity: Mapping[str, FrozenSet[str]] = MappingProxyType({k: frozenset(v) for k, v in severity.items()})
+        self.ids_by_tag: Mapping[str, FrozenSet[str]] = MappingProxyType({k: frozenset(v) for k, v in tags.items()})
+        self.total: int = len(questions)
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError(f"TemplateIndex is immutable; cannot reassign {name}")
+        object.__setattr__(self, name, value)
+
+    def __contains__(self, question_id: str) -> bool:
+        return question_id in self.by_id
+
+    def get(self, question_id: str):
+        return self.by_id.get(question_id)
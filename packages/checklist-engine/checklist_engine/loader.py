@@ -1,46 +1,224 @@
 import json
+import threading
+import time
 from pathlib import Path
-from typing import List, Union
+from typing import Dict, List, Optional, Tuple, Union
 from pydantic import ValidationError
-from .models import ChecklistTemplate
+from .models import ChecklistTemplate, TemplateMeta
+from .compiled import read_compiled
+
+class TemplateLoadError(Exception):
+    """Raised by a strict load when one or more template files fail to parse or validate."""
+
+    def __init__(self, errors: Dict[Path, str]):
+        self.errors = errors
+        lines = [f"{path}: {error}" for path, error in sorted(errors.items())]
+        super().__init__("Invalid templates:\n" + "\n".join(lines))
 
 class TemplateLoader:
-    def __init__(self, templates_dir: Union[str, Path]):
+    """Keeps validated templates in memory and re-reads only files whose mtime or size changed.
+
+    `check_interval` makes reads re-stat the directory at most that often (None:
+    only on unknown ids, `reload()` or `watch()`). Unknown ids are remembered for
+    `negative_ttl` seconds so repeated bad lookups do not rescan the directory.
+    With `use_compiled`, a file with a current .tplc artifact (see
+    checklist_engine.compiled) is listed from the artifact and only parsed when
+    the template is first requested.
+    """
+
+    def __init__(
+        self,
+        templates_dir: Union[str, Path],
+        check_interval: Optional[float] = None,
+        negative_ttl: float = 30.0,
+        use_compiled: bool = True,
+    ):
         self.templates_dir = Path(templates_dir)
-        self._cache: dict[str, ChecklistTemplate] = {}
+        self.check_interval = check_interval
+        self.negative_ttl = negative_ttl
+        self.use_compiled = use_compiled
+        self._cache: Dict[str, ChecklistTemplate] = {}
+        self._metas: Dict[str, TemplateMeta] = {}
+        self._files: Dict[str, Path] = {}  # template_id -> file
+        self._stamps: Dict[Path, Tuple[int, int]] = {}  # file -> (mtime_ns, size) last parsed
+        self._ids: Dict[Path, str] = {}  # file -> template_id it defines
+        self._errors: Dict[Path, str] = {}
+        self._missing: Dict[str, float] = {}  # unknown template_id -> expiry (monotonic)
+        self._scanned_at: Optional[float] = None
+        self._lock = threading.RLock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
 
-    def load_all(self) -> List[ChecklistTemplate]:
-        """Loads and validates all JSON templates in the directory."""
-        templates = []
-        if not self.templates_dir.exists():
-            print(f"Warning: Templates directory {self.templates_dir} does not exist.")
-            return []
+    @property
+    def errors(self) -> Dict[Path, str]:
+        """Files that failed to load on the last scan; their templates are not served."""
+        return dict(self._errors)
 
-        for file_path in self.templates_dir.glob("*.json"):
-            try:
-                template = self.load_file(file_path)
-                templates.append(template)
-            except (ValidationError, json.JSONDecodeError) as e:
-                print(f"Error loading template {file_path}: {e}")
-                # We might want to re-raise or just log, but requirement says "API should refuse to serve it and log a clear error"
-                # For now, we print and skip, but the API startup logic should probably fail if critical templates are bad.
-                continue
-        
-        return templates
+    def refresh(self) -> bool:
+        """Stats every template file and re-parses new or changed ones. Returns True if anything changed."""
+        with self._lock:
+            self._scanned_at = time.monotonic()
+            seen: Dict[Path, Tuple[int, int]] = {}
+            if not self.templates_dir.exists():
+                print(f"Warning: Templates directory {self.templates_dir} does not exist.")
+            else:
+                for file_path in sorted(self.templates_dir.glob("*.json")):
+                    try:
+                        st = file_path.stat()
+                    except OSError:
+                        continue
+                    seen[file_path] = (st.st_mtime_ns, st.st_size)
+
+            changed = False
+            for file_path in list(self._stamps):
+                if file_path not in seen:
+                    self._forget(file_path)
+                    changed = True
+
+            for file_path, stamp in seen.items():
+                if self._stamps.get(file_path) == stamp:
+                    continue
+                changed = True
+                self._forget(file_path)
+                self._stamps[file_path] = stamp
+                try:
+                    compiled = read_compiled(file_path, file_path.read_bytes()) if self.use_compiled else None
+                    if compiled is not None:
+                        self._register(file_path, compiled.meta)
+                    else:
+                        self.load_file(file_path)
+                except (ValidationError, json.JSONDecodeError, ValueError, OSError) as e:
+                    # Refuse to serve a template that does not validate
+                    self._errors[file_path] = str(e)
+                    print(f"Error loading template {file_path}: {e}")
+
+            if changed:
+                self._missing.clear()
+            return changed
+
+    def reload(self) -> bool:
+        """Explicit reload; same as refresh() but ignores check_interval."""
+        return self.refresh()
+
+    def _forget(self, file_path: Path):
+        self._stamps.pop(file_path, None)
+        self._errors.pop(file_path, None)
+        template_id = self._ids.pop(file_path, None)
+        if template_id is not None and self._files.get(template_id) == file_path:
+            del self._files[template_id]
+            self._metas.pop(template_id, None)
+            self._cache.pop(template_id, None)
+
+    def _maybe_refresh(self):
+        if self._scanned_at is None:
+            self.refresh()
+        elif self.check_interval is not None and time.monotonic() - self._scanned_at >= self.check_interval:
+            self.refresh()
+
+    def _ordered_ids(self) -> List[str]:
+        return [template_id for template_id, _ in sorted(self._files.items(), key=lambda item: item[1])]
+
+    def list_meta(self, strict: bool = False) -> List[TemplateMeta]:
+        """Metadata of all valid templates, without parsing templates that have not been requested yet.
+
+        With `strict`, raises TemplateLoadError if any file failed to load.
+        """
+        self._maybe_refresh()
+        if strict and self._errors:
+            raise TemplateLoadError(self.errors)
+        with self._lock:
+            return [self._metas[template_id] for template_id in self._ordered_ids()]
+
+    def load_all(self, strict: bool = False) -> List[ChecklistTemplate]:
+        """Returns all valid templates, re-reading only files changed since the last scan.
+
+        With `strict`, raises TemplateLoadError if any file failed to load.
+        """
+        self._maybe_refresh()
+        if strict and self._errors:
+            raise TemplateLoadError(self.errors)
+        with self._lock:
+            templates = (self._materialize(template_id) for template_id in self._ordered_ids())
+            return [t for t in templates if t is not None]
 
     def load_file(self, file_path: Path) -> ChecklistTemplate:
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        
-        template = ChecklistTemplate(**data)
-        self._cache[template.meta.template_id] = template
+        with open(file_path, "rb") as f:
+            source = f.read()
+
+        template = ChecklistTemplate.model_validate_json(source)
+        self._register(file_path, template.meta, template)
         return template
 
+    def _register(self, file_path: Path, meta: TemplateMeta, template: Optional[ChecklistTemplate] = None):
+        template_id = meta.template_id
+        with self._lock:
+            owner = self._files.get(template_id)
+            if owner is not None and owner != file_path and owner in self._stamps:
+                raise ValueError(f"Duplicate template_id {template_id!r}, already defined in {owner}")
+            self._metas[template_id] = meta
+            if template is not None:
+                self._cache[template_id] = template
+            self._files[template_id] = file_path
+            self._ids[file_path] = template_id
+
+    def _materialize(self, template_id: str) -> Optional[ChecklistTemplate]:
+        template = self._cache.get(template_id)
+        if template is not None:
+            return template
+        with self._lock:
+            template = self._cache.get(template_id)
+            file_path = self._files.get(template_id)
+            if template is not None or file_path is None:
+                return template
+            try:
+                return self.load_file(file_path)
+            except (ValidationError, ValueError, OSError) as e:
+                # The artifact vouched for a file that no longer validates; stop serving it
+                self._forget(file_path)
+                self._errors[file_path] = str(e)
+                print(f"Error loading template {file_path}: {e}")
+                return None
+
     def get_template(self, template_id: str) -> Union[ChecklistTemplate, None]:
-        if template_id in self._cache:
-            return self._cache[template_id]
-        
-        # If not in cache, try to reload all (or we could map IDs to filenames if we want to be smarter)
-        # For stage 1, loading all is fine.
-        self.load_all()
-        return self._cache.get(template_id)
+        self._maybe_refresh()
+        template = self._cache.get(template_id)
+        if template is not None:
+            return template
+        if template_id in self._files:
+            return self._materialize(template_id)
+
+        now = time.monotonic()
+        expires = self._missing.get(template_id)
+        if expires is not None and expires > now:
+            return None
+
+        # The file may have been added since the last scan; only new or changed files get parsed
+        self.refresh()
+        template = self._materialize(template_id)
+        if template is None:
+            with self._lock:
+                self._missing[template_id] = now + self.negative_ttl
+        return template
+
+    def watch(self, interval: float = 2.0):
+        """Rescans in a daemon thread every `interval` seconds until stop_watching()."""
+        with self._lock:
+            if self._watcher is not None and self._watcher.is_alive():
+                return
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, args=(interval,), name="template-watch", daemon=True)
+            self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        watcher = self._watcher
+        if watcher is not None:
+            watcher.join()
+        self._watcher = None
+
+    def _watch(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error rescanning templates in {self.templates_dir}: {e}")
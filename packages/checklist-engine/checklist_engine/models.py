@@ -1,7 +1,11 @@
+from functools import cached_property
 from typing import List, Optional, Literal, Dict, Any
 from pydantic import BaseModel, Field, constr, validator
 from datetime import date
 
+from .index import TemplateIndex
+from .progress import ProgressEngine
+
 # -- Enums & Types --
 
 AnswerType = Literal["tri_state"]
@@ -99,3 +103,12 @@ class ChecklistTemplate(BaseModel):
     buckets: List[Bucket]
     declaration: DeclarationConfig
     validation: ValidationConfig
+
+    @cached_property
+    def index(self) -> TemplateIndex:
+        # Templates are immutable per version, so the index is built once and reused
+        return TemplateIndex(self)
+
+    @cached_property
+    def progress(self) -> ProgressEngine:
+        return ProgressEngine(self.index)
@@ -0,0 +1,218 @@
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .index import TemplateIndex
+
+# A run's answers are encoded as one byte per template question, in TemplateIndex
+# order. Buckets and groups are contiguous slices of that array, so tallies are
+# bytearray.count() calls and item lists are bytearray.find() scans, both in C.
+# Many runs are stacked into one (runs x questions) uint8 matrix and tallied with
+# numpy reductions over the same slices.
+
+STATE_UNANSWERED = 0
+STATE_PASS = 1
+STATE_FAIL = 2
+STATE_NA = 3
+STATE_OTHER = 4  # any other non-empty value; counts as answered
+
+STATE_CODES = {"pass": STATE_PASS, "fail": STATE_FAIL, "na": STATE_NA}
+
+class Tally(NamedTuple):
+    total: int
+    answered: int
+    passed: int
+    failed: int
+    na: int
+
+    @property
+    def completion_percentage(self) -> int:
+        return int((self.answered / self.total * 100) if self.total > 0 else 0)
+
+class RunSummary(NamedTuple):
+    totals: Tally
+    buckets: Dict[str, Tally]
+    groups: Dict[Tuple[str, str], Tally]
+    failed: Tuple[str, ...]
+    failed_critical: Tuple[str, ...]
+    required_missing: Tuple[str, ...]
+
+def _tally(states: bytearray, start: int, end: int) -> Tally:
+    unanswered = states.count(STATE_UNANSWERED, start, end)
+    return Tally(
+        total=end - start,
+        answered=(end - start) - unanswered,
+        passed=states.count(STATE_PASS, start, end),
+        failed=states.count(STATE_FAIL, start, end),
+        na=states.count(STATE_NA, start, end),
+    )
+
+def _positions(states: bytearray, code: int) -> List[int]:
+    found = []
+    pos = states.find(code)
+    while pos != -1:
+        found.append(pos)
+        pos = states.find(code, pos + 1)
+    return found
+
+def _range_sums(hits: np.ndarray, ranges: Sequence[Tuple[int, int]]) -> np.ndarray:
+    """Sums `hits` (runs x questions) over each contiguous [start, end) column range."""
+    n_rows, n_cols = hits.shape
+    if not ranges:
+        return np.zeros((n_rows, 0), dtype=np.int32)
+    if n_cols == 0:
+        return np.zeros((n_rows, len(ranges)), dtype=np.int32)
+    starts = np.array([min(start, n_cols - 1) for start, _ in ranges], dtype=np.intp)
+    sums = np.add.reduceat(hits, starts, axis=1, dtype=np.int32)
+    # reduceat yields hits[:, start] for empty ranges instead of 0
+    empty = [j for j, (start, end) in enumerate(ranges) if start >= end]
+    if empty:
+        sums[:, empty] = 0
+    return sums
+
+class SummaryBatch:
+    """Tallies for many runs of one template, as (runs x buckets) and (runs x groups) arrays."""
+
+    def __init__(self, engine: "ProgressEngine", states: np.ndarray):
+        self.engine = engine
+        self.states = states
+        self._lists = None
+        self.bucket_ids = [bucket_id for bucket_id, _ in engine.bucket_ranges]
+        self.group_keys = [key for key, _ in engine.group_ranges]
+
+        bucket_ranges = [r for _, r in engine.bucket_ranges]
+        group_ranges = [r for _, r in engine.group_ranges]
+        self.bucket_totals = np.array([end - start for start, end in bucket_ranges], dtype=np.int32)
+        self.group_totals = np.array([end - start for start, end in group_ranges], dtype=np.int32)
+
+        self.bucket_counts: Dict[int, np.ndarray] = {}
+        self.group_counts: Dict[int, np.ndarray] = {}
+        self.total_counts: Dict[int, np.ndarray] = {}
+        for code in (STATE_UNANSWERED, STATE_PASS, STATE_FAIL, STATE_NA):
+            hits = states == code
+            self.bucket_counts[code] = _range_sums(hits, bucket_ranges)
+            self.group_counts[code] = _range_sums(hits, group_ranges)
+            self.total_counts[code] = hits.sum(axis=1, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return self.states.shape[0]
+
+    @property
+    def bucket_answered(self) -> np.ndarray:
+        return self.bucket_totals - self.bucket_counts[STATE_UNANSWERED]
+
+    @property
+    def answered(self) -> np.ndarray:
+        return self.states.shape[1] - self.total_counts[STATE_UNANSWERED]
+
+    def _rows(self, mask: np.ndarray) -> List[List[int]]:
+        # Column positions of set cells, split per row, in one nonzero() pass
+        rows, cols = np.nonzero(mask)
+        bounds = np.searchsorted(rows, np.arange(len(self) + 1)).tolist()
+        cols = cols.tolist()
+        return [cols[bounds[r]:bounds[r + 1]] for r in range(len(self))]
+
+    def _materialize(self):
+        if self._lists is None:
+            codes = (STATE_UNANSWERED, STATE_PASS, STATE_FAIL, STATE_NA)
+            self._lists = (
+                [self.total_counts[c].tolist() for c in codes],
+                [self.bucket_counts[c].tolist() for c in codes],
+                [self.group_counts[c].tolist() for c in codes],
+                self._rows(self.states == STATE_FAIL),
+                self._rows((self.states == STATE_UNANSWERED) & self.engine.required_mask),
+            )
+        return self._lists
+
+    def summary(self, row: int) -> RunSummary:
+        engine = self.engine
+        ids = engine.question_ids
+        totals, buckets, groups, failed, missing = self._materialize()
+        n = self.states.shape[1]
+
+        def tally(counts, total, col):
+            return Tally(
+                total=total,
+                answered=total - counts[0][row][col],
+                passed=counts[1][row][col],
+                failed=counts[2][row][col],
+                na=counts[3][row][col],
+            )
+
+        bucket_totals = self.bucket_totals.tolist()
+        group_totals = self.group_totals.tolist()
+        failed_pos = failed[row]
+        return RunSummary(
+            totals=Tally(
+                total=n,
+                answered=n - totals[0][row],
+                passed=totals[1][row],
+                failed=totals[2][row],
+                na=totals[3][row],
+            ),
+            buckets={bucket_id: tally(buckets, bucket_totals[j], j) for j, bucket_id in enumerate(self.bucket_ids)},
+            groups={key: tally(groups, group_totals[j], j) for j, key in enumerate(self.group_keys)},
+            failed=tuple(ids[p] for p in failed_pos),
+            failed_critical=tuple(ids[p] for p in failed_pos if engine.critical[p]),
+            required_missing=tuple(ids[p] for p in missing[row]),
+        )
+
+class ProgressEngine:
+    """Computes bucket/group completion and pass/fail/NA summaries for runs of one template."""
+
+    def __init__(self, index: "TemplateIndex"):
+        self.index = index
+        self.question_ids = index.question_ids
+        self.positions: Dict[str, int] = {qid: ref.position for qid, ref in index.by_id.items()}
+        self.bucket_ranges = list(index.bucket_ranges.items())
+        self.group_ranges = list(index.group_ranges.items())
+        self.required = bytes(1 if qid in index.required_ids else 0 for qid in index.question_ids)
+        critical = index.ids_by_severity.get("critical", frozenset())
+        self.critical = bytes(1 if qid in critical else 0 for qid in index.question_ids)
+        self.required_mask = np.frombuffer(self.required, dtype=np.uint8).astype(bool)
+
+    def encode(self, answers: Mapping[str, Optional[str]]) -> bytearray:
+        """Packs a question_id -> value mapping; ids outside the template are ignored."""
+        states = bytearray(self.index.total)
+        positions = self.positions
+        for question_id, value in answers.items():
+            pos = positions.get(question_id)
+            if pos is not None and value:
+                states[pos] = STATE_CODES.get(value, STATE_OTHER)
+        return states
+
+    def summarize_states(self, states: bytearray) -> RunSummary:
+        ids = self.question_ids
+        failed_pos = _positions(states, STATE_FAIL)
+        missing_pos = [p for p in _positions(states, STATE_UNANSWERED) if self.required[p]]
+        return RunSummary(
+            totals=_tally(states, 0, len(states)),
+            buckets={bucket_id: _tally(states, start, end) for bucket_id, (start, end) in self.bucket_ranges},
+            groups={key: _tally(states, start, end) for key, (start, end) in self.group_ranges},
+            failed=tuple(ids[p] for p in failed_pos),
+            failed_critical=tuple(ids[p] for p in failed_pos if self.critical[p]),
+            required_missing=tuple(ids[p] for p in missing_pos),
+        )
+
+    def summarize(self, answers: Mapping[str, Optional[str]]) -> RunSummary:
+        return self.summarize_states(self.encode(answers))
+
+    def summarize_batch(self, runs: Iterable[Mapping[str, Optional[str]]]) -> SummaryBatch:
+        """Encodes all runs into one matrix and tallies them together; for dashboards over many runs."""
+        n = self.index.total
+        runs = list(runs)
+        buf = bytearray(len(runs) * n)
+        positions = self.positions
+        for row, answers in enumerate(runs):
+            base = row * n
+            for question_id, value in answers.items():
+                pos = positions.get(question_id)
+                if pos is not None and value:
+                    buf[base + pos] = STATE_CODES.get(value, STATE_OTHER)
+        states = np.frombuffer(buf, dtype=np.uint8).reshape(len(runs), n)
+        return SummaryBatch(self, states)
+
+    def summarize_many(self, runs: Iterable[Mapping[str, Optional[str]]]) -> List[RunSummary]:
+        batch = self.summarize_batch(runs)
+        return [batch.summary(row) for row in range(len(batch))]
@@ -1,7 +1,16 @@
+import argparse
+import hashlib
 import json
 import re
 import os
+import shutil
 import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../packages/checklist-engine")))
+from checklist_engine.compiled import read_compiled, write_compiled
 
 def slugify(text):
     text = text.lower()
@@ -23,6 +32,34 @@ FILES = [
     ("DOT_QuestionSet.json", "packages/templates/cel_dot_v1.json", "DOT"),
 ]
 
+def area_bucket(area):
+    """(bucket_id, icon) for a source Area; unknown areas fall back to a slug."""
+    if area in AREA_MAPPING:
+        bucket_def = AREA_MAPPING[area]
+        return bucket_def['id'], bucket_def['icon']
+    return slugify(area), "clipboard-check"
+
+def convert_question(q, prefix):
+    # Construct Question
+    formatted_id = "Q-{}-{:03d}".format(prefix, q['Question_ID'])
+
+    cat_val = q.get('Cat')
+    severity = None
+    if cat_val == 1:
+        severity = "critical"
+    elif cat_val == 3:
+        severity = "major"
+    elif cat_val == 5:
+        severity = "minor"
+
+    return {
+        "question_id": formatted_id,
+        "text": q['Question'],
+        "answer_type": "tri_state",
+        "required": True,
+        "severity": severity
+    }
+
 def process_file(source_path, target_path, prefix):
     # Use absolute paths assuming script runs from project root
     base_dir = os.getcwd()
@@ -49,18 +86,10 @@ def process_file(source_path, target_path, prefix):
     for q in questions:
         area = q['Area']
         equipment = q['Equipment']
-        text = q['Question']
-        q_id_num = q['Question_ID']
         
         # Map Area to Bucket
-        if area in AREA_MAPPING:
-            bucket_def = AREA_MAPPING[area]
-            bucket_id = bucket_def['id']
-            bucket_icon = bucket_def['icon']
-        else:
-            # Fallback
-            bucket_id = slugify(area)
-            bucket_icon = "clipboard-check"
+        bucket_id, bucket_icon = area_bucket(area)
+        if area not in AREA_MAPPING:
             print("Warning: Unknown Area '{}', using id '{}'".format(area, bucket_id))
             
         bucket_title = area
@@ -89,25 +118,7 @@ def process_file(source_path, target_path, prefix):
             }
             group_order_map[bucket_id].append(group_id)
             
-        # Construct Question
-        formatted_id = "Q-{}-{:03d}".format(prefix, q_id_num)
-        
-        cat_val = q.get('Cat')
-        severity = None
-        if cat_val == 1:
-            severity = "critical"
-        elif cat_val == 3:
-            severity = "major"
-        elif cat_val == 5:
-            severity = "minor"
-
-        new_q = {
-            "question_id": formatted_id,
-            "text": text,
-            "answer_type": "tri_state",
-            "required": True,
-            "severity": severity
-        }
+        new_q = convert_question(q, prefix)
         
         buckets_map[bucket_id]['groups'][group_id]['questions'].append(new_q)
 
@@ -129,6 +140,300 @@ def process_file(source_path, target_path, prefix):
         
     print("Updated {} with {} questions.".format(target_path, len(questions)))
 
+    # Validates the template and writes the pre-validated artifact the API loads first
+    compiled = write_compiled(abs_target)
+    print("Compiled {}".format(os.path.relpath(compiled, base_dir)))
+
+# -- Streaming mode --
+# Reads the source a chunk at a time, keeps at most SPILL_ROWS converted
+# questions in memory (the rest wait in per-group spill files), and writes the
+# target byte-for-byte as json.dump(indent=2) would, replacing it only when the
+# content hash differs.
+
+READ_CHUNK = 1 << 16
+SPILL_ROWS = 10000
+
+class JsonStream:
+    """Pulls JSON values out of a text file incrementally using raw_decode."""
+
+    def __init__(self, f, chunk_size=READ_CHUNK):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        if self.pos > self.chunk_size:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        self.buf += chunk
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError("Expected {!r} but found {!r}".format(char, self.buf[self.pos]))
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number cut off by the chunk boundary still decodes, so only trust values that end before it
+            if end < len(self.buf) or not self._fill():
+                self.pos = end
+                return value
+
+    def array(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("]")
+            return
+
+    def members(self, array_keys=()):
+        """Top-level (key, value) pairs; arrays named in `array_keys` are yielded as
+        lazy iterators and must be consumed before asking for the next member."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key, (self.array() if key in array_keys else self.value())
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            return
+
+class GroupedQuestions:
+    """Area -> Equipment grouping in first-seen order with a cap on buffered questions."""
+
+    def __init__(self, spill_dir, max_rows=SPILL_ROWS):
+        self.spill_dir = spill_dir
+        self.max_rows = max_rows
+        self.buckets = {}  # bucket_id -> bucket dict with "groups": {group_id -> group dict}
+        self.pending = {}  # group number -> [question json]
+        self.spilled = set()
+        self.buffered = 0
+        self.rows = 0
+        self.unknown_areas = set()
+
+    def add(self, q, prefix):
+        area = q['Area']
+        bucket_id, bucket_icon = area_bucket(area)
+        if area not in AREA_MAPPING:
+            self.unknown_areas.add(area)
+        bucket = self.buckets.get(bucket_id)
+        if bucket is None:
+            bucket = self.buckets[bucket_id] = {
+                "bucket_id": bucket_id,
+                "title": area,
+                "icon": bucket_icon,
+                "order": (len(self.buckets) + 1) * 10,
+                "groups": {}
+            }
+        group_id = slugify(q['Equipment'])
+        group = bucket['groups'].get(group_id)
+        if group is None:
+            group = bucket['groups'][group_id] = {
+                "group_id": group_id,
+                "title": q['Equipment'],
+                "order": (len(bucket['groups']) + 1) * 10,
+                "number": sum(len(b['groups']) for b in self.buckets.values()),
+            }
+        self.pending.setdefault(group['number'], []).append(json.dumps(convert_question(q, prefix)))
+        self.rows += 1
+        self.buffered += 1
+        if self.buffered >= self.max_rows:
+            self.spill()
+
+    def _spill_path(self, number):
+        return os.path.join(self.spill_dir, "{}.jsonl".format(number))
+
+    def spill(self):
+        for number, lines in self.pending.items():
+            with open(self._spill_path(number), "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            self.spilled.add(number)
+        self.pending = {}
+        self.buffered = 0
+
+    def questions(self, group):
+        number = group['number']
+        if number in self.spilled:
+            with open(self._spill_path(number), encoding="utf-8") as f:
+                for line in f:
+                    yield json.loads(line)
+        for line in self.pending.get(number, ()):
+            yield json.loads(line)
+
+class HashingWriter:
+    def __init__(self, f):
+        self.f = f
+        self.sha = hashlib.sha256()
+
+    def write(self, text):
+        self.f.write(text)
+        self.sha.update(text.encode("utf-8"))
+
+def _dumps(value, level):
+    # json.dump(indent=2) output for a value nested `level` deep
+    return json.dumps(value, indent=2).replace("\n", "\n" + "  " * level)
+
+def _write_buckets(out, grouped):
+    if not grouped.buckets:
+        out.write("[]")
+        return
+    out.write("[")
+    for bi, bucket in enumerate(grouped.buckets.values()):
+        out.write(("," if bi else "") + "\n    {")
+        for key in ("bucket_id", "title", "icon", "order"):
+            out.write("\n      {}: {},".format(json.dumps(key), json.dumps(bucket[key])))
+        out.write('\n      "groups": [')
+        for gi, group in enumerate(bucket['groups'].values()):
+            out.write(("," if gi else "") + "\n        {")
+            for key in ("group_id", "title", "order"):
+                out.write("\n          {}: {},".format(json.dumps(key), json.dumps(group[key])))
+            out.write('\n          "questions": [')
+            for qi, q in enumerate(grouped.questions(group)):
+                out.write(("," if qi else "") + "\n            " + _dumps(q, 6))
+            out.write("\n          ]\n        }")
+        out.write("\n      ]\n    }")
+    out.write("\n  ]")
+
+def _write_template(out, target_members, grouped):
+    """Writes the target with its buckets replaced, in the same layout as process_file."""
+    out.write("{")
+    first = True
+    wrote_buckets = False
+    for key, value in target_members:
+        out.write(("" if first else ",") + "\n  " + json.dumps(key) + ": ")
+        first = False
+        if key == "buckets":
+            for _ in value:  # the old buckets are dropped one at a time
+                pass
+            _write_buckets(out, grouped)
+            wrote_buckets = True
+        else:
+            out.write(_dumps(value, 1))
+    if not wrote_buckets:
+        out.write(("" if first else ",") + '\n  "buckets": ')
+        _write_buckets(out, grouped)
+    out.write("\n}")
+
+def _file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def stream_file(source_path, target_path, prefix, spill_rows=SPILL_ROWS):
+    """Streaming counterpart of process_file; returns a summary dict instead of printing."""
+    base_dir = os.getcwd()
+    abs_source = os.path.join(base_dir, source_path)
+    abs_target = os.path.join(base_dir, target_path)
+    start = time.perf_counter()
+
+    spill_dir = tempfile.mkdtemp(prefix="convert_questions_")
+    tmp_path = "{}.{}.tmp".format(abs_target, os.getpid())
+    try:
+        grouped = GroupedQuestions(spill_dir, spill_rows)
+        with open(abs_source, 'r', encoding="utf-8") as f:
+            for key, value in JsonStream(f).members(array_keys=("questions",)):
+                if key == "questions":
+                    for q in value:
+                        grouped.add(q, prefix)
+
+        with open(abs_target, 'r', encoding="utf-8") as src, open(tmp_path, 'w', encoding="utf-8") as dst:
+            out = HashingWriter(dst)
+            _write_template(out, JsonStream(src).members(array_keys=("buckets",)), grouped)
+
+        changed = out.sha.hexdigest() != _file_sha256(abs_target)
+        if changed:
+            os.replace(tmp_path, abs_target)
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+        # Left behind when the target is unchanged, or the conversion failed part way
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    compiled = False
+    with open(abs_target, 'rb') as f:
+        current = read_compiled(abs_target, f.read()) is not None
+    if changed or not current:
+        write_compiled(abs_target)
+        compiled = True
+
+    return {
+        "source": source_path,
+        "target": target_path,
+        "rows": grouped.rows,
+        "seconds": time.perf_counter() - start,
+        "changed": changed,
+        "compiled": compiled,
+        "unknown_areas": sorted(grouped.unknown_areas),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert *_QuestionSet.json sources into checklist templates.")
+    parser.add_argument("--stream", action="store_true", help="bounded-memory import; rewrites only changed targets")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes for --stream")
+    parser.add_argument("--spill-rows", type=int, default=SPILL_ROWS, help="questions buffered before spilling to disk")
+    parser.add_argument("files", nargs="*", metavar="SOURCE:TARGET:PREFIX", help="defaults to the built-in FILES list")
+    args = parser.parse_args()
+
+    files = [tuple(spec.split(":")) for spec in args.files] or FILES
+    if not args.stream:
+        for s, t, p in files:
+            process_file(s, t, p)
+        return
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(files)))) as pool:
+        futures = [pool.submit(stream_file, s, t, p, args.spill_rows) for s, t, p in files]
+        results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - start
+
+    for r in results:
+        for area in r['unknown_areas']:
+            print("Warning: Unknown Area '{}' in {}, using id '{}'".format(area, r['source'], slugify(area)))
+        print("{} -> {}: {} rows in {:.2f}s ({:.0f} rows/s), {}{}".format(
+            r['source'], r['target'], r['rows'], r['seconds'], r['rows'] / r['seconds'] if r['seconds'] else 0,
+            "updated" if r['changed'] else "unchanged", ", compiled" if r['compiled'] else ""))
+    total = sum(r['rows'] for r in results)
+    print("Total: {} rows from {} files in {:.2f}s ({:.0f} rows/s)".format(
+        total, len(results), elapsed, total / elapsed if elapsed else 0))
+
 if __name__ == "__main__":
-    for s, t, p in FILES:
-        process_file(s, t, p)
+    main()